@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+批量推理：流式读取 JSONL 提示词，有界并发请求 /api/generate 或 /api/chat，结果按完成顺序写出并定期保存断点
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, Optional, Set, Tuple
+
+from records import json_default
+
+TIMING_FIELDS = (
+    "total_duration",
+    "load_duration",
+    "prompt_eval_count",
+    "prompt_eval_duration",
+    "eval_count",
+    "eval_duration",
+)
+
+
+class Checkpoint:
+    """断点：offset 之前的行全部完成，done 为 offset 之后已完成的行"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offset = 0
+        self.done: Set[int] = set()
+
+    def load(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.offset = data["offset"]
+        self.done = set(data["done"])
+        return True
+
+    def save(self, offset: int, done: Set[int]) -> None:
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"offset": offset, "done": sorted(o for o in done if o >= offset)}, f)
+        os.replace(tmp, self.path)
+
+    def remove(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def recorded_offsets(output: str) -> Set[int]:
+    """读取已写出结果的 offset，进程被强制终止时最后一行可能只写了一半，将其截掉"""
+    offsets: Set[int] = set()
+    if not os.path.exists(output):
+        return offsets
+    with open(output, "rb+") as f:
+        end = 0
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            try:
+                offsets.add(json.loads(raw)["offset"])
+            except (ValueError, KeyError, TypeError):
+                break
+            end += len(raw)
+        f.truncate(end)
+    return offsets
+
+
+def iter_prompts(path: str, start: int = 0, skip: Optional[Set[int]] = None) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+    """从指定字节偏移开始逐行读取，返回 (行起始偏移, 下一行偏移, 内容)，不会一次性载入整个文件"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        offset = start
+        for raw in f:
+            line_offset = offset
+            offset += len(raw)
+            if skip and line_offset in skip:
+                continue
+            line = raw.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                item = {"error": "invalid json"}
+            if isinstance(item, str):
+                item = {"prompt": item}
+            yield line_offset, offset, item
+
+
+class BatchRunner:
+    """有界并发的批量推理
+
+    同时在途的请求数不超过 concurrency，读取端按需从文件取下一行，内存占用只与并发数有关。
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        model: Optional[str] = None,
+        concurrency: int = 4,
+        keep_alive: Optional[str] = None,
+        checkpoint_interval: float = 2.0,
+        cancelled: Optional[threading.Event] = None,
+    ):
+        if concurrency < 1:
+            raise ValueError("并发数必须大于 0")
+        self.client = client
+        self.model = model
+        self.concurrency = concurrency
+        self.keep_alive = keep_alive
+        self.checkpoint_interval = checkpoint_interval
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = cancelled or threading.Event()
+
+    def run_one(self, offset: int, item: Dict[str, Any]) -> Dict[str, Any]:
+        """执行单条请求，异常记录在结果中"""
+        result: Dict[str, Any] = {"offset": offset, "id": item.get("id"), "model": item.get("model") or self.model}
+        start = time.perf_counter()
+        try:
+            if item.get("error"):
+                raise ValueError(item["error"])
+            if not result["model"]:
+                raise ValueError("未指定模型")
+            if item.get("messages"):
+                response = self.client.chat(
+                    model=result["model"],
+                    messages=item["messages"],
+                    options=item.get("options"),
+                    keep_alive=self.keep_alive,
+                )
+                result["response"] = response["message"]["content"]
+            else:
+                response = self.client.generate(
+                    model=result["model"],
+                    prompt=item.get("prompt", ""),
+                    system=item.get("system"),
+                    options=item.get("options"),
+                    keep_alive=self.keep_alive,
+                )
+                result["response"] = response["response"]
+            for field in TIMING_FIELDS:
+                result[field] = response.get(field)
+            result["error"] = None
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        result["latency"] = round(time.perf_counter() - start, 4)
+        return result
+
+    def run(
+        self,
+        path: str,
+        output: str,
+        resume: bool = False,
+        on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Dict[str, int]:
+        """执行批量推理，结果按完成顺序追加写入 output"""
+        checkpoint = Checkpoint(f"{output}.ckpt")
+        if not (resume and checkpoint.load()):
+            checkpoint = Checkpoint(checkpoint.path)
+            resume = False
+
+        if resume:
+            # 断点按间隔保存，进程被终止时最后一次保存之后写出的结果不在断点中，以输出文件为准
+            checkpoint.done.update(o for o in recorded_offsets(output) if o >= checkpoint.offset)
+
+        lock = threading.Lock()
+        inflight: Set[int] = set()
+        done: Set[int] = set(checkpoint.done)
+        # 已提交的最后一行的结束位置，用于没有在途请求时推进断点
+        state = {"read": checkpoint.offset, "saved": time.monotonic()}
+        exhausted = False
+        slots = threading.BoundedSemaphore(self.concurrency)
+
+        with open(output, "a" if resume else "w", encoding="utf-8") as out:
+
+            def save_checkpoint() -> None:
+                out.flush()
+                low = min(inflight) if inflight else state["read"]
+                # 断点之前的行已全部完成，不再需要逐条记录
+                done.difference_update({o for o in done if o < low})
+                checkpoint.save(low, done)
+                state["saved"] = time.monotonic()
+
+            def finish(offset: int, result: Dict[str, Any]) -> None:
+                with lock:
+                    out.write(json.dumps(result, ensure_ascii=False, default=json_default) + "\n")
+                    inflight.discard(offset)
+                    done.add(offset)
+                    self.completed += 1
+                    if result["error"]:
+                        self.failed += 1
+                    if time.monotonic() - state["saved"] >= self.checkpoint_interval:
+                        save_checkpoint()
+                slots.release()
+                if on_result is not None:
+                    on_result(result)
+
+            def task(offset: int, item: Dict[str, Any]) -> None:
+                finish(offset, self.run_one(offset, item))
+
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                try:
+                    for offset, end, item in iter_prompts(path, checkpoint.offset, checkpoint.done):
+                        # 没有空闲槽位时阻塞读取，保证在途请求数有界
+                        while not slots.acquire(timeout=0.5):
+                            if self.cancelled.is_set():
+                                break
+                        if self.cancelled.is_set():
+                            break
+                        with lock:
+                            inflight.add(offset)
+                            state["read"] = end
+                        pool.submit(task, offset, item)
+                    else:
+                        exhausted = True
+                except KeyboardInterrupt:
+                    self.cancelled.set()
+                    raise
+                finally:
+                    pool.shutdown(wait=True)
+                    with lock:
+                        if exhausted:
+                            state["read"] = os.path.getsize(path)
+                        save_checkpoint()
+
+        # 全部完成后删除断点
+        if exhausted:
+            checkpoint.remove()
+        return {"completed": self.completed, "failed": self.failed}
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+模型性能测试：并发请求 /api/chat，统计首 token 延迟、生成速度与加载时间
+"""
+
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+DEFAULT_PROMPT = "Why is the sky blue?"
+
+NS = 1e9
+
+
+def percentile(values: Sequence[float], p: float) -> Optional[float]:
+    """线性插值百分位数"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p / 100
+    low = int(k)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (k - low)
+
+
+def load_prompts(path: Optional[str]) -> List[str]:
+    """读取提示词文件，每行一条"""
+    if not path:
+        return [DEFAULT_PROMPT]
+    with open(path, "r", encoding="utf-8") as f:
+        prompts = [line.strip() for line in f if line.strip()]
+    if not prompts:
+        raise ValueError("提示词文件为空")
+    return prompts
+
+
+class ModelBenchmark:
+    """使用线程池并发压测一个或多个模型"""
+
+    def __init__(
+        self,
+        client: Any,
+        prompts: Sequence[str],
+        concurrency: int = 4,
+        requests: int = 10,
+        keep_alive: Optional[str] = None,
+        cancelled: Optional[threading.Event] = None,
+    ):
+        if concurrency < 1 or requests < 1:
+            raise ValueError("并发数和请求数必须大于 0")
+        self.client = client
+        self.prompts = prompts
+        self.concurrency = concurrency
+        self.requests = requests
+        self.keep_alive = keep_alive
+        self.elapsed = 0.0
+        self.cancelled = cancelled or threading.Event()
+
+    def run_one(self, model: str, prompt: str) -> Optional[Dict[str, Any]]:
+        """发送一次请求并记录客户端与服务器两侧的耗时，取消后返回 None"""
+        if self.cancelled.is_set():
+            return None
+        sample: Dict[str, Any] = {"model": model, "ttft": None, "latency": None, "error": None}
+        start = time.perf_counter()
+        try:
+            stream = self.client.chat(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                stream=True,
+                keep_alive=self.keep_alive,
+            )
+            for chunk in stream:
+                if self.cancelled.is_set():
+                    # 未完成的请求不计入结果
+                    return None
+                if sample["ttft"] is None and chunk["message"]["content"]:
+                    sample["ttft"] = time.perf_counter() - start
+                if chunk.get("done"):
+                    for field in ("eval_count", "eval_duration", "prompt_eval_duration", "load_duration"):
+                        sample[field] = chunk.get(field)
+        except Exception as e:
+            sample["error"] = f"{type(e).__name__}: {e}"
+        sample["latency"] = time.perf_counter() - start
+        return sample
+
+    def jobs(self, models: Sequence[str]) -> Iterable[tuple]:
+        """各模型的请求交替排列，使所有模型同时承压"""
+        prompts = itertools.cycle(self.prompts)
+        for _ in range(self.requests):
+            for model in models:
+                yield model, next(prompts)
+
+    def run(self, models: Sequence[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """执行压测，返回每个模型的样本列表"""
+        results: Dict[str, List[Dict[str, Any]]] = {model: [] for model in models}
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = [pool.submit(self.run_one, model, prompt) for model, prompt in self.jobs(models)]
+            for future in as_completed(futures):
+                sample = future.result()
+                if sample is not None:
+                    results[sample["model"]].append(sample)
+        self.elapsed = time.perf_counter() - start
+        return results
+
+
+def summarize(samples: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """汇总单个模型的样本"""
+    ok = [s for s in samples if not s["error"]]
+    ttft = [s["ttft"] for s in ok if s["ttft"] is not None]
+    latency = [s["latency"] for s in ok]
+    tokens = sum(s.get("eval_count") or 0 for s in ok)
+    rates = [
+        s["eval_count"] / (s["eval_duration"] / NS)
+        for s in ok
+        if s.get("eval_count") and s.get("eval_duration")
+    ]
+    loads = [s["load_duration"] / NS for s in ok if s.get("load_duration")]
+    prompt_evals = [s["prompt_eval_duration"] / NS for s in ok if s.get("prompt_eval_duration")]
+    return {
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "ttft_p50": percentile(ttft, 50),
+        "ttft_p95": percentile(ttft, 95),
+        "ttft_p99": percentile(ttft, 99),
+        "latency_p50": percentile(latency, 50),
+        "latency_p95": percentile(latency, 95),
+        "latency_p99": percentile(latency, 99),
+        "tokens_per_second": sum(rates) / len(rates) if rates else None,
+        "prompt_eval": sum(prompt_evals) / len(prompt_evals) if prompt_evals else None,
+        "load_max": max(loads) if loads else None,
+        "tokens": tokens,
+        "throughput": tokens / elapsed if elapsed else None,
+    }
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+启动耗时基准：检查单次命令是否误导入了重量级模块，并统计冷启动时间
+
+用法：python benchmarks/startup.py [--runs 10] [--budget-ms 470]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, "main.py")
+
+# 一个不会有服务监听的地址，请求立即失败，只测量启动开销
+DEAD_HOST = "http://127.0.0.1:9"
+
+# 优化前 version 冷启动约 940ms，目标为减少一半以上
+DEFAULT_BUDGET_MS = 470
+
+# 单次 version 命令不应该导入的模块
+FORBIDDEN = (
+    "ollama",
+    "pydantic",
+    "prompt_toolkit",
+    "rich.markdown",
+    "rich.progress",
+    "pygments",
+    "benchmark",
+    "puller",
+    "jobs",
+)
+
+
+def command(name: str) -> List[str]:
+    return [sys.executable, MAIN, name, "-H", DEAD_HOST]
+
+
+def imported_modules(cmd: List[str]) -> Dict[str, int]:
+    """使用 -X importtime 获取导入的模块及其累计耗时（微秒）"""
+    result = subprocess.run(
+        [cmd[0], "-X", "importtime", *cmd[1:]],
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+    )
+    modules: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        try:
+            modules[name.strip()] = int(cumulative.strip())
+        except ValueError:
+            continue
+    return modules
+
+
+def wall_time(cmd: List[str], runs: int) -> float:
+    """多次执行取中位数（毫秒）"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, capture_output=True, cwd=ROOT)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="单次命令冷启动基准")
+    parser.add_argument("--runs", type=int, default=10, help="执行次数，默认为 10")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=DEFAULT_BUDGET_MS,
+        help=f"version 命令冷启动时间上限（毫秒），0 表示不检查，默认为 {DEFAULT_BUDGET_MS}",
+    )
+    args = parser.parse_args()
+
+    failed = False
+    modules = imported_modules(command("version"))
+    leaked = sorted(name for name in modules if name.split(".")[0] in FORBIDDEN or name in FORBIDDEN)
+    if leaked:
+        failed = True
+        print(f"FAIL version 导入了重量级模块: {', '.join(leaked)}")
+
+    top = sorted(modules.items(), key=lambda item: item[1], reverse=True)[:10]
+    print("导入耗时 Top 10（累计，毫秒）:")
+    for name, cumulative in top:
+        print(f"  {cumulative / 1000:8.1f}  {name}")
+
+    baseline = wall_time([sys.executable, "-c", "pass"], args.runs)
+    version = wall_time(command("version"), args.runs)
+    print(f"python 空启动: {baseline:.0f}ms")
+    print(f"main.py version: {version:.0f}ms")
+    if args.budget_ms and version > args.budget_ms:
+        failed = True
+        print(f"FAIL version 冷启动 {version:.0f}ms 超出预算 {args.budget_ms:.0f}ms")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+离线性能基准：针对本地模拟服务器（mockserver.py）测量命令延迟、补全刷新、流式渲染吞吐与多主机扫描速度
+
+用法：
+    python benchmarks/suite.py [--quick] [--json result.json]
+    python benchmarks/suite.py --baseline result.json [--tolerance 0.2]   # 与基线比较，退化超过阈值时返回 1
+"""
+
+import argparse
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from rich.console import Console  # noqa: E402
+from rich.table import Table  # noqa: E402
+
+from benchmark import percentile  # noqa: E402
+from cache import LRUCache  # noqa: E402
+
+# 指标名 -> {value, unit, higher_is_better, ...}
+Results = Dict[str, Dict[str, Any]]
+
+
+@contextmanager
+def mock_servers(count: int = 1, **options: Any) -> Iterator[List[str]]:
+    """在独立进程中启动模拟服务器，避免与被测代码争用 GIL"""
+    cmd = [sys.executable, os.path.join(ROOT, "mockserver.py"), "--port", "0", "--hosts", str(count)]
+    for name, value in options.items():
+        cmd += [f"--{name.replace('_', '-')}", str(value)]
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    try:
+        urls = [process.stdout.readline().strip() for _ in range(count)]
+        if not all(urls):
+            raise RuntimeError("模拟服务器启动失败")
+        yield urls
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def quiet_shell(host: str, **options: Any) -> Any:
+    """输出写入内存的 OllamaShell"""
+    from main import OllamaShell
+
+    shell = OllamaShell(host, **options)
+    shell.console = Console(file=io.StringIO(), width=120)
+    return shell
+
+
+def timings(func: Callable[[], Any], runs: int, warmup: int = 2) -> List[float]:
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def latency_result(samples: List[float]) -> Dict[str, Any]:
+    return {
+        "value": statistics.median(samples) * 1000,
+        "p95": percentile(samples, 95) * 1000,
+        "unit": "ms",
+        "higher_is_better": False,
+    }
+
+
+def rate_result(value: float, unit: str) -> Dict[str, Any]:
+    return {"value": value, "unit": unit, "higher_is_better": True}
+
+
+def bench_commands(runs: int) -> Results:
+    """单个命令从调用到输出完成的耗时"""
+    results: Results = {}
+    with mock_servers(models=32, token_rate=0) as (url,):
+        shell = quiet_shell(url)
+        model = "llama-mock0:latest"
+
+        def show() -> None:
+            # 每次都清空缓存，测量完整的请求路径
+            shell.show_cache = LRUCache(max_size=256)
+            shell.show_model(model)
+
+        cases = {
+            "list": shell.list_models,
+            "ps": shell.show_processes,
+            "version": shell.show_version,
+            "show": show,
+        }
+        for name, func in cases.items():
+            results[f"command.{name}"] = latency_result(timings(func, runs))
+        shell.session.close()
+    return results
+
+
+def bench_completer(runs: int) -> Results:
+    """模型列表刷新并重建补全器，以及在大模型列表上的补全查询"""
+    from prompt_toolkit.completion import CompleteEvent
+    from prompt_toolkit.document import Document
+
+    results: Results = {}
+    with mock_servers(models=500, token_rate=0) as (url,):
+        shell = quiet_shell(url, model_cache_ttl=0)
+
+        def refresh() -> None:
+            shell.model_cache.refresh()
+            shell.get_command_completer()
+
+        results["completer.refresh"] = latency_result(timings(refresh, runs))
+
+        completer = shell.get_command_completer()
+        document = Document("chat llama-mock1")
+        event = CompleteEvent(completion_requested=True)
+
+        def complete() -> None:
+            list(completer.get_completions(document, event))
+
+        results["completer.query"] = latency_result(timings(complete, runs))
+        shell.session.close()
+    return results
+
+
+def bench_render(tokens: int) -> Results:
+    """流式渲染吞吐：纯渲染（不经过网络）与经过模拟服务器的完整对话"""
+    from render import StreamRenderer
+
+    results: Results = {}
+    console = Console(file=io.StringIO(), width=100, force_terminal=True)
+    words = [f"word{i % 50} " + ("\n\n" if i % 40 == 39 else "") for i in range(tokens)]
+    start = time.perf_counter()
+    with StreamRenderer(console) as renderer:
+        for word in words:
+            renderer.feed(word)
+    results["render.feed"] = rate_result(tokens / (time.perf_counter() - start), "tokens/s")
+
+    with mock_servers(models=4, token_rate=0, tokens=tokens) as (url,):
+        shell = quiet_shell(url)
+        start = time.perf_counter()
+        with StreamRenderer(console) as renderer:
+            for chunk in shell.client.chat("llama-mock0", messages=[{"role": "user", "content": "hi"}], stream=True):
+                renderer.feed(chunk["message"]["content"])
+        results["render.chat"] = rate_result(tokens / (time.perf_counter() - start), "tokens/s")
+        shell.session.close()
+    return results
+
+
+def bench_scan(hosts: int, dead: int) -> Results:
+    """多主机扫描速度（含不可达主机）"""
+    from scanner import Scanner
+
+    results: Results = {}
+    with mock_servers(hosts, models=16, latency=0.005, jitter=0.01) as urls:
+        # 本地未监听的端口，连接立即被拒绝
+        targets = urls + [f"http://127.0.0.1:{9 + i % 2}" for i in range(dead)]
+        for details in (False, True):
+            scanner = Scanner(concurrency=100, connect_timeout=1.0, read_timeout=5.0, details=details)
+            stats = scanner.scan(targets, lambda result: None)
+            name = "scan.details" if details else "scan.basic"
+            results[name] = rate_result(stats["total"] / stats["elapsed"], "hosts/s")
+    return results
+
+
+def compare(results: Results, baseline: Results, tolerance: float) -> List[str]:
+    """与基线比较，返回退化的指标"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base or not base.get("value"):
+            continue
+        ratio = result["value"] / base["value"]
+        worse = ratio < 1 - tolerance if result["higher_is_better"] else ratio > 1 + tolerance
+        result["baseline"] = base["value"]
+        result["change"] = ratio - 1
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="离线性能基准")
+    parser.add_argument("--quick", action="store_true", help="减少迭代次数，快速检查")
+    parser.add_argument("--only", help="只运行指定的分组，逗号分隔：commands,completer,render,scan")
+    parser.add_argument("--json", help="结果写入 JSON 文件，可作为之后比较的基线")
+    parser.add_argument("--baseline", help="基线结果（JSON）")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许的退化比例，默认为 0.2")
+    args = parser.parse_args()
+
+    runs = 10 if args.quick else 50
+    groups: Dict[str, Callable[[], Results]] = {
+        "commands": lambda: bench_commands(runs),
+        "completer": lambda: bench_completer(runs),
+        "render": lambda: bench_render(2000 if args.quick else 10000),
+        "scan": lambda: bench_scan(10 if args.quick else 50, 10 if args.quick else 50),
+    }
+    selected = args.only.split(",") if args.only else list(groups)
+
+    console = Console()
+    results: Results = {}
+    for name in selected:
+        with console.status(f"[bold blue]运行 {name}..."):
+            results.update(groups[name]())
+
+    regressions: List[str] = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+
+    table = Table(title="📊 基准测试结果", show_header=True, header_style="bold magenta")
+    table.add_column("指标", style="cyan")
+    table.add_column("数值", justify="right", style="green")
+    table.add_column("p95", justify="right")
+    table.add_column("单位")
+    table.add_column("与基线相比", justify="right")
+    for name, result in results.items():
+        change = result.get("change")
+        if change is None:
+            change_text = "-"
+        else:
+            style = "red" if name in regressions else "dim"
+            change_text = f"[{style}]{change * 100:+.1f}%[/{style}]"
+        p95 = result.get("p95")
+        table.add_row(name, f"{result['value']:.2f}", "-" if p95 is None else f"{p95:.2f}", result["unit"], change_text)
+    console.print(table)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if regressions:
+        console.print(f"[red]❌ 性能退化超过 {args.tolerance * 100:.0f}%: {', '.join(regressions)}[/red]")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
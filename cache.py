@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+本地缓存
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class ModelListCache:
+    """带 TTL 的模型列表缓存，过期后在后台线程刷新，读取永不阻塞"""
+
+    def __init__(self, fetch: Callable[[], List[str]], ttl: float = 30.0):
+        self.fetch = fetch
+        self.ttl = ttl
+        # 模型集合每变化一次 version 加一，调用方据此判断是否需要重建
+        self.version = 0
+        self._models: Tuple[str, ...] = ()
+        self._expires = 0.0
+        # invalidate 每调用一次加一，之前开始的刷新取得的可能是旧列表，不再采用
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def get(self) -> Tuple[str, ...]:
+        """返回当前缓存，过期时触发后台刷新"""
+        if time.monotonic() >= self._expires:
+            self.refresh_async()
+        return self._models
+
+    def refresh(self) -> None:
+        """同步刷新，获取失败时保留旧数据"""
+        with self._lock:
+            generation = self._generation
+        try:
+            models: Optional[Tuple[str, ...]] = tuple(self.fetch())
+        except Exception:
+            models = None
+        with self._lock:
+            self._refreshing = False
+            if generation != self._generation:
+                # 刷新期间模型被拉取或删除，保持过期状态，下次读取时重新获取
+                return
+            self._expires = time.monotonic() + self.ttl
+            if models is not None and models != self._models:
+                self._models = models
+                self.version += 1
+
+    def refresh_async(self) -> Optional[threading.Thread]:
+        """在后台线程刷新，已有刷新在进行时直接返回"""
+        with self._lock:
+            if self._refreshing:
+                return None
+            self._refreshing = True
+        thread = threading.Thread(target=self.refresh, daemon=True)
+        thread.start()
+        return thread
+
+    def invalidate(self) -> None:
+        """使缓存立即过期，下次读取时刷新"""
+        with self._lock:
+            self._expires = 0.0
+            self._generation += 1
+
+
+class LRUCache:
+    """线程安全的 LRU 缓存，超出容量时淘汰最久未使用的条目"""
+
+    def __init__(self, max_size: int = 256):
+        if max_size < 1:
+            raise ValueError("缓存容量必须大于 0")
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+模型索引：每次获取模型列表后建立一次，按家族、量化等级、大小筛选，按名称片段前缀或模糊匹配查找，
+模型数量很多时 list 的筛选 / 排序 / 分页与命令补全都不必每次遍历原始数据
+"""
+
+import bisect
+import fnmatch
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from records import model_record
+
+PARAMETER_UNITS = {"K": 1e3, "M": 1e6, "B": 1e9, "T": 1e12}
+# 排序方式 -> (排序键, 默认是否倒序)；大小、参数量与修改时间默认从大到新排在前面
+SORT_KEYS: Dict[str, Tuple[Callable[[Dict[str, Any]], Any], bool]] = {
+    "name": (lambda record: record["name"].lower(), False),
+    "size": (lambda record: record["size"] or 0, True),
+    "modified": (lambda record: record["modified_at"].timestamp() if record["modified_at"] else 0, True),
+    "params": (lambda record: parse_parameter_size(record["parameter_size"]) or 0, True),
+}
+SEGMENT_SEPARATORS = re.compile(r"[-_:/.]")
+
+
+def parse_parameter_size(value: Any) -> Optional[float]:
+    """8B / 7.6B / 137M 转换为参数个数，无法识别时返回 None"""
+    match = re.fullmatch(r"\s*([\d.]+)\s*([KMBT])\s*", str(value or "").upper())
+    if not match:
+        return None
+    return float(match.group(1)) * PARAMETER_UNITS[match.group(2)]
+
+
+def name_matcher(pattern: str) -> Callable[[str], bool]:
+    """/.../ 为正则表达式，含 * ? [ 时按通配符匹配完整名称，否则为子串匹配，均不区分大小写"""
+    if len(pattern) > 1 and pattern.startswith("/") and pattern.endswith("/"):
+        try:
+            regex = re.compile(pattern[1:-1], re.IGNORECASE)
+        except re.error as e:
+            raise ValueError(f"正则表达式错误: {e}")
+        return lambda name: regex.search(name) is not None
+    if any(char in pattern for char in "*?["):
+        regex = re.compile(fnmatch.translate(pattern), re.IGNORECASE)
+        return lambda name: regex.match(name) is not None
+    needle = pattern.lower()
+    return lambda name: needle in name.lower()
+
+
+class ModelIndex:
+    """/api/tags 结果的内存索引
+
+    records 与 model_record 的输出一致；家族、量化等级建立倒排表，大小保存有序数组以便二分查找范围，
+    各排序方式的顺序在第一次使用时计算并缓存。
+    """
+
+    def __init__(self, records: List[Dict[str, Any]], families: List[str]):
+        self.records = records
+        self.families = families
+        self.by_family: Dict[str, List[int]] = {}
+        self.by_quantization: Dict[str, List[int]] = {}
+        for i, record in enumerate(records):
+            self.by_family.setdefault(families[i].lower(), []).append(i)
+            self.by_quantization.setdefault(str(record["quantization_level"]).lower(), []).append(i)
+        self._by_size = sorted(range(len(records)), key=lambda i: records[i]["size"] or 0)
+        self._sizes = [records[i]["size"] or 0 for i in self._by_size]
+        self._orders: Dict[str, List[int]] = {}
+
+    @classmethod
+    def from_models(cls, models: Iterable[Any]) -> "ModelIndex":
+        records, families = [], []
+        for model in models:
+            records.append(model_record(model))
+            families.append((model.details.family if model.details else None) or "Unknown")
+        return cls(records, families)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def order(self, sort: str) -> List[int]:
+        if sort not in SORT_KEYS:
+            raise ValueError(f"未知的排序方式: {sort}，可选 {' / '.join(SORT_KEYS)}")
+        if sort not in self._orders:
+            key, reverse = SORT_KEYS[sort]
+            self._orders[sort] = sorted(range(len(self.records)), key=lambda i: key(self.records[i]), reverse=reverse)
+        return self._orders[sort]
+
+    def size_range(self, min_size: Optional[int] = None, max_size: Optional[int] = None) -> Set[int]:
+        low = bisect.bisect_left(self._sizes, min_size) if min_size is not None else 0
+        high = bisect.bisect_right(self._sizes, max_size) if max_size is not None else len(self._sizes)
+        return set(self._by_size[low:high])
+
+    def query(
+        self,
+        pattern: Optional[str] = None,
+        family: Optional[str] = None,
+        quantization: Optional[str] = None,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        sort: str = "name",
+        reverse: bool = False,
+        limit: Optional[int] = None,
+        page: int = 1,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """返回 (当前页的记录, 符合条件的总数)"""
+        if page < 1 or (limit is not None and limit < 1):
+            raise ValueError("页码与每页数量必须大于 0")
+        # 先用索引缩小范围，再逐个匹配名称
+        candidates: Optional[Set[int]] = None
+        for ids in (
+            None if family is None else set(self.by_family.get(family.lower(), ())),
+            None if quantization is None else set(self.by_quantization.get(quantization.lower(), ())),
+            None if min_size is None and max_size is None else self.size_range(min_size, max_size),
+        ):
+            if ids is not None:
+                candidates = ids if candidates is None else candidates & ids
+        matches = name_matcher(pattern) if pattern else None
+        order = self.order(sort)
+        selected = [
+            i
+            for i in (reversed(order) if reverse else order)
+            if (candidates is None or i in candidates) and (matches is None or matches(self.records[i]["name"]))
+        ]
+        start = (page - 1) * limit if limit else 0
+        end = start + limit if limit else None
+        return [self.records[i] for i in selected[start:end]], len(selected)
+
+
+class NameIndex:
+    """名称补全索引
+
+    名称按 - _ : / . 拆成片段，(片段, 名称) 排序后二分查找前缀，输入 "mock1" 也能找到 "llama-mock1:latest"；
+    前缀没有结果时再按子序列做模糊匹配，结果数量有上限，几千个名称时每次按键仍然很快。
+    """
+
+    def __init__(self, names: Iterable[str], max_results: int = 50):
+        self.names = sorted(set(names), key=str.lower)
+        self.max_results = max_results
+        self._lower = [name.lower() for name in self.names]
+        segments = set()
+        for i, name in enumerate(self._lower):
+            segments.add((name, i))
+            for match in SEGMENT_SEPARATORS.finditer(name):
+                segments.add((name[match.end():], i))
+        self._segments = sorted(segments)
+
+    def prefix(self, text: str) -> List[str]:
+        """名称或名称中某个片段以 text 开头，完整名称的前缀匹配排在前面"""
+        text = text.lower()
+        found: List[int] = []
+        seen: Set[int] = set()
+        start = bisect.bisect_left(self._lower, text)
+        for i in range(start, len(self._lower)):
+            if not self._lower[i].startswith(text) or len(found) >= self.max_results:
+                break
+            found.append(i)
+            seen.add(i)
+        for position in range(bisect.bisect_left(self._segments, (text, -1)), len(self._segments)):
+            segment, i = self._segments[position]
+            if not segment.startswith(text) or len(found) >= self.max_results:
+                break
+            if i not in seen:
+                found.append(i)
+                seen.add(i)
+        return [self.names[i] for i in found]
+
+    def fuzzy(self, text: str) -> List[str]:
+        """text 中的字符按顺序出现在名称中即为匹配，字符越集中得分越高"""
+        text = text.lower()
+        scored = []
+        for i, name in enumerate(self._lower):
+            position, start, gaps = -1, -1, 0
+            for char in text:
+                found = name.find(char, position + 1)
+                if found < 0:
+                    break
+                if start < 0:
+                    start = found
+                elif found > position + 1:
+                    gaps += found - position - 1
+                position = found
+            else:
+                scored.append((gaps, start, len(name), i))
+        scored.sort()
+        return [self.names[i] for *_, i in scored[: self.max_results]]
+
+    def complete(self, text: str) -> List[str]:
+        if not text:
+            return self.names[: self.max_results]
+        # 前缀没有结果时才做模糊匹配
+        return self.prefix(text) or self.fuzzy(text)
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+交互模式的命令补全：第一个词补全命令，接受模型名称的命令之后用 NameIndex 补全模型
+"""
+
+from typing import Iterable, Iterator, List
+
+from prompt_toolkit.completion import CompleteEvent, Completer, Completion
+from prompt_toolkit.document import Document
+
+from catalog import NameIndex
+
+# 参数为模型名称的命令
+MODEL_COMMANDS = ("chat", "show", "pull", "rm", "bench", "embed", "warm", "unload")
+
+
+class ShellCompleter(Completer):
+    """与 WordCompleter 不同，模型名称通过索引查找，不随模型数量线性变慢"""
+
+    def __init__(self, commands: Iterable[str], models: NameIndex, model_commands: Iterable[str] = MODEL_COMMANDS):
+        self.commands: List[str] = sorted(commands)
+        self.models = models
+        self.model_commands = set(model_commands)
+
+    def get_completions(self, document: Document, complete_event: CompleteEvent) -> Iterator[Completion]:
+        text = document.text_before_cursor.lstrip()
+        if " " not in text:
+            prefix = text.lower()
+            for command in self.commands:
+                if command.startswith(prefix):
+                    yield Completion(command, start_position=-len(text))
+            return
+        if text.split(" ", 1)[0].lower() not in self.model_commands:
+            return
+        word = document.get_word_before_cursor(WORD=True)
+        if word.startswith("-"):
+            return
+        for name in self.models.complete(word):
+            yield Completion(name, start_position=-len(word))
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+"""
+本地数据目录
+"""
+
+import os
+
+# 拉取队列、扫描结果等持久化数据的存放位置，可通过环境变量覆盖
+DATA_DIR = os.environ.get("OLLAMA_SCAN_HOME", os.path.join(os.path.expanduser("~"), ".ollama-scan"))
+
+
+def data_path(name: str) -> str:
+    """返回数据目录下的文件路径，目录不存在时自动创建"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    return os.path.join(DATA_DIR, name)
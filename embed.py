@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+批量向量化：流式读取文本并分批请求 /api/embed，多个批次流水线并发，向量以 float32 .npy 写出
+"""
+
+import json
+import struct
+import sys
+import threading
+import time
+from array import array
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+# 预留固定长度的头部，写完后原地改写行数
+NPY_HEADER_LEN = 128
+
+Batch = List[Tuple[int, str]]
+
+
+def npy_header(descr: str, shape: Tuple[int, ...]) -> bytes:
+    """生成 .npy（1.0 版）文件头，总长度固定为 NPY_HEADER_LEN"""
+    header = f"{{'descr': '{descr}', 'fortran_order': False, 'shape': {shape!r}, }}"
+    length = NPY_HEADER_LEN - len(NPY_MAGIC) - 2
+    if len(header) + 1 > length:
+        raise ValueError("npy 文件头过长")
+    return NPY_MAGIC + struct.pack("<H", length) + header.ljust(length - 1).encode("latin1") + b"\n"
+
+
+class NpyWriter:
+    """逐行追加写入二维 .npy 数组，可直接用 numpy.load(path, mmap_mode="r") 打开
+
+    不依赖 numpy：数据按本机字节序的 array 写出，关闭时回填行数。
+    """
+
+    def __init__(self, path: str, typecode: str = "f"):
+        self.path = path
+        self.typecode = typecode
+        order = "<" if sys.byteorder == "little" else ">"
+        self.descr = order + {"f": "f4", "q": "i8"}[typecode]
+        self.rows = 0
+        self.dim: Optional[int] = None
+        self._file = open(path, "wb")
+        self._file.write(npy_header(self.descr, (0,)))
+
+    def write_values(self, values: Sequence[Any]) -> None:
+        """追加一维数据"""
+        self._file.write(array(self.typecode, values).tobytes())
+        self.rows += len(values)
+
+    def write_rows(self, rows: Sequence[Sequence[float]]) -> None:
+        """追加若干行，每行长度必须一致"""
+        data = array(self.typecode)
+        for row in rows:
+            if self.dim is None:
+                self.dim = len(row)
+            elif len(row) != self.dim:
+                raise ValueError(f"向量维度不一致: {len(row)} != {self.dim}")
+            data.extend(row)
+        self._file.write(data.tobytes())
+        self.rows += len(rows)
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        shape = (self.rows,) if self.dim is None else (self.rows, self.dim)
+        self._file.seek(0)
+        self._file.write(npy_header(self.descr, shape))
+        self._file.close()
+
+    def __enter__(self) -> "NpyWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def index_path(output: str) -> str:
+    """偏移索引文件：第 i 个值为第 i 行向量对应文本在输入文件中的字节偏移"""
+    base = output[:-4] if output.endswith(".npy") else output
+    return f"{base}.offsets.npy"
+
+
+def iter_batches(path: str, batch_size: int, field: Optional[str] = None) -> Iterator[Batch]:
+    """逐行读取输入并分批，每批为 [(字节偏移, 文本)]；指定 field 时每行按 JSON 解析并取该字段"""
+    batch: Batch = []
+    with open(path, "rb") as f:
+        offset = 0
+        for number, raw in enumerate(f, 1):
+            line_offset = offset
+            offset += len(raw)
+            line = raw.strip()
+            if not line:
+                continue
+            text = line.decode("utf-8")
+            if field:
+                try:
+                    text = json.loads(text)[field]
+                except (ValueError, KeyError, TypeError):
+                    raise ValueError(f"第 {number} 行不是包含 {field} 字段的 JSON 对象")
+            batch.append((line_offset, text))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+class EmbedRunner:
+    """流水线式批量向量化
+
+    最多 concurrency 个批次同时在途，结果按输入顺序写出，内存占用只与批大小和并发数有关。
+    """
+
+    def __init__(
+        self,
+        session: Any,
+        model: str,
+        batch_size: int = 64,
+        concurrency: int = 4,
+        keep_alive: Optional[str] = None,
+        truncate: bool = True,
+        cancelled: Optional[threading.Event] = None,
+    ):
+        if batch_size < 1 or concurrency < 1:
+            raise ValueError("批大小和并发数必须大于 0")
+        self.session = session
+        self.model = model
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.keep_alive = keep_alive
+        self.truncate = truncate
+        self.docs = 0
+        self.failed = 0
+        self.batches = 0
+        self.prompt_tokens = 0
+        self.elapsed = 0.0
+        self.errors: List[str] = []
+        self.cancelled = cancelled or threading.Event()
+
+    def embed_batch(self, batch: Batch) -> Tuple[List[List[float]], int]:
+        """请求一个批次；直接解析原始 JSON，不经过 pydantic 校验，避免逐个浮点数的开销"""
+        payload: Dict[str, Any] = {
+            "model": self.model,
+            "input": [text for _, text in batch],
+            "truncate": self.truncate,
+        }
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        data = self.session.post_json("/api/embed", payload)
+        embeddings = data.get("embeddings") or []
+        if len(embeddings) != len(batch):
+            raise ValueError(f"返回的向量数 {len(embeddings)} 与输入数 {len(batch)} 不一致")
+        return embeddings, data.get("prompt_eval_count") or 0
+
+    def _write(self, batch: Batch, future: Future, vectors: NpyWriter, offsets: NpyWriter) -> None:
+        try:
+            embeddings, tokens = future.result()
+        except Exception as e:
+            # 失败的批次不写入，偏移索引仍与向量逐行对应
+            self.failed += len(batch)
+            self.errors.append(f"{type(e).__name__}: {e}")
+            return
+        vectors.write_rows(embeddings)
+        offsets.write_values([offset for offset, _ in batch])
+        self.docs += len(batch)
+        self.prompt_tokens += tokens
+
+    def run(
+        self,
+        path: str,
+        output: str,
+        field: Optional[str] = None,
+        on_batch: Optional[Callable[["EmbedRunner"], None]] = None,
+    ) -> Dict[str, Any]:
+        """向量化 path 中的每一行，向量写入 output，字节偏移写入 index_path(output)"""
+        start = time.perf_counter()
+        pending: Deque[Tuple[Batch, Future]] = deque()
+        with NpyWriter(output) as vectors, NpyWriter(index_path(output), "q") as offsets:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                try:
+                    for batch in iter_batches(path, self.batch_size, field):
+                        if self.cancelled.is_set():
+                            break
+                        # 窗口已满时等待最早的批次完成并写出，保证输出顺序与输入一致
+                        if len(pending) >= self.concurrency:
+                            self._write(*pending.popleft(), vectors, offsets)
+                            if on_batch is not None:
+                                on_batch(self)
+                        pending.append((batch, pool.submit(self.embed_batch, batch)))
+                        self.batches += 1
+                    while pending:
+                        self._write(*pending.popleft(), vectors, offsets)
+                        if on_batch is not None:
+                            on_batch(self)
+                except KeyboardInterrupt:
+                    self.cancelled.set()
+                    for _, future in pending:
+                        future.cancel()
+                    raise
+        self.elapsed = time.perf_counter() - start
+        return self.stats(vectors.dim)
+
+    def stats(self, dim: Optional[int] = None) -> Dict[str, Any]:
+        return {
+            "docs": self.docs,
+            "failed": self.failed,
+            "batches": self.batches,
+            "dim": dim,
+            "prompt_tokens": self.prompt_tokens,
+            "elapsed": self.elapsed,
+            "docs_per_second": self.docs / self.elapsed if self.elapsed else None,
+        }
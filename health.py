@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+主机健康状态：预检探测、基于延迟 EWMA 的自适应超时与熔断，不可达的主机快速失败
+"""
+
+import socket
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+# 只读的轻量接口，耗时只与网络和服务器负载有关，可以使用自适应的读取超时
+CONTROL_PATHS = {"/api/version", "/api/tags", "/api/ps", "/api/show"}
+# 网关 / 服务不可用类的状态码视为主机故障，其余 5xx 通常是模型本身的错误
+UNAVAILABLE_STATUS = {502, 503, 504}
+# 与请求内容无关、说明主机本身不可达的错误
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+
+
+class CircuitOpenError(ConnectionError):
+    """熔断期间的请求直接失败，不再等待超时"""
+
+    def __init__(self, host: str, failures: int, retry_in: float, reason: Optional[str] = None):
+        self.host = host
+        self.failures = failures
+        self.retry_in = retry_in
+        self.reason = reason
+        message = f"{host} 已熔断（连续失败 {failures} 次），{retry_in:.0f}s 后重试"
+        if reason:
+            message += f"，最近错误: {reason}"
+        super().__init__(message)
+
+
+class HostHealth:
+    """单个主机的健康状态
+
+    延迟按 TCP 重传超时的算法维护平滑均值与平均偏差（SRTT / RTTVAR），
+    超时取 SRTT + 4 * RTTVAR 并限制在上下限之间；连续失败达到阈值后熔断，
+    冷却期内的请求立即失败，冷却结束后先做一次探测再放行。
+    """
+
+    def __init__(
+        self,
+        host: str,
+        alpha: float = 0.125,
+        beta: float = 0.25,
+        failure_threshold: int = 3,
+        cooldown: float = 5.0,
+        max_cooldown: float = 60.0,
+        min_connect: float = 0.5,
+        max_connect: float = 5.0,
+        min_read: float = 2.0,
+        max_read: float = 30.0,
+    ):
+        self.host = host
+        self.alpha = alpha
+        self.beta = beta
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.min_connect = min_connect
+        self.max_connect = max_connect
+        self.min_read = min_read
+        self.max_read = max_read
+        self.srtt: Optional[float] = None
+        self.rttvar = 0.0
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.open_until = 0.0
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def observe(self, latency: Optional[float] = None) -> None:
+        """记录一次成功的请求，latency 为空时只重置失败计数"""
+        with self._lock:
+            if latency is not None and self.srtt is None:
+                self.srtt = latency
+                self.rttvar = latency / 2
+            elif latency is not None:
+                self.rttvar = (1 - self.beta) * self.rttvar + self.beta * abs(self.srtt - latency)
+                self.srtt = (1 - self.alpha) * self.srtt + self.alpha * latency
+            self.failures = 0
+            self.trips = 0
+            self.state = CLOSED
+
+    def fail(self, error: str, trip: bool = False) -> None:
+        """记录一次传输层失败，连续失败达到阈值（或 trip 为真）时熔断"""
+        with self._lock:
+            self.failures += 1
+            self.last_error = error
+            if trip or self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self._trip()
+
+    def _trip(self) -> None:
+        # 连续熔断时冷却时间指数增长
+        self.trips += 1
+        delay = min(self.cooldown * (2 ** (self.trips - 1)), self.max_cooldown)
+        self.state = OPEN
+        self.open_until = time.monotonic() + delay
+
+    def check(self) -> bool:
+        """熔断中且仍在冷却期内时抛出 CircuitOpenError；冷却结束返回 True，表示需要先探测"""
+        with self._lock:
+            if self.state == CLOSED:
+                return False
+            remaining = self.open_until - time.monotonic()
+            if self.state == OPEN and remaining > 0:
+                raise CircuitOpenError(self.host, self.failures, remaining, self.last_error)
+            self.state = HALF_OPEN
+            return True
+
+    @property
+    def rto(self) -> Optional[float]:
+        if self.srtt is None:
+            return None
+        return self.srtt + 4 * self.rttvar
+
+    def connect_timeout(self) -> float:
+        rto = self.rto
+        if rto is None:
+            return self.max_connect
+        return min(max(rto, self.min_connect), self.max_connect)
+
+    def read_timeout(self) -> float:
+        rto = self.rto
+        if rto is None:
+            return self.max_read
+        return min(max(2 * rto + 1.0, self.min_read), self.max_read)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "host": self.host,
+                "state": self.state,
+                "srtt": self.srtt,
+                "rttvar": self.rttvar,
+                "failures": self.failures,
+                "last_error": self.last_error,
+                "retry_in": max(self.open_until - time.monotonic(), 0.0) if self.state == OPEN else 0.0,
+            }
+
+
+class HealthTransport(httpx.BaseTransport):
+    """包装 HTTPTransport：请求前检查熔断状态并设置自适应超时，请求后更新健康状态
+
+    只有连接失败与控制类接口（CONTROL_PATHS）的失败计入熔断；chat / generate / pull 等长请求的
+    读取超时或中途断开可能只是这次生成太慢，不应让整台主机的所有请求都快速失败。
+    """
+
+    def __init__(self, transport: httpx.BaseTransport, health: HostHealth, timeout: httpx.Timeout):
+        self.transport = transport
+        self.health = health
+        self.timeout = timeout
+        parts = urlsplit(health.host)
+        self.address = (parts.hostname or "localhost", parts.port or (443 if parts.scheme == "https" else 80))
+        self._probe_lock = threading.Lock()
+
+    def probe(self) -> float:
+        """预检：TCP 连接 + /api/version，返回耗时，失败时抛出异常"""
+        connect = self.health.connect_timeout()
+        start = time.perf_counter()
+        try:
+            with socket.create_connection(self.address, timeout=connect):
+                pass
+            request = httpx.Request(
+                "GET",
+                f"{self.health.host.rstrip('/')}/api/version",
+                extensions={"timeout": httpx.Timeout(self.health.read_timeout(), connect=connect).as_dict()},
+            )
+            response = self.transport.handle_request(request)
+            try:
+                response.read()
+            finally:
+                response.close()
+            if response.status_code in UNAVAILABLE_STATUS:
+                raise httpx.HTTPStatusError(f"HTTP {response.status_code}", request=request, response=response)
+        except (OSError, httpx.HTTPError) as e:
+            # 预检失败说明主机确实不可用，直接熔断
+            self.health.fail(type(e).__name__, trip=True)
+            raise
+        latency = time.perf_counter() - start
+        self.health.observe(latency)
+        return latency
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if self.health.check():
+            # 冷却结束后只放行一个探测，其余请求等待探测结果
+            with self._probe_lock:
+                if self.health.check():
+                    try:
+                        self.probe()
+                    except (OSError, httpx.HTTPError) as e:
+                        state = self.health.snapshot()
+                        raise CircuitOpenError(
+                            self.health.host, state["failures"], state["retry_in"], state["last_error"]
+                        ) from e
+
+        control = request.url.path in CONTROL_PATHS
+        timeout = dict(request.extensions.get("timeout") or self.timeout.as_dict())
+        timeout["connect"] = min(timeout.get("connect") or self.health.max_connect, self.health.connect_timeout())
+        if control:
+            timeout["read"] = self.health.read_timeout()
+        request.extensions["timeout"] = timeout
+
+        start = time.perf_counter()
+        try:
+            response = self.transport.handle_request(request)
+        except httpx.TransportError as e:
+            if control or isinstance(e, CONNECT_ERRORS):
+                self.health.fail(type(e).__name__)
+            raise
+        if response.status_code in UNAVAILABLE_STATUS:
+            if control:
+                self.health.fail(f"HTTP {response.status_code}")
+        else:
+            # 生成类接口的耗时取决于模型推理，不计入网络延迟
+            self.health.observe(time.perf_counter() - start if control else None)
+        return response
+
+    def close(self) -> None:
+        self.transport.close()
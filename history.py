@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+多轮对话历史
+"""
+
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+Message = Dict[str, str]
+
+
+class ChatHistory:
+    """按字符预算保留最近的若干轮对话
+
+    以“轮”（一问一答）为单位从最早的开始淘汰，未淘汰部分的消息前缀保持不变，
+    服务器可以复用上一轮的 prompt 缓存。
+    """
+
+    def __init__(self, max_chars: int = 16000, system: Optional[str] = None):
+        self.max_chars = max_chars
+        self.system = system
+        self._turns: Deque[Tuple[Message, Message]] = deque()
+        self._chars = 0
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+    @property
+    def chars(self) -> int:
+        return self._chars
+
+    def messages(self, message: Optional[str] = None) -> List[Message]:
+        """返回发送给服务器的消息列表，message 为本轮新的用户输入"""
+        messages: List[Message] = []
+        if self.system:
+            messages.append({"role": "system", "content": self.system})
+        for user, assistant in self._turns:
+            messages.append(user)
+            messages.append(assistant)
+        if message is not None:
+            messages.append({"role": "user", "content": message})
+        return messages
+
+    def add(self, message: str, answer: str) -> None:
+        """记录一轮完整的对话，超出预算时淘汰最早的轮次"""
+        turn = ({"role": "user", "content": message}, {"role": "assistant", "content": answer})
+        self._turns.append(turn)
+        self._chars += len(message) + len(answer)
+        # 至少保留最新一轮
+        while self._chars > self.max_chars and len(self._turns) > 1:
+            user, assistant = self._turns.popleft()
+            self._chars -= len(user["content"]) + len(assistant["content"])
+
+    def clear(self) -> None:
+        self._turns.clear()
+        self._chars = 0
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+请求级性能统计：通过 httpx 事件钩子记录连接、发送、等待、接收各阶段耗时、传输字节数与服务器统计，
+渲染耗时同样计入；数据可在 stats 命令中查看，或导出为 Chrome trace 格式（chrome://tracing / Perfetto）
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+import httpx
+from rich.console import Console
+
+# httpcore 的 trace 事件名（去掉 http11 / http2 前缀）到阶段名，连接阶段包含 DNS 解析
+PHASES = {
+    "connect_tcp": "connect",
+    "start_tls": "tls",
+    "send_request_headers": "send",
+    "send_request_body": "send",
+    "receive_response_headers": "wait",
+    "receive_response_body": "body",
+}
+# 生成类接口最后一个分块中服务器返回的耗时（纳秒）
+SERVER_FIELDS = {
+    "total_duration": "server.total",
+    "load_duration": "server.load",
+    "prompt_eval_duration": "server.prompt_eval",
+    "eval_duration": "server.eval",
+}
+SERVER_PATHS = {"/api/chat", "/api/generate", "/api/embed"}
+# 直方图按 2 的幂分桶：0.25ms, 0.5ms, ..., 约 16s
+HISTOGRAM_BASE = 0.00025
+HISTOGRAM_BUCKETS = 17
+BARS = " ▁▂▃▄▅▆▇█"
+
+
+def histogram(values: List[float]) -> List[int]:
+    counts = [0] * HISTOGRAM_BUCKETS
+    for value in values:
+        bucket = 0
+        edge = HISTOGRAM_BASE
+        while value > edge and bucket < HISTOGRAM_BUCKETS - 1:
+            bucket += 1
+            edge *= 2
+        counts[bucket] += 1
+    return counts
+
+
+def sparkline(counts: List[int]) -> str:
+    peak = max(counts) if counts else 0
+    if not peak:
+        return " " * len(counts)
+    return "".join(BARS[0] if not c else BARS[max(1, round(c / peak * (len(BARS) - 1)))] for c in counts)
+
+
+class Tracer:
+    """线程安全的耗时记录器
+
+    每个指标只保留最近 max_samples 个样本；只有开启 trace 时才保存逐个 span，避免长时间运行占用内存。
+    """
+
+    def __init__(self, max_samples: int = 4096):
+        self.max_samples = max_samples
+        self.t0 = time.perf_counter()
+        self.pid = os.getpid()
+        self.metrics: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=self.max_samples))
+        self.counters: Dict[str, float] = defaultdict(float)
+        self.events: Optional[List[Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+
+    def enable_trace(self) -> None:
+        self.events = []
+
+    def reset(self) -> None:
+        with self._lock:
+            self.metrics.clear()
+            self.counters.clear()
+            if self.events is not None:
+                self.events = []
+
+    def record(self, metric: str, value: float) -> None:
+        with self._lock:
+            self.metrics[metric].append(value)
+
+    def count(self, counter: str, value: float = 1) -> None:
+        with self._lock:
+            self.counters[counter] += value
+
+    def add_span(
+        self,
+        name: str,
+        category: str,
+        start: float,
+        end: float,
+        metric: Optional[str] = None,
+        args: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """记录一个 span，metric 不为空时同时计入该指标的统计"""
+        with self._lock:
+            if metric:
+                self.metrics[metric].append(end - start)
+            if self.events is not None:
+                self.events.append(
+                    {
+                        "name": name,
+                        "cat": category,
+                        "ph": "X",
+                        "ts": (start - self.t0) * 1e6,
+                        "dur": (end - start) * 1e6,
+                        "pid": self.pid,
+                        "tid": threading.get_ident(),
+                        "args": args or {},
+                    }
+                )
+
+    @contextmanager
+    def span(self, name: str, category: str = "app", metric: Optional[str] = None, **args: Any) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(name, category, start, time.perf_counter(), metric, args)
+
+    def event_hooks(self) -> Dict[str, List[Any]]:
+        """httpx.Client 的 event_hooks 参数"""
+        return {"request": [self._on_request], "response": [self._on_response]}
+
+    def _on_request(self, request: httpx.Request) -> None:
+        trace = RequestTrace(self, request)
+        request.extensions["trace"] = trace.on_event
+        request.extensions["ollama_scan.trace"] = trace
+
+    def _on_response(self, response: httpx.Response) -> None:
+        trace = response.request.extensions.get("ollama_scan.trace")
+        if trace is None:
+            return
+        trace.headers(response)
+        response.stream = CountingStream(response.stream, trace)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """每个指标的样本数、均值、分位数与直方图（单位：秒）"""
+        from benchmark import percentile
+
+        with self._lock:
+            metrics = {name: list(values) for name, values in self.metrics.items()}
+        result = {}
+        for name, values in sorted(metrics.items()):
+            if not values:
+                continue
+            result[name] = {
+                "count": len(values),
+                "mean": sum(values) / len(values),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "max": max(values),
+                "histogram": histogram(values),
+            }
+        return result
+
+    def write_trace(self, path: str) -> int:
+        """写出 Chrome trace 格式（JSON Object Format），返回 span 数"""
+        with self._lock:
+            events = list(self.events or [])
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+        return len(events)
+
+
+class RequestTrace:
+    """单个请求的阶段耗时，由 httpcore 的 trace 回调驱动"""
+
+    def __init__(self, tracer: Tracer, request: httpx.Request):
+        self.tracer = tracer
+        self.name = f"{request.method} {request.url.path}"
+        self.path = request.url.path
+        self.start = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.status: Optional[int] = None
+        self.bytes_sent = int(request.headers.get("content-length") or 0)
+        tracer.count("http.requests")
+        tracer.count("http.bytes_sent", self.bytes_sent)
+
+    def on_event(self, event: str, info: Dict[str, Any]) -> None:
+        parts = event.split(".")
+        if len(parts) != 3:
+            return
+        _, step, state = parts
+        phase = PHASES.get(step)
+        if phase is None:
+            return
+        now = time.perf_counter()
+        if state == "started":
+            self.phases[step] = now
+        elif step in self.phases:
+            start = self.phases.pop(step)
+            self.tracer.add_span(f"{phase} {self.name}", "http", start, now, metric=f"http.{phase}")
+            if state == "failed":
+                self.tracer.count("http.errors")
+
+    def headers(self, response: httpx.Response) -> None:
+        self.status = response.status_code
+        self.tracer.record("http.ttfb", time.perf_counter() - self.start)
+
+    def finish(self, received: int, tail: bytes) -> None:
+        end = time.perf_counter()
+        self.tracer.count("http.bytes_received", received)
+        self.tracer.add_span(
+            self.name,
+            "http",
+            self.start,
+            end,
+            metric="http.total",
+            args={"status": self.status, "bytes_sent": self.bytes_sent, "bytes_received": received},
+        )
+        self.tracer.record(f"http.total {self.name}", end - self.start)
+        if self.path in SERVER_PATHS:
+            self._server_durations(tail)
+
+    def _server_durations(self, tail: bytes) -> None:
+        """解析响应最后一行中服务器返回的耗时"""
+        lines = [line for line in tail.splitlines() if line.strip()]
+        if not lines:
+            return
+        try:
+            data = json.loads(lines[-1])
+        except ValueError:
+            return
+        if not isinstance(data, dict):
+            return
+        for field, metric in SERVER_FIELDS.items():
+            if data.get(field):
+                self.tracer.record(metric, data[field] / 1e9)
+
+
+class CountingStream(httpx.SyncByteStream):
+    """包装响应体：统计接收字节数并保留末尾数据，关闭时结束请求的计时"""
+
+    TAIL = 4096
+
+    def __init__(self, stream: Any, trace: RequestTrace):
+        self.stream = stream
+        self.trace = trace
+        self.received = 0
+        self.tail = b""
+        self._closed = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        for chunk in self.stream:
+            self.received += len(chunk)
+            self.tail = (self.tail + chunk)[-self.TAIL:]
+            yield chunk
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self.trace.finish(self.received, self.tail)
+        self.stream.close()
+
+
+class TracedConsole(Console):
+    """记录每次输出（含表格、Markdown 渲染）耗时的 Console"""
+
+    def print(self, *args: Any, **kwargs: Any) -> None:
+        with TRACER.span("console.print", "render", metric="render.print"):
+            super().print(*args, **kwargs)
+
+
+# 进程内共用的记录器
+TRACER = Tracer()
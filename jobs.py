@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+后台任务：命令在工作线程中运行，输出先写入缓冲区，完成时在提示符上方提示，可随时查看、等待或取消
+"""
+
+import io
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+
+from instrument import TracedConsole
+
+RUNNING = "运行中"
+DONE = "已完成"
+CANCELLED = "已取消"
+FAILED = "失败"
+
+
+class Job:
+    """一个后台命令
+
+    命令的输出写入独立的 Console（非交互模式，不显示动画），取消通过 cancelled 事件协作完成。
+    """
+
+    def __init__(self, job_id: int, command: str, width: int):
+        self.id = job_id
+        self.command = command
+        self.cancelled = threading.Event()
+        self.buffer = io.StringIO()
+        self.console = TracedConsole(file=self.buffer, force_terminal=True, force_interactive=False, width=width)
+        self.future: Optional[Future] = None
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        self.error: Optional[BaseException] = None
+
+    @property
+    def status(self) -> str:
+        if self.finished is None:
+            return RUNNING
+        if self.error is not None:
+            return FAILED
+        return CANCELLED if self.cancelled.is_set() else DONE
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    def output(self) -> str:
+        return self.buffer.getvalue()
+
+
+class JobManager:
+    """管理后台任务，任务结束的通知在提示符显示期间直接输出，否则留到下次显示提示符前"""
+
+    def __init__(self, notify: Callable[[str], None], max_workers: int = 4):
+        self.notify = notify
+        self.jobs: Dict[int, Job] = {}
+        self._next_id = 1
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._prompt_active = False
+        self._pending: List[str] = []
+
+    def submit(self, command: str, target: Callable[[Job], None], width: int = 100) -> Job:
+        with self._lock:
+            job = Job(self._next_id, command, width)
+            self.jobs[job.id] = job
+            self._next_id += 1
+
+        def body() -> None:
+            try:
+                target(job)
+            except BaseException as e:
+                job.error = e
+            finally:
+                job.finished = time.monotonic()
+                self._finished(job)
+
+        job.future = self._pool.submit(body)
+        return job
+
+    def _finished(self, job: Job) -> None:
+        icon = {DONE: "✅", CANCELLED: "⛔️", FAILED: "❌"}[job.status]
+        message = f"[{job.id}] {icon} {job.status}: {job.command}（{job.elapsed:.1f}s），使用 wait {job.id} 查看输出"
+        with self._lock:
+            if not self._prompt_active:
+                self._pending.append(message)
+                return
+        self.notify(message)
+
+    def set_prompt_active(self, active: bool) -> None:
+        """提示符显示期间的输出经 patch_stdout 打印在提示符上方"""
+        with self._lock:
+            self._prompt_active = active
+            pending, self._pending = self._pending, []
+        for message in pending:
+            self.notify(message)
+
+    def get(self, job_id: int) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def running(self) -> List[Job]:
+        return [job for job in self.jobs.values() if job.finished is None]
+
+    def cancel(self, job_id: int) -> bool:
+        job = self.jobs.get(job_id)
+        if job is None or job.finished is not None:
+            return False
+        job.cancelled.set()
+        return True
+
+    def cancel_all(self) -> None:
+        for job in self.running():
+            job.cancelled.set()
+
+    def wait(self, jobs: List[Job], timeout: float = 0.2) -> None:
+        """阻塞直到任务结束；分段等待，使主线程能及时响应 Ctrl-C"""
+        futures = [job.future for job in jobs if job.future is not None]
+        while futures:
+            _, pending = wait(futures, timeout=timeout)
+            futures = list(pending)
+
+    def shutdown(self) -> None:
+        self.cancel_all()
+        self._pool.shutdown(wait=False)
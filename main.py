@@ -7,24 +7,55 @@
 import argparse
 import re
 import sys
-from typing import List, Tuple
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Tuple
 import logging
-import subprocess
 
-from ollama import Client
-from prompt_toolkit import PromptSession
-from prompt_toolkit.completion import WordCompleter
 from rich.console import Console
-from rich.markdown import Markdown
 from rich.panel import Panel
-from rich.progress import Progress, SpinnerColumn, TextColumn
-from rich.style import Style
 from rich.table import Table
-from httpx import Timeout, HTTPError, ReadTimeout
+from httpx import Timeout, HTTPError, HTTPStatusError, ReadTimeout, TimeoutException
+
+from cache import LRUCache, ModelListCache
+from health import CircuitOpenError
+from history import ChatHistory
+from instrument import TRACER, TracedConsole
+from output import FORMATS, create_writer
+from records import (
+    SHOW_FIELDS,
+    extract_models,
+    format_size,
+    format_time,
+    model_record,
+    parse_size,
+    process_record,
+    show_record,
+)
+from session import OllamaSession, should_verify
+
+# 以下模块导入较慢，只在真正用到时才导入
+if TYPE_CHECKING:
+    from catalog import ModelIndex
+    from completer import ShellCompleter
+    from jobs import Job, JobManager
 
 
 class OllamaShell:
-    def __init__(self, host: str = None):
+    def __init__(
+        self,
+        host: str = None,
+        output_format: str = "table",
+        model_cache_ttl: float = 30.0,
+        history_chars: int = 16000,
+        keep_alive: str = "10m",
+        max_connections: int = 20,
+        store_path: Optional[str] = None,
+        pool: Optional[List[str]] = None,
+        response_cache: Optional[str] = None,
+        response_cache_size: int = 512 * 1024 * 1024,
+    ):
         if not host:
             raise ValueError("必须提供 Ollama 服务器地址")
         if not host.startswith(("http://", "https://")):
@@ -34,14 +65,61 @@ class OllamaShell:
         self.host = host
         
         # 根据协议决定是否验证证书
-        self.verify_ssl = not (host.startswith("https://") and ":" in host.split("://")[1].split("/")[0])
+        self.verify_ssl = should_verify(host)
         
-        self.client = Client(
-            host=host,
+        # 所有命令共用同一个连接池
+        self.session = OllamaSession(
+            host,
+            verify=self.verify_ssl,
             timeout=Timeout(30.0),
-            verify=self.verify_ssl
+            max_connections=max_connections,
         )
-        self.console = Console()
+        # 记录输出耗时，供 stats 命令与 --trace 使用
+        self._local = threading.local()
+        self.console = TracedConsole()
+        self.output_format = output_format
+        self.history_chars = history_chars
+        self.store = None
+        if store_path:
+            from store import ResultStore
+
+            self.store = ResultStore(store_path)
+        self.keep_alive = keep_alive
+        # 模型详情按 digest 缓存
+        self.show_cache = LRUCache(max_size=256)
+        self.model_cache = ModelListCache(self.fetch_model_list, ttl=model_cache_ttl)
+        # 最近一次获取的模型列表索引，list 与命令补全共用
+        self.model_index: Optional["ModelIndex"] = None
+        self._completer = None
+        self._completer_version = -1
+        self._jobs: Optional["JobManager"] = None
+        # 指定主机池后，chat / run 的请求在 host 与池中的主机之间路由
+        self.router = None
+        if pool:
+            from router import Router
+
+            sessions = {host: self.session}
+            for pool_host in pool:
+                pool_host = pool_host.strip().rstrip("/")
+                if not pool_host or pool_host in sessions:
+                    continue
+                if not pool_host.startswith(("http://", "https://")):
+                    raise ValueError(f"服务器地址必须以 http:// 或 https:// 开头: {pool_host}")
+                sessions[pool_host] = OllamaSession(
+                    pool_host,
+                    verify=should_verify(pool_host),
+                    timeout=Timeout(30.0),
+                    max_connections=max_connections,
+                )
+            self.router = Router(list(sessions.values()), notify=lambda message: self.console.print(f"[yellow]↪️ {message}[/yellow]"))
+        # 确定性请求的响应缓存，空字符串表示使用默认位置
+        self.response_cache = None
+        if response_cache is not None:
+            from responses import ResponseCache
+
+            self.response_cache = ResponseCache(response_cache or None, max_bytes=response_cache_size)
+        self._digests: Dict[str, Optional[str]] = {}
+        self._digests_expires = 0.0
         self.commands = {
             "list": (self.list_models, "📃 列出可用模型"),
             "pull": (self.pull_model, "📥 拉取模型"),
@@ -52,26 +130,179 @@ class OllamaShell:
             "exit": (self.exit_shell, "🚪 退出程序"),
             "rm": (self.delete_model, "🗑️ 删除指定模型"),
             "version": (self.show_version, "📌 显示版本信息"),
+            "bench": (self.benchmark_models, "🏁 模型性能测试"),
+            "top": (self.top_processes, "📈 实时监控运行中的模型"),
+            "run": (self.run_batch, "📦 批量推理"),
+            "embed": (self.embed_texts, "🧮 批量向量化"),
+            "stats": (self.show_stats, "📊 请求与渲染耗时统计"),
+            "jobs": (self.list_jobs, "📋 查看后台任务"),
+            "wait": (self.wait_jobs, "⏳ 等待后台任务并显示输出"),
+            "cancel": (self.cancel_job, "⛔️ 取消后台任务"),
+            "pool": (self.show_pool, "🛰️ 查看主机池状态"),
+            "warm": (self.warm_models, "🔥 预加载模型"),
+            "unload": (self.unload_models, "🧊 卸载模型"),
+            "cache": (self.show_response_cache, "💾 响应缓存统计"),
         }
 
+    @property
+    def console(self) -> Console:
+        """当前输出目标，后台任务中为该任务自己的缓冲区"""
+        return getattr(self._local, "console", None) or self._console
+
+    @console.setter
+    def console(self, value: Console) -> None:
+        self._console = value
+
+    def cancel_event(self) -> threading.Event:
+        """当前后台任务的取消事件，前台命令返回一个不会被触发的事件"""
+        return getattr(self._local, "cancelled", None) or threading.Event()
+
+    @property
+    def jobs(self) -> "JobManager":
+        """后台任务管理器，首次使用时才创建"""
+        if self._jobs is None:
+            from jobs import JobManager
+
+            self._jobs = JobManager(notify=lambda message: self._console.print(f"[cyan]{message}[/cyan]"))
+        return self._jobs
+
+    @property
+    def client(self):
+        """ollama.Client，首次使用时才创建"""
+        return self.session.client
+
+    @property
+    def generator(self):
+        """chat / generate 请求的发送方：指定了主机池时为路由器，否则为 ollama.Client；启用响应缓存时外面再包一层缓存"""
+        client = self.router or self.client
+        if self.response_cache is None:
+            return client
+        from responses import CachedClient
+
+        return CachedClient(client, self.response_cache, self.model_digest)
+
+    def model_digest(self, model: str) -> Optional[str]:
+        """模型当前的 digest，重新拉取后随之变化；digest 列表按 --cache-ttl 缓存
+
+        指定主机池时取可用主机上一致的 digest；返回 None（主机间版本不一致、无法获取模型列表）时不使用响应缓存，计入绕过次数。
+        """
+        from router import model_key
+
+        if self.router is not None:
+            return self.router.digest(model)
+        if time.monotonic() >= self._digests_expires:
+            try:
+                tags = self.session.get_json("/api/tags")
+            except (OSError, HTTPError, ValueError) as e:
+                logging.debug(f"Failed to fetch model digests: {e}")
+                return None
+            self._digests = {model_key(m.get("name") or m.get("model", "")): m.get("digest") for m in tags.get("models") or []}
+            self._digests_expires = time.monotonic() + self.model_cache.ttl
+        return self._digests.get(model_key(model))
+
+    def invalidate_models(self) -> None:
+        """拉取 / 删除模型后，模型列表与 digest 都需要重新获取"""
+        self.model_cache.invalidate()
+        self._digests = {}
+        self._digests_expires = 0.0
+        if self.router is not None:
+            self.router.invalidate()
+
+    def print_connection_error(self, error: ConnectionError) -> None:
+        """连接失败提示，主机已熔断时同时显示失败次数与剩余冷却时间"""
+        if isinstance(error, CircuitOpenError):
+            self.console.print(f"[red]连接服务器失败: {error}[/red]")
+        else:
+            self.console.print("[red]连接服务器失败[/red]")
+
+    def print_http_error(self, error: HTTPError) -> None:
+        """HTTP 错误提示，连接 / 超时等传输层错误没有响应对象"""
+        if isinstance(error, HTTPStatusError):
+            self.console.print(f"[red]HTTP 错误: {error.response.status_code}[/red]")
+        elif isinstance(error, TimeoutException):
+            self.console.print("[red]请求超时[/red]")
+        else:
+            self.console.print(f"[red]连接服务器失败: {type(error).__name__}[/red]")
+
+    def preflight(self) -> None:
+        """预检服务器，不可达时提前熔断，后续命令立即失败而不是等待超时"""
+        try:
+            latency = self.session.probe()
+            self.console.print(f"[dim]🟢 {self.host} 可用，延迟 {latency * 1000:.0f}ms[/dim]")
+        except (OSError, HTTPError) as e:
+            state = self.session.health.snapshot()
+            self.console.print(
+                f"[red]🔴 无法连接 {self.host}（{type(e).__name__}），{state['retry_in']:.0f}s 内的请求将直接失败[/red]"
+            )
+
+    def write_records(self, records: Iterable[dict], fields: Optional[Sequence[str]] = None) -> None:
+        """以 jsonl / csv 格式逐条输出记录，写入当前 console，后台任务的输出进入任务缓冲区"""
+        with create_writer(self.output_format, self.console.file, fields=fields) as writer:
+            for record in records:
+                writer.write(record)
+
     def list_models(self, *args: List[str]) -> None:
-        """列出所有可用的模型"""
+        """列出可用的模型，支持筛选、排序与分页"""
+        parser = argparse.ArgumentParser(prog="list", description="列出可用模型")
+        parser.add_argument("--filter", help="名称筛选：子串、通配符（如 'llama*:8b'）或 /正则表达式/")
+        parser.add_argument("--family", help="只显示该家族的模型（如 llama、qwen2）")
+        parser.add_argument("--quant", help="只显示该量化等级的模型（如 Q4_K_M）")
+        parser.add_argument("--min-size", type=parse_size, help="最小文件大小（如 4GB）")
+        parser.add_argument("--max-size", type=parse_size, help="最大文件大小（如 16GB）")
+        parser.add_argument("--sort", choices=("name", "size", "modified", "params"), default="name", help="排序方式，默认为 name")
+        parser.add_argument("--reverse", action="store_true", help="反向排序")
+        parser.add_argument("--limit", type=int, help="每页数量，默认全部显示")
+        parser.add_argument("--page", type=int, default=1, help="页码，从 1 开始")
+        options = self.parse_command_args(parser, args)
+        if options is None:
+            return
+
+        from catalog import ModelIndex
+
         try:
-            with Progress(
-                SpinnerColumn(),
-                TextColumn("[bold blue]获取模型列表..."),
-                transient=True,
-            ) as progress:
-                progress.add_task("fetch")
+            with self.console.status("[bold blue]获取模型列表..."):
                 models = self.client.list()
                 # self.console.print(
                 #     f"[dim]DEBUG: type={type(models)}, value={models}[/dim]"
                 # )
+
+            if not models:
+                self.console.print("[red]❗️ 未找到模型[/red]")
+                return
+
+            # 处理模型列表
+            model_list = extract_models(models)
+            if model_list is None:
+                self.console.print(f"[yellow]⚠️ 返回值格式异常: {models}[/yellow]")
+                return
+
+            # 每次获取后只建立一次索引，之后的筛选与排序都基于索引
+            self.model_index = index = ModelIndex.from_models(model_list)
+            if self.store is not None:
+                self.store.save_models(self.host, index.records)
+
+            records, total = index.query(
+                pattern=options.filter,
+                family=options.family,
+                quantization=options.quant,
+                min_size=options.min_size,
+                max_size=options.max_size,
+                sort=options.sort,
+                reverse=options.reverse,
+                limit=options.limit,
+                page=options.page,
+            )
+
+            if self.output_format != "table":
+                self.write_records(records)
+                return
+
+            # 行数较多时不画行间分隔线，输出更紧凑，渲染也更快
             table = Table(
                 title="📃 可用模型列表",
                 show_header=True,
                 header_style="bold magenta",
-                show_lines=True,
+                show_lines=len(records) <= 20,
             )
             table.add_column("🤖 模型名称", style="cyan")
             table.add_column("💾 大小", justify="right", style="green")
@@ -80,150 +311,211 @@ class OllamaShell:
             table.add_column("🧩 参数量", style="blue")
             table.add_column("🏷️ 量化等级", style="red")
 
-            if not models:
-                self.console.print("[red]❗️ 未找到模型[/red]")
-                return
-
-            # 处理模型列表
-            if hasattr(models, "models"):
-                model_list = models.models
-            elif isinstance(models, list):
-                model_list = models
-            else:
-                self.console.print(f"[yellow]⚠️ 返回值格式异常: {models}[/yellow]")
-                return
-
-            for model in model_list:
-                try:
-                    # 获取基本信息
-                    name = model.model
-                    size = model.size
-                    modified = model.modified_at
-                    details = model.details
-
-                    # 格式化大小
-                    size_str = f"{size / (1024 * 1024 * 1024):.1f}GB" if size else "Unknown"
-
-                    # 格式化时间
-                    modified_str = modified.strftime("%Y-%m-%d %H:%M") if modified else "Unknown"
-
-                    # 获取详细信息
-                    format_str = details.format if details else "Unknown"
-                    param_size = details.parameter_size if details else "Unknown"
-                    quant_level = details.quantization_level if details else "Unknown"
-
-                    # 添加到表格
-                    table.add_row(
-                        name,
-                        size_str,
-                        modified_str,
-                        format_str,
-                        str(param_size),
-                        str(quant_level),
-                    )
-
-                except Exception as e:
-                    self.console.print(f"[yellow]⚠️ 警告: 处理模型信息时出错: {str(e)}[/yellow]")
-                    continue
+            for record in records:
+                table.add_row(
+                    record["name"],
+                    format_size(record["size"]),
+                    format_time(record["modified_at"]),
+                    record["format"],
+                    str(record["parameter_size"]),
+                    str(record["quantization_level"]),
+                )
 
             self.console.print(table)
+            if total != len(index) or options.limit:
+                pages = max((total + options.limit - 1) // options.limit, 1) if options.limit else 1
+                self.console.print(
+                    f"[dim]共 {len(index)} 个模型，符合条件 {total} 个，第 {options.page}/{pages} 页[/dim]"
+                )
 
-        except ConnectionError:
-            self.console.print("[red]连接服务器失败[/red]")
+        except ConnectionError as e:
+            self.print_connection_error(e)
         except TimeoutError:
             self.console.print("[red]请求超时[/red]")
         except HTTPError as e:
-            self.console.print(f"[red]HTTP 错误: {e.response.status_code}[/red]")
+            self.print_http_error(e)
+        except ValueError as e:
+            self.console.print(f"[red]错误: {e}[/red]")
         except Exception as e:
             self.console.print("[red]发生未知错误[/red]")
             logging.error(f"Unexpected error: {str(e)}")
 
     def pull_model(self, *args: List[str]) -> None:
-        """拉取指定的模型"""
-        if not args:
-            self.console.print("[red]错误: 请指定模型名称[/red]")
-            return
-
-        model_name = args[0]
-        # 修改模型名称验证，允许更多字符
-        if not re.match(r'^[a-zA-Z0-9_\-\./:]+$', model_name):
-            self.console.print("[red]错误: 模型名称包含非法字符[/red]")
+        """拉取指定的模型，支持多个模型并发拉取与断点续传"""
+        parser = argparse.ArgumentParser(prog="pull", description="拉取模型")
+        parser.add_argument("models", nargs="*", help="模型名称")
+        parser.add_argument("--parallel", type=int, default=2, help="同时拉取的模型数，默认为 2")
+        parser.add_argument("--retries", type=int, default=3, help="失败重试次数，默认为 3")
+        parser.add_argument("--resume", action="store_true", help="继续上次未完成的拉取队列")
+        options = self.parse_command_args(parser, args)
+        if options is None:
             return
 
-        self.console.print(f"\n[bold]📥 开始拉取模型: {model_name}[/bold]")
+        from puller import ParallelPuller, PullQueue
 
         try:
-            with Progress(TextColumn("[bold blue]{task.description}"), transient=False) as progress:
-                task = progress.add_task("拉取中...", total=None)
-                for info in self.client.pull(model_name, stream=True):
-                    if "status" in info:
-                        progress.update(task, description=f"状态: {info['status']}")
-                    if "completed" in info:
-                        progress.update(
-                            task,
-                            description=f"进度: {info['completed']}/{info['total']} layers",
-                        )
-            self.console.print("[green]✅ 模型拉取完成！[/green]")
-
-        except ConnectionError:
-            self.console.print("[red]连接服务器失败[/red]")
+            queue = PullQueue(self.host)
+            models = list(options.models)
+            if options.resume:
+                models = [m for m in queue.pending() if m not in models] + models
+            if not models:
+                if options.resume:
+                    self.console.print("[yellow]⚠️ 没有未完成的拉取任务[/yellow]")
+                else:
+                    self.console.print("[red]错误: 请指定模型名称[/red]")
+                return
+
+            for model_name in models:
+                # 修改模型名称验证，允许更多字符
+                if not re.match(r'^[a-zA-Z0-9_\-\./:]+$', model_name):
+                    self.console.print(f"[red]错误: 模型名称包含非法字符: {model_name}[/red]")
+                    return
+
+            self.console.print(f"\n[bold]📥 开始拉取模型: {', '.join(models)}[/bold]")
+            queue.add(models)
+
+            puller = ParallelPuller(
+                self.client,
+                queue,
+                parallel=options.parallel,
+                retries=options.retries,
+                cancelled=self.cancel_event(),
+                console=self.console,
+            )
+            results = puller.run(models)
+            failed = [model for model, ok in results.items() if not ok]
+            if failed:
+                self.console.print(f"[red]❌ 拉取失败: {', '.join(failed)}，可使用 pull --resume 继续[/red]")
+            else:
+                self.console.print("[green]✅ 模型拉取完成！[/green]")
+                queue.clear_done()
+            self.invalidate_models()
+
+        except ConnectionError as e:
+            self.print_connection_error(e)
         except TimeoutError:
             self.console.print("[red]请求超时[/red]")
         except HTTPError as e:
-            self.console.print(f"[red]HTTP 错误: {e.response.status_code}[/red]")
+            self.print_http_error(e)
+        except ValueError as e:
+            self.console.print(f"[red]错误: {e}[/red]")
+        except OSError as e:
+            self.console.print(f"[red]无法写入拉取队列: {e}[/red]")
         except Exception as e:
             self.console.print("[red]发生未知错误[/red]")
             logging.error(f"Unexpected error: {str(e)}")
 
+    def fetch_model_details(self, names: List[str], parallel: int = 4) -> Dict[str, dict]:
+        """批量获取模型详情
+
+        以 /api/tags 中的 digest 为键去重并缓存，相同 digest 的模型（不同标签或不同主机）
+        只请求一次 /api/show，其余请求并发执行。单个模型获取失败不影响其他模型，
+        该模型的记录只包含 name 与 error。
+        """
+        digests = {}
+        for model in extract_models(self.client.list()) or []:
+            record = model_record(model)
+            digests[record["name"]] = record["digest"]
+
+        details: Dict[str, dict] = {}
+        # 每个未命中缓存的 digest 只取一个名称请求
+        pending: Dict[str, str] = {}
+        for name in names:
+            digest = digests.get(name) or digests.get(f"{name}:latest")
+            cached = self.show_cache.get(digest) if digest else None
+            if cached is None and digest and self.store is not None:
+                cached = self.store.details(digest)
+                if cached is not None:
+                    self.show_cache.put(digest, cached)
+            if cached is not None:
+                details[name] = {"name": name, **cached}
+            else:
+                pending.setdefault(digest or name, name)
+
+        def fetch(name: str) -> dict:
+            try:
+                record = show_record(name, self.client.show(name))
+            except Exception as e:
+                return {"error": f"{type(e).__name__}: {e}"}
+            del record["name"]
+            return record
+
+        with ThreadPoolExecutor(max_workers=max(1, parallel)) as pool:
+            fetched = dict(zip(pending.keys(), pool.map(fetch, pending.values())))
+
+        for key, record in fetched.items():
+            if "error" not in record and key in digests.values():
+                self.show_cache.put(key, record)
+                if self.store is not None:
+                    self.store.save_details(key, record)
+        for name in names:
+            if name not in details:
+                digest = digests.get(name) or digests.get(f"{name}:latest")
+                details[name] = {"name": name, **fetched[digest or name]}
+        return details
+
+    def format_model_details(self, record: dict) -> str:
+        """将模型详情记录格式化为面板内容"""
+        lines = [
+            "",
+            f"[bold cyan]模型名称:[/bold cyan] {record['name']}",
+            f"[bold yellow]修改时间:[/bold yellow] {format_time(record['modified_at'])}",
+            f"[bold magenta]格式:[/bold magenta] {record['format']}",
+            f"[bold blue]参数量:[/bold blue] {record['parameter_size']}",
+            f"[bold red]量化等级:[/bold red] {record['quantization_level']}",
+        ]
+
+        # 添加模型信息
+        if record["modelinfo"]:
+            lines.append("\n[bold white]模型信息:[/bold white]")
+            lines.extend(f"  {key}: {value}" for key, value in record["modelinfo"].items())
+
+        # 添加许可证信息
+        if record["license"]:
+            lines.append(f"\n[bold white]许可证:[/bold white]\n{record['license']}")
+        return "\n".join(lines) + "\n"
+
     def show_model(self, *args: List[str]) -> None:
-        """显示模型详细信息"""
-        if not args:
+        """显示模型详细信息，支持一次查询多个模型"""
+        parser = argparse.ArgumentParser(prog="show", description="显示模型详情")
+        parser.add_argument("models", nargs="*", help="模型名称")
+        parser.add_argument("--all", action="store_true", help="显示所有模型")
+        parser.add_argument("--parallel", type=int, default=4, help="并发请求数，默认为 4")
+        options = self.parse_command_args(parser, args)
+        if options is None:
+            return
+        if not options.models and not options.all:
             self.console.print("[red]错误: 请指定模型名称[/red]")
             return
 
-        model_name = args[0]
         try:
-            with Progress(
-                SpinnerColumn(),
-                TextColumn(f"[bold blue]获取模型 {model_name} 的信息..."),
-                transient=True,
-            ) as progress:
-                progress.add_task("fetch")
-                info = self.client.show(model_name)
-                # self.console.print(f"[dim]DEBUG: type={type(info)}, value={info}[/dim]")
-            # 构建基本信息
-            basic_info = (
-                f"\n[bold cyan]模型名称:[/bold cyan] {model_name}\n"
-                + f"[bold yellow]修改时间:[/bold yellow] {info.modified_at.strftime('%Y-%m-%d %H:%M')}\n"
-                + f"[bold magenta]格式:[/bold magenta] {info.details.format}\n"
-                + f"[bold blue]参数量:[/bold blue] {info.details.parameter_size}\n"
-                + f"[bold red]量化等级:[/bold red] {info.details.quantization_level}\n"
-            )
-
-            # 添加模型信息
-            if hasattr(info, "modelinfo") and info.modelinfo:
-                model_info_str = "\n[bold white]模型信息:[/bold white]\n"
-                for key, value in info.modelinfo.items():
-                    model_info_str += f"  {key}: {value}\n"
-                basic_info += model_info_str
-
-            # 添加许可证信息
-            if hasattr(info, "license") and info.license:
-                basic_info += f"\n[bold white]许可证:[/bold white]\n{info.license}\n"
+            with self.console.status("[bold blue]获取模型信息..."):
+                names = list(dict.fromkeys(options.models))
+                if options.all:
+                    names += [name for name in self.fetch_model_list() if name not in names]
+                details = self.fetch_model_details(names, options.parallel)
+
+            if self.output_format != "table":
+                self.write_records(({**dict.fromkeys(SHOW_FIELDS), **details[name]} for name in names), SHOW_FIELDS)
+                return
 
-            panel = Panel.fit(
-                basic_info,
-                title=f"模型详情 - {model_name}",
-                border_style="blue",
-            )
-            self.console.print(panel)
+            for name in names:
+                if "error" in details[name]:
+                    self.console.print(f"[red]❌ {name}: 获取详情失败（{details[name]['error']}）[/red]")
+                    continue
+                panel = Panel.fit(
+                    self.format_model_details(details[name]),
+                    title=f"模型详情 - {name}",
+                    border_style="blue",
+                )
+                self.console.print(panel)
 
-        except ConnectionError:
-            self.console.print("[red]连接服务器失败[/red]")
+        except ConnectionError as e:
+            self.print_connection_error(e)
         except TimeoutError:
             self.console.print("[red]请求超时[/red]")
         except HTTPError as e:
-            self.console.print(f"[red]HTTP 错误: {e.response.status_code}[/red]")
+            self.print_http_error(e)
         except Exception as e:
             self.console.print("[red]发生未知错误[/red]")
             logging.error(f"Unexpected error: {str(e)}")
@@ -231,18 +523,17 @@ class OllamaShell:
     def show_processes(self, *args: List[str]) -> None:
         """显示运行中的模型进程"""
         try:
-            with Progress(
-                SpinnerColumn(),
-                TextColumn("[bold blue]获取运行中的模型..."),
-                transient=True,
-            ) as progress:
-                progress.add_task("fetch")
+            with self.console.status("[bold blue]获取运行中的模型..."):
                 response = self.client.ps()
 
             if not response or not hasattr(response, "models") or not response.models:
                 self.console.print("[yellow]⚠️ 没有正在运行的模型[/yellow]")
                 return
 
+            if self.output_format != "table":
+                self.write_records(process_record(model) for model in response.models)
+                return
+
             table = Table(
                 title="⚡️ 运行中的模型",
                 show_header=True,
@@ -257,30 +548,24 @@ class OllamaShell:
             table.add_column("⏳ 过期时间", style="magenta")
 
             for model in response.models:
-                # 格式化大小（转换为GB）
-                size_gb = model.size / (1024 * 1024 * 1024)
-                size_str = f"{size_gb:.1f}GB"
-
-                # 格式化过期时间
-                expires_str = model.expires_at.strftime("%Y-%m-%d %H:%M:%S") if model.expires_at else "Unknown"
-
+                record = process_record(model)
                 table.add_row(
-                    model.name,
-                    size_str,
-                    model.details.format if model.details else "Unknown",
-                    model.details.parameter_size if model.details else "Unknown",
-                    model.details.quantization_level if model.details else "Unknown",
-                    expires_str,
+                    record["name"],
+                    format_size(record["size"]),
+                    record["format"],
+                    record["parameter_size"],
+                    record["quantization_level"],
+                    format_time(record["expires_at"], "%Y-%m-%d %H:%M:%S"),
                 )
 
             self.console.print(table)
 
-        except ConnectionError:
-            self.console.print("[red]连接服务器失败[/red]")
+        except ConnectionError as e:
+            self.print_connection_error(e)
         except TimeoutError:
             self.console.print("[red]请求超时[/red]")
         except HTTPError as e:
-            self.console.print(f"[red]HTTP 错误: {e.response.status_code}[/red]")
+            self.print_http_error(e)
         except Exception as e:
             self.console.print("[red]发生未知错误[/red]")
             logging.error(f"Unexpected error: {str(e)}")
@@ -291,12 +576,28 @@ class OllamaShell:
             self.console.print("[red]错误: 请指定模型名称[/red]")
             return
 
-        model_name = args[0]
+        parser = argparse.ArgumentParser(prog="chat", description="与模型对话")
+        parser.add_argument("model", help="模型名称")
+        parser.add_argument("--temperature", type=float, help="采样温度，0 为贪心解码")
+        parser.add_argument("--seed", type=int, help="随机种子，固定后相同输入得到相同输出")
+        options = self.parse_command_args(parser, args)
+        if options is None:
+            return
+        model_name = options.model
+        generate_options = {
+            name: value for name, value in (("temperature", options.temperature), ("seed", options.seed)) if value is not None
+        }
+
         self.console.print(f"\n[bold]💬 开始与 {model_name} 对话[/bold]")
-        self.console.print("[dim]🚪 输入 'exit' 结束对话[/dim]")
+        self.console.print("[dim]🚪 输入 'exit' 结束对话，输入 'clear' 清空上下文[/dim]")
 
         # 创建对话会话
+        from prompt_toolkit import PromptSession
+
+        from render import StreamRenderer
+
         chat_session = PromptSession()
+        history = ChatHistory(max_chars=self.history_chars)
 
         while True:
             try:
@@ -304,38 +605,38 @@ class OllamaShell:
                 message = chat_session.prompt("\n👤 你> ")
                 if message.lower() == "exit":
                     break
+                if message.lower() == "clear":
+                    history.clear()
+                    self.console.print("[dim]🧹 上下文已清空[/dim]")
+                    continue
 
                 self.console.print("\n[bold blue]🤖 AI[/bold blue]")
-                with Progress(
-                    SpinnerColumn(),
-                    TextColumn("[bold blue]🤔 思考中..."),
-                    transient=True,
-                ) as progress:
-                    progress.add_task("think")
-                    stream = self.client.chat(
-                        model=model_name,
-                        messages=[{"role": "user", "content": message}],
-                        stream=True,
-                    )
-
-                response = ""
-                for chunk in stream:
-                    content = chunk["message"]["content"]
-                    response += content
-
-                # 处理思考标签
-                think_pattern = r"<think>(.*?)</think>"
-                parts = re.split(think_pattern, response, flags=re.DOTALL)
-
-                for i, part in enumerate(parts):
-                    if i % 2 == 1:  # 思考内容
-                        think_panel = Panel(Markdown(part.strip()), title="思考过程", style=Style(color="grey70", italic=True), border_style="grey50")
-                        self.console.print(think_panel)
-                        self.console.print()  # 添加空行
-                    else:  # 普通内容
-                        if part.strip():
-                            md = Markdown(part.strip())
-                            self.console.print(md)
+                stream = self.generator.chat(
+                    model=model_name,
+                    messages=history.messages(message),
+                    stream=True,
+                    options=generate_options or None,
+                    keep_alive=self.keep_alive,
+                )
+
+                # 边接收边渲染，<think> 内容显示在思考过程面板中
+                answer = []
+                with StreamRenderer(self.console) as renderer:
+                    for chunk in stream:
+                        content = chunk["message"]["content"]
+                        answer.append(content or "")
+                        renderer.feed(content, chunk["message"].get("thinking"))
+                        if chunk.get("done"):
+                            renderer.update_stats(chunk)
+
+                # 思考过程不计入上下文
+                history.add(message, re.sub(r"<think>.*?</think>", "", "".join(answer), flags=re.DOTALL).strip())
+
+                summary = renderer.summary()
+                if getattr(stream, "cached", False):
+                    self.console.print("\n[dim]💾 回答来自响应缓存[/dim]")
+                elif summary:
+                    self.console.print(f"\n[dim]{summary}[/dim]")
 
             except KeyboardInterrupt:
                 self.console.print("\n[yellow]⛔️ 对话已取消[/yellow]")
@@ -343,20 +644,481 @@ class OllamaShell:
             except EOFError:
                 self.console.print("\n[yellow]👋 再见！[/yellow]")
                 break
-            except ConnectionError:
-                self.console.print("[red]连接服务器失败[/red]")
+            except ConnectionError as e:
+                self.print_connection_error(e)
                 break
             except (TimeoutError, ReadTimeout):
                 self.console.print("[red]请求超时，请检查网络连接或服务器状态[/red]")
                 break
             except HTTPError as e:
-                self.console.print(f"[red]HTTP 错误: {e.response.status_code}[/red]")
+                self.print_http_error(e)
                 break
             except Exception as e:
                 self.console.print(f"[red]发生未知错误: {str(e)}[/red]")
                 logging.error(f"Unexpected error: {str(e)}")
                 break
 
+    def parse_command_args(self, parser: argparse.ArgumentParser, args: Tuple[str, ...]) -> Optional[argparse.Namespace]:
+        """解析命令参数，出错时返回 None 而不是退出程序"""
+        try:
+            return parser.parse_args(list(args))
+        except SystemExit:
+            return None
+
+    def benchmark_models(self, *args: List[str]) -> None:
+        """并发压测模型，统计 TTFT、生成速度与加载时间"""
+        parser = argparse.ArgumentParser(prog="bench", description="模型性能测试")
+        parser.add_argument("models", nargs="+", help="模型名称")
+        parser.add_argument("--prompt-file", help="提示词文件，每行一条")
+        parser.add_argument("--concurrency", type=int, default=4, help="并发数，默认为 4")
+        parser.add_argument("--requests", type=int, default=10, help="每个模型的请求数，默认为 10")
+        options = self.parse_command_args(parser, args)
+        if options is None:
+            return
+
+        from benchmark import ModelBenchmark, load_prompts, summarize
+
+        try:
+            bench = ModelBenchmark(
+                self.client,
+                load_prompts(options.prompt_file),
+                concurrency=options.concurrency,
+                requests=options.requests,
+                keep_alive=self.keep_alive,
+                cancelled=self.cancel_event(),
+            )
+            total = options.requests * len(options.models)
+            with self.console.status(f"[bold blue]压测中（{total} 个请求，并发 {options.concurrency}）..."):
+                results = bench.run(options.models)
+        except (OSError, ValueError) as e:
+            self.console.print(f"[red]错误: {e}[/red]")
+            return
+
+        def fmt(value: Optional[float], unit: str = "s") -> str:
+            return "-" if value is None else f"{value:.2f}{unit}"
+
+        if bench.cancelled.is_set():
+            self.console.print("[yellow]⛔️ 压测已取消，以下仅统计已完成的请求[/yellow]")
+
+        table = Table(title="🏁 性能测试结果", show_header=True, header_style="bold magenta")
+        table.add_column("🤖 模型", style="cyan")
+        table.add_column("请求/失败", justify="right")
+        table.add_column("TTFT p50/p95/p99", justify="right", style="green")
+        table.add_column("延迟 p50/p95/p99", justify="right", style="yellow")
+        table.add_column("tokens/s", justify="right", style="blue")
+        table.add_column("prompt eval", justify="right")
+        table.add_column("加载(max)", justify="right", style="red")
+        table.add_column("吞吐 tokens/s", justify="right", style="magenta")
+
+        total_tokens = 0
+        for model, samples in results.items():
+            stats = summarize(samples, bench.elapsed)
+            total_tokens += stats["tokens"]
+            table.add_row(
+                model,
+                f"{stats['requests']}/{stats['errors']}",
+                " / ".join(fmt(stats[f"ttft_p{p}"]) for p in (50, 95, 99)),
+                " / ".join(fmt(stats[f"latency_p{p}"]) for p in (50, 95, 99)),
+                fmt(stats["tokens_per_second"], ""),
+                fmt(stats["prompt_eval"]),
+                fmt(stats["load_max"]),
+                fmt(stats["throughput"], ""),
+            )
+            errors = [s["error"] for s in samples if s["error"]]
+            if errors:
+                self.console.print(f"[yellow]⚠️ {model}: {errors[0]}[/yellow]")
+
+        self.console.print(table)
+        throughput = total_tokens / bench.elapsed if bench.elapsed else 0.0
+        self.console.print(f"[bold]总耗时 {bench.elapsed:.2f}s · 合计 {total_tokens} tokens · 总吞吐 {throughput:.1f} tokens/s[/bold]")
+
+    def top_processes(self, *args: List[str]) -> None:
+        """实时监控运行中的模型，自适应轮询，只在变化时重绘"""
+        parser = argparse.ArgumentParser(prog="top", description="实时监控运行中的模型")
+        parser.add_argument("--hosts", help="同时监控的其他服务器，逗号分隔")
+        parser.add_argument("--interval", type=float, default=1.0, help="最短轮询间隔（秒），默认为 1")
+        parser.add_argument("--max-interval", type=float, default=10.0, help="无变化时的最长轮询间隔（秒），默认为 10")
+        parser.add_argument("--count", type=int, help="轮询次数，默认一直运行直到 Ctrl-C")
+        options = self.parse_command_args(parser, args)
+        if options is None:
+            return
+
+        from top import ProcessMonitor, run_top
+
+        # 每台服务器一个长连接会话，轮询不会每次新建连接
+        sessions = {self.host: self.session}
+        for host in (options.hosts or "").split(","):
+            host = host.strip().rstrip("/")
+            if not host or host in sessions:
+                continue
+            if not host.startswith(("http://", "https://")):
+                self.console.print(f"[red]错误: 服务器地址必须以 http:// 或 https:// 开头: {host}[/red]")
+                return
+            sessions[host] = OllamaSession(host, verify=should_verify(host), timeout=Timeout(10.0), max_connections=2)
+
+        monitor = ProcessMonitor(sessions, min_interval=options.interval, max_interval=options.max_interval)
+        try:
+            run_top(self.console, monitor, show_host=len(sessions) > 1, count=options.count)
+        finally:
+            for host, session in sessions.items():
+                if session is not self.session:
+                    session.close()
+
+    def run_batch(self, *args: List[str]) -> None:
+        """从 JSONL 文件批量推理，结果按完成顺序写出，可中断后继续"""
+        parser = argparse.ArgumentParser(prog="run", description="批量推理")
+        parser.add_argument("--prompts", required=True, help="输入文件（JSONL），每行包含 prompt 或 messages，可选 model / id / options")
+        parser.add_argument("--model", help="默认模型，输入行中的 model 字段优先")
+        parser.add_argument("--concurrency", type=int, default=4, help="并发数，建议与服务器的 OLLAMA_NUM_PARALLEL 一致，默认为 4")
+        parser.add_argument("--output", help="结果文件（JSONL），默认为 <prompts>.out.jsonl")
+        parser.add_argument("--resume", action="store_true", help="从上次的断点继续")
+        options = self.parse_command_args(parser, args)
+        if options is None:
+            return
+
+        from batch import BatchRunner
+        from rich.progress import Progress, SpinnerColumn, TextColumn
+
+        output = options.output or f"{options.prompts}.out.jsonl"
+        max_connections = self.session.limits.max_connections * (len(self.router.hosts) if self.router else 1)
+        if options.concurrency > max_connections:
+            self.console.print(
+                f"[yellow]⚠️ 并发数超过连接池上限 {max_connections}，"
+                "请同时调大 --max-connections[/yellow]"
+            )
+
+        try:
+            runner = BatchRunner(
+                self.generator,
+                model=options.model,
+                concurrency=options.concurrency,
+                keep_alive=self.keep_alive,
+                cancelled=self.cancel_event(),
+            )
+            with Progress(
+                SpinnerColumn(),
+                TextColumn("[bold blue]批量推理中... 已完成 {task.completed:.0f} 条"),
+                TextColumn("[dim]{task.fields[rate]}[/dim]"),
+                transient=True,
+                console=self.console,
+            ) as progress:
+                task = progress.add_task("run", total=None, rate="")
+                start = time.perf_counter()
+
+                def on_result(result: dict) -> None:
+                    elapsed = time.perf_counter() - start
+                    progress.update(task, advance=1, rate=f"{runner.completed / elapsed:.1f} 条/秒" if elapsed else "")
+
+                stats = runner.run(options.prompts, output, resume=options.resume, on_result=on_result)
+            self.console.print(
+                f"[green]✅ 批量推理完成：{stats['completed']} 条，失败 {stats['failed']} 条，结果已写入 {output}[/green]"
+            )
+        except KeyboardInterrupt:
+            self.console.print(f"\n[yellow]⛔️ 已中断，使用 run --prompts {options.prompts} --resume 继续[/yellow]")
+        except (OSError, ValueError) as e:
+            self.console.print(f"[red]错误: {e}[/red]")
+
+    def embed_texts(self, *args: List[str]) -> None:
+        """批量向量化文本文件，向量写入 float32 .npy"""
+        parser = argparse.ArgumentParser(prog="embed", description="批量向量化")
+        parser.add_argument("model", help="向量模型名称")
+        parser.add_argument("--input", required=True, help="输入文件，每行一条文本")
+        parser.add_argument("--field", help="输入为 JSONL 时取该字段作为文本")
+        parser.add_argument("--output", help="向量文件（.npy），默认为 <input>.npy，偏移索引写入 <output>.offsets.npy")
+        parser.add_argument("--batch-size", type=int, default=64, help="每个请求包含的文本数，默认为 64")
+        parser.add_argument("--concurrency", type=int, default=4, help="同时在途的批次数，默认为 4")
+        parser.add_argument("--no-truncate", action="store_true", help="超过上下文长度时报错而不是截断")
+        options = self.parse_command_args(parser, args)
+        if options is None:
+            return
+
+        from embed import EmbedRunner, index_path
+        from rich.progress import Progress, SpinnerColumn, TextColumn
+
+        output = options.output or f"{options.input}.npy"
+        try:
+            runner = EmbedRunner(
+                self.session,
+                options.model,
+                batch_size=options.batch_size,
+                concurrency=options.concurrency,
+                keep_alive=self.keep_alive,
+                truncate=not options.no_truncate,
+                cancelled=self.cancel_event(),
+            )
+            with Progress(
+                SpinnerColumn(),
+                TextColumn("[bold blue]向量化中... 已完成 {task.completed:.0f} 条"),
+                TextColumn("[dim]{task.fields[rate]}[/dim]"),
+                transient=True,
+                console=self.console,
+            ) as progress:
+                task = progress.add_task("embed", total=None, rate="")
+                start = time.perf_counter()
+
+                def on_batch(runner) -> None:
+                    elapsed = time.perf_counter() - start
+                    progress.update(task, completed=runner.docs, rate=f"{runner.docs / elapsed:.1f} docs/s" if elapsed else "")
+
+                stats = runner.run(options.input, output, field=options.field, on_batch=on_batch)
+        except KeyboardInterrupt:
+            self.console.print(f"\n[yellow]⛔️ 已中断，已完成的 {runner.docs} 条向量已写入 {output}[/yellow]")
+            return
+        except ConnectionError as e:
+            self.print_connection_error(e)
+            return
+        except (OSError, ValueError) as e:
+            self.console.print(f"[red]错误: {e}[/red]")
+            return
+
+        if runner.errors:
+            self.console.print(f"[yellow]⚠️ {stats['failed']} 条失败: {runner.errors[0]}[/yellow]")
+        rate = stats["docs_per_second"]
+        self.console.print(
+            Panel.fit(
+                f"文档数: {stats['docs']}（{stats['batches']} 批）\n"
+                f"向量维度: {stats['dim'] or '-'}\n"
+                f"耗时: {stats['elapsed']:.2f}s，{rate or 0:.1f} docs/s\n"
+                f"向量: {output}\n"
+                f"偏移索引: {index_path(output)}",
+                title="✅ 向量化完成",
+                border_style="green",
+            )
+        )
+
+    def warm_models(self, *args: List[str]) -> None:
+        """按显存预算预加载模型，或按时间表在指定时间段内常驻模型"""
+        parser = argparse.ArgumentParser(prog="warm", description="预加载模型")
+        parser.add_argument("models", nargs="*", help="按优先级排列的模型名称")
+        parser.add_argument("--budget", help="显存预算（如 24GB），放不下时先卸载最早过期的其他模型")
+        parser.add_argument("--keep-alive", help="加载后保持的时间，默认与 --keep-alive 启动参数相同")
+        parser.add_argument("--dry-run", action="store_true", help="只显示计划，不实际加载")
+        parser.add_argument("--schedule", help="时间表（JSON），按时间段常驻模型，一直运行直到 Ctrl-C")
+        parser.add_argument("--interval", type=float, default=60.0, help="时间表模式的检查间隔（秒），默认为 60")
+        parser.add_argument("--count", type=int, help="时间表模式的检查次数，默认一直运行")
+        options = self.parse_command_args(parser, args)
+        if options is None:
+            return
+        if not options.models and not options.schedule:
+            self.console.print("[red]错误: 请指定模型名称或 --schedule[/red]")
+            return
+
+        from warmer import EVICT, KEEP, LOAD, ModelWarmer, Schedule, run_schedule
+        from rich.progress import Progress, SpinnerColumn, TextColumn
+
+        if options.dry_run:
+            labels = {LOAD: "[green]待加载[/green]", KEEP: "[cyan]已在显存中[/cyan]", EVICT: "[yellow]待卸载[/yellow]"}
+        else:
+            labels = {LOAD: "[green]已加载[/green]", KEEP: "[cyan]已在显存中[/cyan]", EVICT: "[yellow]已卸载[/yellow]"}
+
+        def step_row(step: dict) -> Tuple[str, ...]:
+            action = labels.get(step["action"]) or f"[red]跳过[/red] [dim]{step.get('reason', '')}[/dim]"
+            load = step.get("load_duration")
+            return (
+                step["model"],
+                action,
+                format_size(step["size"]) if step.get("size") else "-",
+                f"{load:.2f}s" if load else "-",
+            )
+
+        def steps_table(title: str, steps: List[dict]) -> Table:
+            table = Table(title=title, show_header=True, header_style="bold magenta")
+            table.add_column("🤖 模型名称", style="cyan")
+            table.add_column("操作")
+            table.add_column("💾 显存（估算）", justify="right", style="green")
+            table.add_column("⏱️ 加载耗时", justify="right", style="yellow")
+            for step in steps:
+                table.add_row(*step_row(step))
+            return table
+
+        try:
+            warmer = ModelWarmer(self.session, budget=parse_size(options.budget) if options.budget else None)
+            keep_alive = options.keep_alive or self.keep_alive
+            if options.schedule:
+                schedule = Schedule.load(options.schedule)
+
+                def on_tick(hot: List[str], steps: List[dict], released: List[str], error: Optional[str]) -> None:
+                    now = time.strftime("%H:%M:%S")
+                    if error:
+                        self.console.print(f"[red]{now} 检查失败: {error}[/red]")
+                    if released:
+                        self.console.print(f"[dim]{now} 时间段结束，不再常驻: {', '.join(released)}[/dim]")
+                    changed = [step for step in steps if step["action"] != KEEP]
+                    if changed:
+                        self.console.print(steps_table(f"⏰ {now} 常驻模型", changed))
+                    elif not released and not error:
+                        self.console.print(f"[dim]{now} 常驻 {len(hot)} 个模型，无变化[/dim]")
+
+                self.console.print(f"[bold]⏰ 按时间表 {options.schedule} 常驻模型，每 {options.interval:g}s 检查一次，Ctrl-C 结束[/bold]")
+                run_schedule(
+                    warmer,
+                    schedule,
+                    keep_alive,
+                    interval=options.interval,
+                    count=options.count,
+                    cancelled=self.cancel_event(),
+                    on_tick=on_tick,
+                )
+                return
+
+            if options.dry_run:
+                self.console.print(steps_table("🔥 预热计划", warmer.plan(options.models)))
+                return
+            with Progress(
+                SpinnerColumn(),
+                TextColumn("[bold blue]{task.description}"),
+                transient=True,
+                console=self.console,
+            ) as progress:
+                task = progress.add_task("正在规划...")
+
+                def on_step(step: dict) -> None:
+                    progress.update(task, description=f"已处理 {step['model']}")
+
+                steps = warmer.warm(options.models, keep_alive, cancelled=self.cancel_event(), on_step=on_step)
+            self.console.print(steps_table("🔥 预热结果", steps))
+        except KeyboardInterrupt:
+            self.console.print("\n[yellow]⛔️ 已停止[/yellow]")
+        except ConnectionError as e:
+            self.print_connection_error(e)
+        except HTTPError as e:
+            self.print_http_error(e)
+        except (OSError, ValueError) as e:
+            self.console.print(f"[red]错误: {e}[/red]")
+
+    def unload_models(self, *args: List[str]) -> None:
+        """从显存中卸载模型（keep_alive=0），unload --all 卸载全部已加载的模型"""
+        if not args:
+            self.console.print("[red]错误: 请指定模型名称或 --all[/red]")
+            return
+
+        from warmer import ModelWarmer
+
+        warmer = ModelWarmer(self.session)
+        try:
+            models = list(warmer.resident()) if "--all" in args else [model for model in args if model != "--all"]
+            if not models:
+                self.console.print("[yellow]⚠️ 没有正在运行的模型[/yellow]")
+                return
+            for model in models:
+                warmer.unload(model)
+                self.console.print(f"[green]✅ 已卸载 {model}[/green]")
+        except ConnectionError as e:
+            self.print_connection_error(e)
+        except HTTPError as e:
+            self.print_http_error(e)
+
+    def show_response_cache(self, *args: List[str]) -> None:
+        """显示响应缓存的命中率与占用空间，cache clear 清空缓存"""
+        if self.response_cache is None:
+            self.console.print("[yellow]未启用响应缓存，启动时使用 --response-cache 开启[/yellow]")
+            return
+        if args and args[0] == "clear":
+            self.response_cache.clear()
+            self.console.print("[green]✅ 响应缓存已清空[/green]")
+            return
+
+        stats = self.response_cache.stats()
+        hit_rate = "-" if stats["hit_rate"] is None else f"{stats['hit_rate'] * 100:.1f}%"
+        self.console.print(
+            Panel.fit(
+                f"位置: {stats['path']}\n"
+                f"条目: {stats['entries']}\n"
+                f"占用: {stats['bytes'] / 1024 / 1024:.1f}MB / {stats['max_bytes'] / 1024 / 1024:.0f}MB\n"
+                f"命中: {stats['hits']}，未命中: {stats['misses']}，命中率: {hit_rate}\n"
+                f"淘汰: {stats['evictions']}\n"
+                f"未使用缓存（模型版本未知或主机间不一致）: {stats['bypasses']}",
+                title="💾 响应缓存",
+                border_style="blue",
+            )
+        )
+
+    def show_stats(self, *args: List[str]) -> None:
+        """显示各阶段耗时统计，stats reset 清空已记录的数据"""
+        if args and args[0] == "reset":
+            TRACER.reset()
+            self.console.print("[green]✅ 统计数据已清空[/green]")
+            return
+
+        from instrument import HISTOGRAM_BASE, HISTOGRAM_BUCKETS, sparkline
+
+        summary = TRACER.summary()
+        if not summary:
+            self.console.print("[yellow]暂无统计数据[/yellow]")
+            return
+
+        def ms(seconds: float) -> str:
+            return f"{seconds * 1000:.1f}"
+
+        low, high = HISTOGRAM_BASE * 1000, HISTOGRAM_BASE * 2 ** (HISTOGRAM_BUCKETS - 1)
+        table = Table(title="📊 耗时统计（毫秒）", show_header=True, header_style="bold magenta")
+        table.add_column("指标", style="cyan")
+        table.add_column("次数", justify="right")
+        table.add_column("平均", justify="right", style="green")
+        table.add_column("p50", justify="right")
+        table.add_column("p95", justify="right", style="yellow")
+        table.add_column("最大", justify="right", style="red")
+        table.add_column(f"分布 {low:g}ms~{high:.0f}s", style="blue")
+        for name, stats in summary.items():
+            table.add_row(
+                name,
+                str(stats["count"]),
+                ms(stats["mean"]),
+                ms(stats["p50"]),
+                ms(stats["p95"]),
+                ms(stats["max"]),
+                sparkline(stats["histogram"]),
+            )
+        self.console.print(table)
+        counters = TRACER.counters
+        self.console.print(
+            f"[dim]请求 {counters['http.requests']:.0f} 次，失败 {counters['http.errors']:.0f} 次，"
+            f"发送 {counters['http.bytes_sent'] / 1024:.1f}KB，接收 {counters['http.bytes_received'] / 1024:.1f}KB[/dim]"
+        )
+
+    def show_pool(self, *args: List[str]) -> None:
+        """显示主机池中各主机的模型数、已加载的模型、负载与延迟"""
+        if not self.router:
+            self.console.print("[yellow]未指定主机池，启动时使用 --pool h1,h2 指定[/yellow]")
+            return
+
+        with self.console.status("[bold blue]正在刷新主机状态..."):
+            self.router.refresh()
+
+        table = Table(title="🛰️ 主机池", show_header=True, header_style="bold magenta")
+        table.add_column("主机", style="cyan")
+        table.add_column("状态")
+        table.add_column("模型数", justify="right")
+        table.add_column("已加载", style="green")
+        table.add_column("进行中", justify="right")
+        table.add_column("请求", justify="right")
+        table.add_column("失败", justify="right", style="red")
+        table.add_column("延迟", justify="right", style="yellow")
+        errors = []
+        for host in self.router.snapshot():
+            if host["state"] != "closed":
+                state = f"[red]{host['state']}[/red]"
+            elif host["error"]:
+                state = "[yellow]异常[/yellow]"
+                errors.append(f"{host['host']}: {host['error']}")
+            else:
+                state = "[green]正常[/green]"
+            table.add_row(
+                host["host"],
+                state,
+                "-" if host["models"] is None else str(host["models"]),
+                ", ".join(host["resident"]) or "-",
+                str(host["inflight"]),
+                str(host["requests"]),
+                str(host["failures"]),
+                "-" if host["srtt"] is None else f"{host['srtt'] * 1000:.1f}ms",
+            )
+        self.console.print(table)
+        for error in errors:
+            self.console.print(f"[dim]{error}[/dim]")
+        if self.router.failovers:
+            self.console.print(f"[dim]已切换主机 {self.router.failovers} 次[/dim]")
+
     def show_help(self, *args: List[str]) -> None:
         """显示帮助信息"""
         table = Table(title="✨ 命令列表", show_header=True, header_style="bold magenta")
@@ -365,13 +1127,25 @@ class OllamaShell:
         table.add_column("用法", style="yellow", justify="left")
 
         commands_help = [
-            ("list", "📃 列出所有可用的模型", "list"),
-            ("pull", "📥 拉取指定的模型", "pull <model_name>"),
-            ("show", "🔍 显示模型详细信息", "show <model_name>"),
-            ("chat", "💬 与模型进行对话", "chat <model_name>"),
+            ("list", "📃 列出模型，支持筛选、排序与分页", "list [--filter P] [--family F] [--quant Q] [--sort size|modified|params] [--limit N --page P]"),
+            ("pull", "📥 拉取指定的模型", "pull <model...> [--parallel N] [--resume]"),
+            ("show", "🔍 显示模型详细信息", "show <model...> | show --all"),
+            ("chat", "💬 与模型进行对话", "chat <model_name> [--temperature T] [--seed N]"),
             ("ps", "⚡️ 显示运行中的模型", "ps"),
             ("rm", "🗑️  删除指定模型","rm <model_name>"),
             ("version", "📌 显示版本信息", "version"),
+            ("bench", "🏁 并发测试模型的首 token 延迟与生成速度", "bench <model...> [--prompt-file F] [--concurrency N] [--requests M]"),
+            ("top", "📈 实时监控运行中的模型与显存占用", "top [--hosts h1,h2] [--interval S] [--max-interval S]"),
+            ("run", "📦 从 JSONL 文件批量推理，支持断点续跑", "run --prompts F [--model M] [--concurrency N] [--output O] [--resume]"),
+            ("embed", "🧮 批量向量化，输出 float32 .npy 与偏移索引", "embed <model> --input F [--batch-size N] [--concurrency N] [--output O]"),
+            ("stats", "📊 各阶段耗时（连接 / 等待 / 接收 / 解码 / 渲染）、传输字节与服务器耗时", "stats [reset]"),
+            ("jobs", "📋 查看后台任务（命令末尾加 & 即在后台运行）", "jobs"),
+            ("wait", "⏳ 等待后台任务结束并显示输出", "wait [id...]"),
+            ("cancel", "⛔️ 取消后台任务", "cancel <id...>"),
+            ("pool", "🛰️ 主机池中各主机的模型、负载与延迟（启动时用 --pool 指定）", "pool"),
+            ("warm", "🔥 按显存预算预加载模型，或按时间表常驻模型", "warm <model...> [--budget 24GB] [--dry-run] | warm --schedule F"),
+            ("unload", "🧊 从显存中卸载模型", "unload <model...> | unload --all"),
+            ("cache", "💾 响应缓存的条目数、占用空间与命中率（启动时用 --response-cache 开启）", "cache [clear]"),
             ("help", "❓ 显示帮助信息", "help"),
             ("exit", "🚪 退出程序", "exit"),
         ]
@@ -383,30 +1157,40 @@ class OllamaShell:
 
     def exit_shell(self, *args: List[str]) -> None:
         """退出程序"""
+        running = self.jobs.running()
+        if running:
+            self.console.print(f"[yellow]⛔️ 正在取消 {len(running)} 个后台任务...[/yellow]")
+        self.jobs.shutdown()
         self.console.print("[yellow]👋 再见！✨[/yellow]")
+        if self.router:
+            self.router.close()
+        else:
+            self.session.close()
+        if self.response_cache is not None:
+            self.response_cache.close()
         sys.exit(0)
 
+    def fetch_model_list(self) -> List[str]:
+        """从服务器获取模型名称列表并重建索引，失败时抛出异常"""
+        from catalog import ModelIndex
+
+        self.model_index = ModelIndex.from_models(extract_models(self.client.list()) or [])
+        return [record["name"] for record in self.model_index.records]
+
     def get_model_list(self) -> List[str]:
-        """获取模型列表"""
-        try:
-            models = self.client.list()
-            if hasattr(models, "models"):
-                return [model.model for model in models.models]
-            elif isinstance(models, list):
-                return [model.model for model in models]
-            return []
-        except Exception:
-            return []
-
-    def get_command_completer(self) -> WordCompleter:
-        """创建命令补全器"""
-        # 获取所有命令
-        commands = list(self.commands.keys())
-        # 获取所有模型
-        models = self.get_model_list()
-        # 创建补全器
-        word_list = commands + [f"{cmd} {model}" for cmd in ["chat", "show", "pull"] for model in models]
-        return WordCompleter(word_list, ignore_case=True)
+        """获取模型列表（读取缓存，过期时后台刷新）"""
+        return list(self.model_cache.get())
+
+    def get_command_completer(self) -> "ShellCompleter":
+        """创建命令补全器，模型集合未变化时复用上一次的结果"""
+        from catalog import NameIndex
+        from completer import ShellCompleter
+
+        models = self.model_cache.get()
+        if self._completer is None or self._completer_version != self.model_cache.version:
+            self._completer = ShellCompleter(self.commands.keys(), NameIndex(models))
+            self._completer_version = self.model_cache.version
+        return self._completer
 
     def run(self) -> None:
         """运行交互式shell"""
@@ -418,28 +1202,44 @@ class OllamaShell:
             )
         )
 
-        # 创建命令行会话
-        session = PromptSession()
+        self.preflight()
+
+        # 创建命令行会话，补全器在后台线程中计算，模型列表由缓存异步刷新
+        import asyncio
+
+        from prompt_toolkit import PromptSession
+        from prompt_toolkit.completion import DynamicCompleter, ThreadedCompleter
+
+        session = PromptSession(
+            completer=ThreadedCompleter(DynamicCompleter(self.get_command_completer)),
+            complete_while_typing=True,
+        )
+        self.model_cache.refresh_async()
 
         while True:
             try:
-                # 获取最新的补全器
-                completer = self.get_command_completer()
-                # 显示提示符并等待输入
-                command = session.prompt(
-                    "\n🤖 ollama> ",
-                    completer=completer,
-                    complete_while_typing=True,
-                )
+                # 显示提示符并等待输入，前台命令在两次输入之间同步执行
+                command = asyncio.run(self.read_command(session))
 
                 args = command.strip().split()
                 if not args:
                     continue
 
+                # 以 & 结尾的命令在后台运行
+                background = args[-1] == "&" or args[-1].endswith("&")
+                if background:
+                    args[-1] = args[-1].rstrip("&")
+                    args = [arg for arg in args if arg]
+                    if not args:
+                        continue
+
                 cmd, *cmd_args = args
-                if cmd in self.commands:
+                if background:
+                    self.start_job(cmd, cmd_args)
+                elif cmd in self.commands:
                     func, _ = self.commands[cmd]
-                    func(*cmd_args)
+                    with TRACER.span(command.strip(), "command", metric=f"command.{cmd}"):
+                        func(*cmd_args)
                 else:
                     self.console.print(f"[red]❌ 未知命令: {cmd}[/red]")
                     self.console.print("[yellow]❓ 输入 'help' 查看可用命令[/yellow]")
@@ -450,16 +1250,108 @@ class OllamaShell:
             except EOFError:
                 self.console.print("\n[yellow]👋 再见！✨[/yellow]")
                 break
-            except ConnectionError:
-                self.console.print("[red]连接服务器失败[/red]")
+            except ConnectionError as e:
+                self.print_connection_error(e)
             except TimeoutError:
                 self.console.print("[red]请求超时[/red]")
             except HTTPError as e:
-                self.console.print(f"[red]HTTP 错误: {e.response.status_code}[/red]")
+                self.print_http_error(e)
             except Exception as e:
                 self.console.print("[red]发生未知错误[/red]")
                 logging.error(f"Unexpected error: {str(e)}")
                 break
+        self.jobs.shutdown()
+
+    async def read_command(self, session) -> str:
+        """等待输入；提示符显示期间，后台任务的通知经 patch_stdout 打印在提示符上方"""
+        from prompt_toolkit.patch_stdout import patch_stdout
+
+        with patch_stdout(raw=True):
+            self.jobs.set_prompt_active(True)
+            try:
+                return await session.prompt_async("\n🤖 ollama> ")
+            finally:
+                self.jobs.set_prompt_active(False)
+
+    def start_job(self, cmd: str, cmd_args: List[str]) -> Optional["Job"]:
+        """在后台运行命令，输出写入任务自己的缓冲区"""
+        if cmd not in BACKGROUND_COMMANDS:
+            self.console.print(f"[red]❌ {cmd} 不能在后台运行，支持: {', '.join(BACKGROUND_COMMANDS)}[/red]")
+            return None
+        func, _ = self.commands[cmd]
+        command = " ".join([cmd, *cmd_args])
+
+        def target(job: "Job") -> None:
+            self._local.console = job.console
+            self._local.cancelled = job.cancelled
+            try:
+                with TRACER.span(command, "command", metric=f"command.{cmd}"):
+                    func(*cmd_args)
+            finally:
+                self._local.console = None
+                self._local.cancelled = None
+
+        job = self.jobs.submit(command, target, width=self._console.width)
+        self.console.print(f"[cyan][{job.id}] 🚀 已在后台运行: {command}[/cyan]")
+        return job
+
+    def list_jobs(self, *args: List[str]) -> None:
+        """列出后台任务"""
+        if not self.jobs.jobs:
+            self.console.print("[yellow]没有后台任务，在命令末尾加上 & 即可在后台运行[/yellow]")
+            return
+        table = Table(title="📋 后台任务", show_header=True, header_style="bold magenta")
+        table.add_column("ID", justify="right", style="cyan")
+        table.add_column("命令", style="white")
+        table.add_column("状态", style="green")
+        table.add_column("耗时", justify="right", style="yellow")
+        for job in self.jobs.jobs.values():
+            table.add_row(str(job.id), job.command, job.status, f"{job.elapsed:.1f}s")
+        self.console.print(table)
+
+    def _select_jobs(self, args: Tuple[str, ...]) -> Optional[List["Job"]]:
+        jobs = []
+        for arg in args:
+            job = self.jobs.get(int(arg)) if arg.isdigit() else None
+            if job is None:
+                self.console.print(f"[red]❌ 没有编号为 {arg} 的任务[/red]")
+                return None
+            jobs.append(job)
+        return jobs
+
+    def wait_jobs(self, *args: List[str]) -> None:
+        """等待指定（默认全部运行中的）任务结束并显示其输出，Ctrl-C 停止等待"""
+        jobs = self._select_jobs(args)
+        if jobs is None:
+            return
+        if not jobs:
+            jobs = self.jobs.running()
+            if not jobs:
+                self.console.print("[yellow]没有运行中的后台任务[/yellow]")
+                return
+        try:
+            with self.console.status(f"[bold blue]等待 {len(jobs)} 个任务..."):
+                self.jobs.wait(jobs)
+        except KeyboardInterrupt:
+            self.console.print("\n[yellow]⛔️ 已停止等待，任务仍在后台运行[/yellow]")
+            return
+        for job in jobs:
+            self.console.rule(f"[{job.id}] {job.command} · {job.status}")
+            self.console.file.write(job.output())
+            if job.error is not None:
+                self.console.print(f"[red]{type(job.error).__name__}: {job.error}[/red]")
+
+    def cancel_job(self, *args: List[str]) -> None:
+        """请求取消后台任务；pull / bench / run / embed 会尽快停止，其他命令在当前请求结束后退出"""
+        if not args:
+            self.console.print("[red]错误: 请指定任务编号[/red]")
+            return
+        jobs = self._select_jobs(args)
+        for job in jobs or []:
+            if self.jobs.cancel(job.id):
+                self.console.print(f"[yellow]⛔️ 已请求取消任务 {job.id}: {job.command}[/yellow]")
+            else:
+                self.console.print(f"[yellow]任务 {job.id} 已结束[/yellow]")
 
     def delete_model(self, *args: List[str]) -> None:
         """删除指定的模型"""
@@ -479,6 +1371,8 @@ class OllamaShell:
             self.console.print("[dim]输入 'yes' 确认删除，其他输入取消[/dim]")
             
             # 创建确认会话
+            from prompt_toolkit import PromptSession
+
             confirm_session = PromptSession()
             confirm = confirm_session.prompt("\n确认> ")
             
@@ -486,22 +1380,18 @@ class OllamaShell:
                 self.console.print("[yellow]已取消删除操作[/yellow]")
                 return
 
-            with Progress(
-                SpinnerColumn(),
-                TextColumn(f"[bold red]正在删除模型 {model_name}..."),
-                transient=True,
-            ) as progress:
-                progress.add_task("delete")
+            with self.console.status(f"[bold red]正在删除模型 {model_name}..."):
                 self.client.delete(model_name)
             
             self.console.print(f"[green]✅ 模型 {model_name} 已成功删除！[/green]")
+            self.invalidate_models()
 
-        except ConnectionError:
-            self.console.print("[red]连接服务器失败[/red]")
+        except ConnectionError as e:
+            self.print_connection_error(e)
         except TimeoutError:
             self.console.print("[red]请求超时[/red]")
         except HTTPError as e:
-            self.console.print(f"[red]HTTP 错误: {e.response.status_code}[/red]")
+            self.print_http_error(e)
         except Exception as e:
             self.console.print("[red]发生未知错误[/red]")
             logging.error(f"Unexpected error: {str(e)}")
@@ -509,26 +1399,17 @@ class OllamaShell:
     def show_version(self, *args: List[str]) -> None:
         """显示 Ollama 版本信息"""
         try:
-            with Progress(
-                SpinnerColumn(),
-                TextColumn("[bold blue]获取版本信息..."),
-                transient=True,
-            ) as progress:
-                progress.add_task("fetch")
-                # 使用保存的 verify_ssl 设置
-                import httpx
-                response = httpx.get(
-                    f"{self.host}/api/version",
-                    verify=self.verify_ssl
-                )
-                response.raise_for_status()
-                data = response.json()
+            with self.console.status("[bold blue]获取版本信息..."):
+                # 复用共享连接池
+                data = self.session.get_json("/api/version")
                 
             if not data or 'version' not in data:
                 self.console.print("[yellow]⚠️ 无法获取版本信息[/yellow]")
                 return
 
             version = data['version']
+            if self.store is not None:
+                self.store.save_version(self.host, version)
             # 创建面板显示版本信息
             panel = Panel.fit(
                 f"[bold cyan]Ollama 版本:[/bold cyan] {version}",
@@ -537,33 +1418,269 @@ class OllamaShell:
             )
             self.console.print(panel)
 
-        except ConnectionError:
-            self.console.print("[red]连接服务器失败[/red]")
+        except ConnectionError as e:
+            self.print_connection_error(e)
         except TimeoutError:
             self.console.print("[red]请求超时[/red]")
         except HTTPError as e:
-            self.console.print(f"[red]HTTP 错误: {e.response.status_code}[/red]")
+            self.print_http_error(e)
         except Exception as e:
             self.console.print("[red]获取版本信息时发生错误[/red]")
             logging.error(f"Version info error: {str(e)}")
 
 
-def main():
-    # 创建命令行解析器
-    parser = argparse.ArgumentParser(description="Ollama Shell - 一个功能强大的 Ollama 命令行工具")
+def run_scan(args: argparse.Namespace) -> None:
+    """非交互式批量扫描模式"""
+    from scanner import SCAN_FIELDS, Scanner, iter_targets, open_targets, scan_rows
+    from store import ResultStore
+
+    console = Console(stderr=True)
+    store = ResultStore(args.store) if (args.store or args.incremental) else None
+    scanner = Scanner(
+        concurrency=args.concurrency,
+        connect_timeout=args.connect_timeout,
+        read_timeout=args.read_timeout,
+        details=args.details,
+        store=store,
+        incremental=args.incremental,
+    )
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    fmt = args.format or "jsonl"
+    writer = create_writer(fmt, output, fields=SCAN_FIELDS, title="📡 扫描结果")
+
+    def sink(result: dict) -> None:
+        if store is not None:
+            store.save_scan(result)
+        if fmt == "jsonl":
+            writer.write(result)
+        else:
+            for row in scan_rows(result):
+                writer.write(row)
+
+    try:
+        with open_targets(args.targets) as targets:
+            with console.status("[bold blue]扫描中..."):
+                stats = scanner.scan(iter_targets(targets), sink, tick=writer.tick)
+    finally:
+        writer.close()
+        if output is not sys.stdout:
+            output.close()
+        if store is not None:
+            store.close()
+
+    rate = stats["total"] / stats["elapsed"] if stats["elapsed"] else 0.0
+    console.print(
+        Panel.fit(
+            f"[bold cyan]目标总数:[/bold cyan] {stats['total']}\n"
+            + f"[bold green]存活:[/bold green] {stats['alive']}\n"
+            + f"[bold red]失败:[/bold red] {stats['failed']}\n"
+            + (f"[bold]未变化:[/bold] {stats['unchanged']}\n" if args.incremental else "")
+            + (f"[bold]详情请求:[/bold] {stats['show']}（命中缓存 {stats['show_skipped']}）\n" if args.details else "")
+            + f"[bold yellow]耗时:[/bold yellow] {stats['elapsed']:.1f}s ({rate:.1f} 个/秒)",
+            title="📡 扫描完成",
+            border_style="green",
+        )
+    )
+
+
+# 可以直接在命令行执行、不进入交互式 shell 的命令
+ONE_SHOT_COMMANDS = {
+    "list": "📃 列出可用模型",
+    "ps": "⚡️ 显示运行中的模型",
+    "show": "🔍 显示模型详情",
+    "pull": "📥 拉取模型",
+    "rm": "🗑️ 删除指定模型",
+    "version": "📌 显示版本信息",
+    "bench": "🏁 模型性能测试",
+    "top": "📈 实时监控运行中的模型",
+    "run": "📦 批量推理",
+    "embed": "🧮 批量向量化",
+    "pool": "🛰️ 查看主机池状态",
+    "warm": "🔥 预加载模型",
+    "unload": "🧊 卸载模型",
+    "cache": "💾 响应缓存统计",
+}
+
+
+# 可以在后台运行的命令（不需要交互输入、也不独占终端）
+BACKGROUND_COMMANDS = ("pull", "bench", "run", "embed", "show", "list", "ps", "version", "warm", "unload")
+
+
+def add_shell_arguments(parser: argparse.ArgumentParser, suppress: bool = False) -> None:
+    """添加交互模式与单次命令共用的参数
+
+    子命令上的同名参数使用 SUPPRESS 作为默认值，避免覆盖写在子命令之前的取值。
+    """
+
+    def default(value):
+        return argparse.SUPPRESS if suppress else value
+
     parser.add_argument(
         "-H",
         "--host",
-        default="http://localhost:11434",
+        default=default("http://localhost:11434"),
         help="Ollama 服务器地址，默认为 http://localhost:11434",
     )
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=FORMATS,
+        default=default(None),
+        help="输出格式：jsonl / csv / table，批量扫描默认为 jsonl，交互模式默认为 table",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=default(30.0),
+        help="交互模式下模型列表（命令补全）缓存时间（秒），默认为 30",
+    )
+    parser.add_argument(
+        "--history-chars",
+        type=int,
+        default=default(16000),
+        help="对话上下文保留的最大字符数，超出后淘汰最早的轮次，默认为 16000",
+    )
+    parser.add_argument(
+        "--keep-alive",
+        default=default("10m"),
+        help="对话结束后模型在服务器上保持加载的时间，默认为 10m",
+    )
+    parser.add_argument(
+        "--max-connections",
+        type=int,
+        default=default(20),
+        help="连接池的最大连接数，默认为 20",
+    )
+    parser.add_argument(
+        "--pool",
+        type=lambda value: [host for host in value.split(",") if host.strip()],
+        default=default(None),
+        help="主机池：其他服务器地址，逗号分隔；指定后 chat / run 在 --host 与这些服务器之间按已加载的模型、负载与延迟路由，失败时自动切换",
+    )
+    parser.add_argument(
+        "--response-cache",
+        nargs="?",
+        const="",
+        default=default(None),
+        help="开启响应缓存：temperature 为 0 或指定了 seed 的 chat / run 请求按模型 digest、输入与参数缓存回答，"
+        "可指定缓存文件，默认为 ~/.ollama-scan/responses.db",
+    )
+    parser.add_argument(
+        "--response-cache-size",
+        type=parse_size,
+        default=default(512 * 1024 * 1024),
+        help="响应缓存的大小上限，超出后淘汰最久未使用的回答，默认为 512MB",
+    )
+    parser.add_argument(
+        "--trace",
+        default=default(None),
+        help="将每个请求各阶段的耗时以 Chrome trace 格式写入指定文件，可用 chrome://tracing 或 Perfetto 打开",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        default=default(False),
+        help="退出时输出耗时统计（同 stats 命令）",
+    )
+    parser.add_argument(
+        "--store",
+        default=default(None),
+        help="结果库（SQLite）路径，指定后 list / show / version 的结果也会保存，批量扫描默认为 ~/.ollama-scan/results.db",
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """创建命令行解析器"""
+    parser = argparse.ArgumentParser(description="Ollama Shell - 一个功能强大的 Ollama 命令行工具")
+    add_shell_arguments(parser)
+    parser.add_argument(
+        "-t",
+        "--targets",
+        help="批量扫描模式：目标列表文件，每行一个地址，'-' 表示从标准输入读取",
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=200,
+        help="批量扫描并发数，默认为 200",
+    )
+    parser.add_argument(
+        "--connect-timeout",
+        type=float,
+        default=3.0,
+        help="批量扫描连接超时（秒），默认为 3",
+    )
+    parser.add_argument(
+        "--read-timeout",
+        type=float,
+        default=10.0,
+        help="批量扫描读取超时（秒），默认为 10",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default="-",
+        help="批量扫描结果输出文件，默认输出到标准输出",
+    )
+    parser.add_argument(
+        "--details",
+        action="store_true",
+        help="批量扫描时同时获取每个模型的详情（/api/show）",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="增量扫描：已知 digest 不再请求详情，/api/tags 未变化的主机跳过详情请求",
+    )
+
+    # 单次命令：执行完直接退出，不启动交互式 shell，其余参数原样交给对应命令
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+    for name, description in ONE_SHOT_COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=description, add_help=False)
+        add_shell_arguments(subparser, suppress=True)
+    return parser
 
+
+def main():
     # 解析命令行参数
-    args = parser.parse_args()
+    parser = build_parser()
+    args, command_args = parser.parse_known_args()
+    if command_args and not args.command:
+        parser.error(f"无法识别的参数: {' '.join(command_args)}")
+
+    if args.targets:
+        run_scan(args)
+        return
 
     # 创建 shell 实例
-    shell = OllamaShell(host=args.host)
-    shell.run()
+    shell = OllamaShell(
+        host=args.host,
+        output_format=args.format or "table",
+        model_cache_ttl=args.cache_ttl,
+        history_chars=args.history_chars,
+        keep_alive=args.keep_alive,
+        max_connections=args.max_connections,
+        store_path=args.store,
+        pool=args.pool,
+        response_cache=args.response_cache,
+        response_cache_size=args.response_cache_size,
+    )
+    if args.trace:
+        TRACER.enable_trace()
+    try:
+        if args.command:
+            func, _ = shell.commands[args.command]
+            with TRACER.span(args.command, "command", metric=f"command.{args.command}"):
+                func(*command_args)
+        else:
+            shell.run()
+    finally:
+        if args.profile:
+            shell.show_stats()
+        if args.trace:
+            count = TRACER.write_trace(args.trace)
+            shell.console.print(f"[dim]已写入 {count} 个 span 到 {args.trace}[/dim]")
 
 
 if __name__ == "__main__":
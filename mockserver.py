@@ -0,0 +1,454 @@
+# -*- coding: utf-8 -*-
+"""
+本地模拟 Ollama 服务器：实现常用接口，可配置延迟、生成速度与故障注入，用于离线测试与性能基准
+
+用法：python mockserver.py [--port 11434] [--models 8] [--latency 0.01] [--token-rate 50] [--failure-rate 0.1]
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import socket
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+VERSION = "0.6.0-mock"
+FAILURE_MODES = ("500", "503", "reset", "hang", "invalid")
+FAMILIES = (("llama", "8B", "Q4_K_M"), ("qwen2", "7B", "Q4_0"), ("gemma", "2B", "Q8_0"), ("nomic-bert", "137M", "F16"))
+WORDS = "the quick brown fox jumps over a lazy dog while ollama streams tokens to the shell".split()
+
+
+class MockHTTPServer(ThreadingHTTPServer):
+    """客户端取消流式请求或超时断开是正常情况，不打印异常堆栈"""
+
+    daemon_threads = True
+
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+
+def fake_digest(name: str) -> str:
+    return hashlib.sha256(name.encode("utf-8")).hexdigest()
+
+
+def fake_models(count: int) -> List[Dict[str, Any]]:
+    """生成固定的模型列表，相同的数量总是得到相同的结果"""
+    modified = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    models = []
+    for i in range(count):
+        family, parameter_size, quantization = FAMILIES[i % len(FAMILIES)]
+        name = f"{family}-mock{i}:latest"
+        models.append(
+            {
+                "name": name,
+                "model": name,
+                "modified_at": (modified + timedelta(days=i)).isoformat(),
+                "size": (i + 1) * 1_000_000_000,
+                "digest": fake_digest(name),
+                "details": {
+                    "parent_model": "",
+                    "format": "gguf",
+                    "family": family,
+                    "families": [family],
+                    "parameter_size": parameter_size,
+                    "quantization_level": quantization,
+                },
+            }
+        )
+    return models
+
+
+class MockOllama:
+    """在后台线程中运行的模拟服务器
+
+    - latency：每个请求返回响应头之前的固定延迟（秒），jitter 为额外的随机延迟上限
+    - token_rate：流式生成的速度（tokens/s），0 表示不限速；tokens 为每次回答的 token 数
+    - load_time：未加载的模型在首次请求时的加载耗时（秒），keep_alive 为 0 的请求卸载模型
+    - failure_rate：请求失败的概率，failure_mode 为 500 / 503 / reset（断开连接）/ hang（不响应）/ invalid（200 但响应体不是 JSON）
+    - cut_after：流式生成发出这么多个分块后断开连接，模拟生成中途主机故障，None 表示不断开
+    - seed：随机数种子，保证延迟抖动与故障注入可复现
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        models: int = 8,
+        running: int = 2,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        token_rate: float = 0.0,
+        tokens: int = 64,
+        embedding_dim: int = 768,
+        load_time: float = 0.0,
+        failure_rate: float = 0.0,
+        failure_mode: str = "503",
+        cut_after: Optional[int] = None,
+        seed: int = 0,
+    ):
+        if failure_mode not in FAILURE_MODES:
+            raise ValueError(f"未知的故障类型: {failure_mode}")
+        self.models = fake_models(models)
+        self.running = list(self.models[:running])
+        self.latency = latency
+        self.jitter = jitter
+        self.token_rate = token_rate
+        self.tokens = tokens
+        self.embedding_dim = embedding_dim
+        self.load_time = load_time
+        self.cut_after = cut_after
+        self.failure_rate = failure_rate
+        self.failure_mode = failure_mode
+        self.requests = 0
+        self.failures = 0
+        # 已接受的 TCP 连接数，用于确认客户端复用连接
+        self.connections = 0
+        # 各接口收到的请求数
+        self.calls: Dict[str, int] = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.server = MockHTTPServer((host, port), self._handler())
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockOllama":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "MockOllama":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def _roll(self, path: str) -> Tuple[float, bool]:
+        """本次请求的延迟以及是否注入故障"""
+        with self._lock:
+            self.requests += 1
+            self.calls[path] = self.calls.get(path, 0) + 1
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+            failed = self.failure_rate > 0 and self._random.random() < self.failure_rate
+            if failed:
+                self.failures += 1
+        return delay, failed
+
+    def load(self, model: Dict[str, Any]) -> int:
+        """确保模型已加载，返回本次的加载耗时（纳秒）"""
+        with self._lock:
+            if model in self.running:
+                return 0
+        start = time.perf_counter_ns()
+        if self.load_time:
+            time.sleep(self.load_time)
+        with self._lock:
+            if model not in self.running:
+                self.running.append(model)
+        return time.perf_counter_ns() - start
+
+    def unload(self, model: Dict[str, Any]) -> None:
+        with self._lock:
+            if model in self.running:
+                self.running.remove(model)
+
+    def find(self, name: str) -> Optional[Dict[str, Any]]:
+        for model in self.models:
+            if name in (model["name"], model["name"].split(":")[0]):
+                return model
+        return None
+
+    def show(self, model: Dict[str, Any]) -> Dict[str, Any]:
+        details = model["details"]
+        return {
+            "modelfile": f"FROM {model['name']}",
+            "parameters": "stop \"<|eot|>\"",
+            "template": "{{ .Prompt }}",
+            "license": "MIT",
+            "details": details,
+            "model_info": {
+                "general.architecture": details["family"],
+                "general.parameter_count": model["size"] // 2,
+                f"{details['family']}.context_length": 8192,
+                f"{details['family']}.embedding_length": self.embedding_dim,
+            },
+            "modified_at": model["modified_at"],
+        }
+
+    def ps(self) -> Dict[str, Any]:
+        expires = (datetime.now(timezone.utc) + timedelta(minutes=5)).isoformat()
+        with self._lock:
+            running = list(self.running)
+        return {"models": [{**model, "expires_at": expires, "size_vram": model["size"]} for model in running]}
+
+    def words(self, count: int) -> Iterator[str]:
+        for i in range(count):
+            yield WORDS[i % len(WORDS)] + " "
+
+    def _handler(self) -> type:
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self) -> None:
+                super().setup()
+                # 响应头与响应体分两次写出，不关闭 Nagle 算法时每个复用连接的请求都会等待延迟确认（约 40ms）
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with mock._lock:
+                    mock.connections += 1
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def _body(self) -> Dict[str, Any]:
+                length = int(self.headers.get("Content-Length") or 0)
+                if not length:
+                    return {}
+                try:
+                    return json.loads(self.rfile.read(length))
+                except ValueError:
+                    return {}
+
+            def _send(self, data: Any, status: int = 200) -> None:
+                payload = json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _stream(self, chunks: Iterator[Dict[str, Any]]) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for chunk in chunks:
+                    line = (json.dumps(chunk) + "\n").encode("utf-8")
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _inject(self) -> bool:
+                """按配置延迟并注入故障，返回 True 表示请求已被处理"""
+                delay, failed = mock._roll(self.path)
+                if delay:
+                    time.sleep(delay)
+                if not failed:
+                    return False
+                if mock.failure_mode == "reset":
+                    self.close_connection = True
+                    self.connection.close()
+                elif mock.failure_mode == "hang":
+                    time.sleep(3600)
+                elif mock.failure_mode == "invalid":
+                    payload = b"<html>502 Bad Gateway</html>"
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/html")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                else:
+                    self._send({"error": "injected failure"}, int(mock.failure_mode))
+                return True
+
+            def do_GET(self) -> None:
+                if self._inject():
+                    return
+                if self.path == "/api/version":
+                    self._send({"version": VERSION})
+                elif self.path == "/api/tags":
+                    self._send({"models": mock.models})
+                elif self.path == "/api/ps":
+                    self._send(mock.ps())
+                else:
+                    self._send({"error": "not found"}, 404)
+
+            def do_DELETE(self) -> None:
+                body = self._body()
+                if self._inject():
+                    return
+                model = mock.find(body.get("model", ""))
+                if model is None:
+                    self._send({"error": "model not found"}, 404)
+                    return
+                self._send({})
+
+            def do_POST(self) -> None:
+                body = self._body()
+                if self._inject():
+                    return
+                if self.path == "/api/pull":
+                    self._pull(body)
+                    return
+                model = mock.find(body.get("model") or body.get("name") or "")
+                if model is None:
+                    self._send({"error": f"model '{body.get('model')}' not found"}, 404)
+                elif self.path == "/api/show":
+                    self._send(mock.show(model))
+                elif self.path in ("/api/chat", "/api/generate"):
+                    self._generate(body, model, chat=self.path == "/api/chat")
+                elif self.path == "/api/embed":
+                    inputs = body.get("input") or []
+                    inputs = [inputs] if isinstance(inputs, str) else inputs
+                    self._send(
+                        {
+                            "model": model["name"],
+                            "embeddings": [
+                                [((len(text) + j) % 97) / 97 for j in range(mock.embedding_dim)] for text in inputs
+                            ],
+                            "prompt_eval_count": sum(len(text.split()) for text in inputs),
+                        }
+                    )
+                else:
+                    self._send({"error": "not found"}, 404)
+
+            def _generate(self, body: Dict[str, Any], model: Dict[str, Any], chat: bool) -> None:
+                start = time.perf_counter_ns()
+                created = datetime.now(timezone.utc).isoformat()
+
+                # 与 Ollama 一致：keep_alive 为 0 时卸载模型，没有输入时只加载模型
+                def control(reason: str, load_duration: int = 0) -> None:
+                    data = {"model": model["name"], "created_at": created, "done": True, "done_reason": reason}
+                    data.update(
+                        {"message": {"role": "assistant", "content": ""}} if chat else {"response": ""},
+                        total_duration=time.perf_counter_ns() - start,
+                        load_duration=load_duration,
+                    )
+                    self._send(data)
+
+                if body.get("keep_alive") in (0, "0", "0s"):
+                    mock.unload(model)
+                    control("unload")
+                    return
+                load_duration = mock.load(model)
+                if not (body.get("messages") if chat else body.get("prompt")):
+                    control("load", load_duration)
+                    return
+
+                def chunk(text: str, done: bool) -> Dict[str, Any]:
+                    data: Dict[str, Any] = {"model": model["name"], "created_at": created, "done": done}
+                    if chat:
+                        data["message"] = {"role": "assistant", "content": text}
+                    else:
+                        data["response"] = text
+                    return data
+
+                def final() -> Dict[str, Any]:
+                    data = chunk("", True)
+                    duration = time.perf_counter_ns() - start
+                    data.update(
+                        done_reason="stop",
+                        total_duration=duration,
+                        load_duration=load_duration,
+                        prompt_eval_count=8,
+                        prompt_eval_duration=1_000_000,
+                        eval_count=mock.tokens,
+                        eval_duration=max(duration, 1),
+                    )
+                    return data
+
+                def chunks() -> Iterator[Dict[str, Any]]:
+                    interval = 1.0 / mock.token_rate if mock.token_rate else 0.0
+                    for i, word in enumerate(mock.words(mock.tokens)):
+                        if mock.cut_after is not None and i >= mock.cut_after:
+                            # 不发送结束分块，直接断开连接
+                            self.close_connection = True
+                            self.connection.shutdown(socket.SHUT_RDWR)
+                            return
+                        if interval:
+                            time.sleep(interval)
+                        yield chunk(word, False)
+                    yield final()
+
+                if body.get("stream", True):
+                    self._stream(chunks())
+                    return
+                text = "".join(c.get("response") or c.get("message", {}).get("content", "") for c in chunks())
+                data = final()
+                if chat:
+                    data["message"] = {"role": "assistant", "content": text}
+                else:
+                    data["response"] = text
+                self._send(data)
+
+            def _pull(self, body: Dict[str, Any]) -> None:
+                name = body.get("model") or body.get("name") or ""
+                digest = f"sha256:{fake_digest(name)}"
+                total = 4 * 1024 * 1024
+                steps = max(mock.tokens // 8, 1)
+
+                def chunks() -> Iterator[Dict[str, Any]]:
+                    yield {"status": "pulling manifest"}
+                    for i in range(steps + 1):
+                        if mock.token_rate and i:
+                            time.sleep(1.0 / mock.token_rate)
+                        yield {"status": f"pulling {digest[7:19]}", "digest": digest, "total": total, "completed": total * i // steps}
+                    yield {"status": "verifying sha256 digest"}
+                    yield {"status": "success"}
+
+                self._stream(chunks())
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="模拟 Ollama 服务器")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址，默认为 127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434, help="监听端口，0 表示随机端口，默认为 11434")
+    parser.add_argument("--hosts", type=int, default=1, help="启动的服务器数量，端口依次递增，默认为 1")
+    parser.add_argument("--models", type=int, default=8, help="模型数量，默认为 8")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的固定延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="额外随机延迟的上限（秒）")
+    parser.add_argument("--token-rate", type=float, default=50.0, help="生成速度（tokens/s），0 表示不限速，默认为 50")
+    parser.add_argument("--tokens", type=int, default=64, help="每次回答的 token 数，默认为 64")
+    parser.add_argument("--load-time", type=float, default=0.0, help="未加载的模型首次请求时的加载耗时（秒）")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="故障注入概率（0~1）")
+    parser.add_argument("--failure-mode", choices=FAILURE_MODES, default="503", help="故障类型，默认为 503")
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子")
+    args = parser.parse_args()
+
+    mocks = [
+        MockOllama(
+            host=args.host,
+            port=args.port + i if args.port else 0,
+            models=args.models,
+            latency=args.latency,
+            jitter=args.jitter,
+            token_rate=args.token_rate,
+            tokens=args.tokens,
+            load_time=args.load_time,
+            failure_rate=args.failure_rate,
+            failure_mode=args.failure_mode,
+            seed=args.seed + i,
+        ).start()
+        for i in range(args.hosts)
+    ]
+    # 每行输出一个地址，便于其他脚本读取
+    for mock in mocks:
+        print(mock.url, flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for mock in mocks:
+            mock.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+流式结果输出：jsonl / csv / table，按批次写出，内存占用与结果总量无关
+"""
+
+import csv
+import io
+import json
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, TextIO
+
+from rich.console import Console
+from rich.table import Table
+
+from records import format_size, format_time, json_default
+
+FORMATS = ("jsonl", "csv", "table")
+
+
+class RecordWriter:
+    """逐条接收记录，攒够一批或超过刷新间隔后写出并 flush
+
+    刷新间隔只在收到新记录时检查；长时间没有新记录（例如扫描在等待慢主机）时，由调用方定期调用 tick 写出已有的记录。
+    """
+
+    def __init__(self, stream: TextIO, batch_size: int = 100, flush_interval: float = 1.0):
+        self.stream = stream
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.count = 0
+        self._buffer: List[Any] = []
+        self._last_flush = time.monotonic()
+
+    def encode(self, record: Dict[str, Any]) -> Any:
+        return record
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._buffer.append(self.encode(record))
+        self.count += 1
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+        else:
+            self.tick()
+
+    def tick(self) -> None:
+        """距上次写出超过刷新间隔时写出缓冲的记录"""
+        if self._buffer and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def write_batch(self, batch: List[Any]) -> None:
+        self.stream.write("".join(batch))
+
+    def flush(self) -> None:
+        if self._buffer:
+            self.write_batch(self._buffer)
+            self._buffer = []
+        self.stream.flush()
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> "RecordWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class JsonlWriter(RecordWriter):
+    """每条记录一行 JSON"""
+
+    def encode(self, record: Dict[str, Any]) -> str:
+        return json.dumps(record, ensure_ascii=False, default=json_default) + "\n"
+
+
+class CsvWriter(RecordWriter):
+    """CSV 输出，未指定列名时以第一条记录的键为表头"""
+
+    def __init__(self, stream: TextIO, fields: Optional[Sequence[str]] = None, **kwargs: Any):
+        super().__init__(stream, **kwargs)
+        self.fields = list(fields) if fields else None
+        self._line = io.StringIO()
+        self._csv = csv.writer(self._line)
+        if self.fields:
+            self._buffer.append(self._row(self.fields))
+
+    def _row(self, values: Sequence[Any]) -> str:
+        self._line.seek(0)
+        self._line.truncate()
+        self._csv.writerow(values)
+        return self._line.getvalue()
+
+    def encode(self, record: Dict[str, Any]) -> str:
+        if self.fields is None:
+            self.fields = list(record.keys())
+            self._buffer.append(self._row(self.fields))
+        values = []
+        for field in self.fields:
+            value = record.get(field)
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            elif isinstance(value, (dict, list)):
+                value = json.dumps(value, ensure_ascii=False, default=json_default)
+            values.append("" if value is None else value)
+        return self._row(values)
+
+
+class TableWriter(RecordWriter):
+    """Rich 表格输出，每批渲染一张表，避免整表驻留内存"""
+
+    def __init__(
+        self,
+        stream: TextIO,
+        fields: Optional[Sequence[str]] = None,
+        title: Optional[str] = None,
+        **kwargs: Any,
+    ):
+        super().__init__(stream, **kwargs)
+        self.fields = list(fields) if fields else None
+        self.title = title
+        self.console = Console(file=stream)
+
+    def _cell(self, field: str, value: Any) -> str:
+        if value is None:
+            return ""
+        if field in ("size", "size_vram") and isinstance(value, int):
+            return format_size(value)
+        if isinstance(value, datetime):
+            return format_time(value)
+        return str(value)
+
+    def write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        if self.fields is None:
+            self.fields = list(batch[0].keys())
+        table = Table(title=self.title, show_header=True, header_style="bold magenta")
+        for field in self.fields:
+            table.add_column(field)
+        for record in batch:
+            table.add_row(*(self._cell(field, record.get(field)) for field in self.fields))
+        self.console.print(table)
+        # 只在第一张表上显示标题
+        self.title = None
+
+
+def create_writer(fmt: str, stream: TextIO, **kwargs: Any) -> RecordWriter:
+    """根据格式名创建写入器"""
+    if fmt == "jsonl":
+        kwargs.pop("fields", None)
+        kwargs.pop("title", None)
+        return JsonlWriter(stream, **kwargs)
+    if fmt == "csv":
+        kwargs.pop("title", None)
+        return CsvWriter(stream, **kwargs)
+    if fmt == "table":
+        return TableWriter(stream, **kwargs)
+    raise ValueError(f"不支持的输出格式: {fmt}")
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+并发拉取模型：每个层（digest）一条字节级进度条，失败自动重试，队列持久化可断点续传
+
+/api/pull 只能按模型请求，重试以模型为单位；服务器会保留已下载的层和未完成层的部分数据，
+重试时只下载缺少的部分。
+"""
+
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows 上没有 fcntl，此时不支持多个进程同时拉取
+    fcntl = None
+
+from rich.console import Console
+from rich.progress import (
+    BarColumn,
+    DownloadColumn,
+    Progress,
+    TaskID,
+    TextColumn,
+    TimeRemainingColumn,
+    TransferSpeedColumn,
+)
+
+from config import data_path
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+def permanent(error: BaseException) -> bool:
+    """重试也不会成功的错误：4xx（超时与限流除外），或流中返回的模型不存在"""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int) and 400 <= status < 500:
+        return status not in (408, 429)
+    # 拉取不存在的模型时，服务器先返回 200，再在流中返回 error（status_code 为 -1）
+    message = str(getattr(error, "error", error)).lower()
+    return status == -1 and ("not found" in message or "does not exist" in message)
+
+
+class PullQueue:
+    """持久化的拉取队列，按服务器地址分组保存每个模型的状态
+
+    多个进程可以同时使用同一个队列文件：每次修改都在文件锁（<队列文件>.lock）内重新读取、
+    只改动自己涉及的模型再写回，不会覆盖其他进程的记录。
+    """
+
+    def __init__(self, host: str, path: Optional[str] = None):
+        self.host = host
+        self.path = path or data_path("pull_queue.json")
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        with self._lock, self._file_lock():
+            self._load()
+
+    @property
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        return self._data.setdefault(self.host, {})
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.path}.lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _load(self) -> None:
+        # 文件损坏时从空队列开始，不影响拉取
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        self._data = data if isinstance(data, dict) else {}
+
+    def _save(self) -> None:
+        # 先写临时文件再替换，进程中途崩溃也不会留下半个文件
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+
+    def _modify(self, change: Callable[[Dict[str, Dict[str, Any]]], None]) -> None:
+        """读取最新的队列文件，修改本服务器的条目后写回"""
+        with self._lock, self._file_lock():
+            self._load()
+            change(self.entries)
+            self._save()
+
+    def add(self, models: List[str]) -> None:
+        def change(entries: Dict[str, Dict[str, Any]]) -> None:
+            for model in models:
+                entry = entries.get(model)
+                if entry is None or entry["status"] == DONE:
+                    entries[model] = {"status": PENDING, "attempts": 0, "error": None}
+                else:
+                    # 上次未完成的任务保留重试次数
+                    entry["status"] = PENDING
+
+        self._modify(change)
+
+    def pending(self) -> List[str]:
+        """未完成的模型（包括上次失败的）"""
+        return [model for model, entry in self.entries.items() if entry["status"] != DONE]
+
+    def update(self, model: str, **fields: Any) -> None:
+        def change(entries: Dict[str, Dict[str, Any]]) -> None:
+            entries.setdefault(model, {"status": PENDING, "attempts": 0, "error": None}).update(fields)
+
+        self._modify(change)
+
+    def clear_done(self) -> None:
+        def change(entries: Dict[str, Dict[str, Any]]) -> None:
+            for model in [m for m, e in entries.items() if e["status"] == DONE]:
+                del entries[model]
+
+        self._modify(change)
+
+
+class ParallelPuller:
+    """使用线程池并发拉取多个模型"""
+
+    def __init__(
+        self,
+        client: Any,
+        queue: PullQueue,
+        parallel: int = 2,
+        retries: int = 3,
+        backoff: float = 2.0,
+        cancelled: Optional[threading.Event] = None,
+        console: Optional[Console] = None,
+    ):
+        if parallel < 1:
+            raise ValueError("并发数必须大于 0")
+        self.client = client
+        self.queue = queue
+        self.parallel = parallel
+        self.retries = retries
+        self.backoff = backoff
+        self.cancelled = cancelled or threading.Event()
+        self.progress = Progress(
+            TextColumn("[bold blue]{task.description}"),
+            BarColumn(),
+            DownloadColumn(),
+            TransferSpeedColumn(),
+            TimeRemainingColumn(),
+            console=console,
+        )
+
+    def _pull_once(self, model: str, status_task: TaskID, tasks: Dict[str, TaskID]) -> None:
+        for info in self.client.pull(model, stream=True):
+            if self.cancelled.is_set():
+                raise InterruptedError("拉取已取消")
+            digest = info.get("digest")
+            status = info.get("status") or ""
+            if digest and info.get("total"):
+                if digest not in tasks:
+                    tasks[digest] = self.progress.add_task(
+                        f"  {model} {digest.split(':')[-1][:12]}", total=info["total"]
+                    )
+                self.progress.update(tasks[digest], completed=info.get("completed") or 0)
+            else:
+                self.progress.update(status_task, description=f"{model}: {status}")
+
+    def pull(self, model: str) -> bool:
+        """拉取单个模型，失败后按指数退避重试"""
+        status_task = self.progress.add_task(f"{model}: 等待中", total=None)
+        tasks: Dict[str, TaskID] = {}
+        attempts = self.queue.entries.get(model, {}).get("attempts", 0)
+        for attempt in range(self.retries + 1):
+            if self.cancelled.is_set():
+                return False
+            attempts += 1
+            self.queue.update(model, status=PENDING, attempts=attempts)
+            try:
+                self._pull_once(model, status_task, tasks)
+                self.queue.update(model, status=DONE, error=None)
+                self.progress.update(status_task, description=f"[green]{model}: ✅ 完成[/green]")
+                return True
+            except InterruptedError:
+                self.queue.update(model, status=PENDING, error="cancelled")
+                return False
+            except Exception as e:
+                self.queue.update(model, status=FAILED, error=f"{type(e).__name__}: {e}")
+                if permanent(e):
+                    break
+                if attempt < self.retries:
+                    delay = self.backoff * (2 ** attempt)
+                    self.progress.update(
+                        status_task, description=f"[yellow]{model}: 失败，{delay:.0f}s 后重试[/yellow]"
+                    )
+                    # 等待期间也响应取消
+                    if self.cancelled.wait(delay):
+                        return False
+        self.progress.update(status_task, description=f"[red]{model}: ❌ 失败[/red]")
+        return False
+
+    def run(self, models: List[str]) -> Dict[str, bool]:
+        """并发拉取，返回每个模型是否成功"""
+        with self.progress:
+            with ThreadPoolExecutor(max_workers=self.parallel) as pool:
+                try:
+                    results = dict(zip(models, pool.map(self.pull, models)))
+                except KeyboardInterrupt:
+                    # 通知工作线程尽快退出，队列状态保留以便下次继续
+                    self.cancelled.set()
+                    raise
+        return results
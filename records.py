@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+模型 / 进程信息解析，供交互式命令与批量扫描共用
+"""
+
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+GB = 1024 * 1024 * 1024
+# show 命令输出记录的列，error 为获取失败时的原因
+SHOW_FIELDS = ("name", "modified_at", "format", "parameter_size", "quantization_level", "modelinfo", "license", "error")
+UNITS = {"": 1, "B": 1, "K": 1024, "KB": 1024, "M": 1024**2, "MB": 1024**2, "G": GB, "GB": GB, "T": 1024 * GB, "TB": 1024 * GB}
+
+
+def format_size(size: Optional[int]) -> str:
+    """格式化字节大小（GB）"""
+    return f"{size / GB:.1f}GB" if size else "Unknown"
+
+
+def parse_size(text: str) -> int:
+    """解析 24GB / 512M / 1.5G 这类大小，单位按 1024 进位"""
+    match = re.fullmatch(r"\s*([\d.]+)\s*([KMGT]?B?)\s*", text.upper())
+    if not match:
+        raise ValueError(f"无法识别的大小: {text}")
+    return int(float(match.group(1)) * UNITS[match.group(2)])
+
+
+def format_time(value: Optional[datetime], fmt: str = "%Y-%m-%d %H:%M") -> str:
+    """格式化时间"""
+    return value.strftime(fmt) if value else "Unknown"
+
+
+def extract_models(response: Any) -> Optional[List[Any]]:
+    """从 /api/tags 或 /api/ps 的返回值中取出模型列表，格式异常时返回 None"""
+    if hasattr(response, "models"):
+        return list(response.models or [])
+    if isinstance(response, list):
+        return response
+    return None
+
+
+def model_record(model: Any) -> Dict[str, Any]:
+    """将 /api/tags 中的单个模型转换为扁平记录"""
+    details = model.details
+    return {
+        "name": model.model,
+        "digest": getattr(model, "digest", None),
+        "size": model.size,
+        "modified_at": model.modified_at,
+        "format": details.format if details else "Unknown",
+        "parameter_size": details.parameter_size if details else "Unknown",
+        "quantization_level": details.quantization_level if details else "Unknown",
+    }
+
+
+def process_record(model: Any) -> Dict[str, Any]:
+    """将 /api/ps 中的单个运行模型转换为扁平记录"""
+    details = model.details
+    return {
+        "name": model.name,
+        "digest": getattr(model, "digest", None),
+        "size": model.size,
+        "size_vram": getattr(model, "size_vram", None),
+        "expires_at": model.expires_at,
+        "format": details.format if details else "Unknown",
+        "parameter_size": details.parameter_size if details else "Unknown",
+        "quantization_level": details.quantization_level if details else "Unknown",
+    }
+
+
+def show_record(name: str, info: Any) -> Dict[str, Any]:
+    """将 /api/show 的返回值转换为记录，modelinfo 保留原始结构"""
+    details = info.details
+    return {
+        "name": name,
+        "modified_at": info.modified_at,
+        "format": details.format if details else "Unknown",
+        "parameter_size": details.parameter_size if details else "Unknown",
+        "quantization_level": details.quantization_level if details else "Unknown",
+        "modelinfo": dict(info.modelinfo or {}) if hasattr(info, "modelinfo") else {},
+        "license": getattr(info, "license", None),
+    }
+
+
+def json_default(value: Any) -> Any:
+    """json.dumps 的 default 回调，时间统一输出为 ISO 8601"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
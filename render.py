@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+流式输出渲染：边接收边显示，<think> 内容显示在单独的面板中
+"""
+
+import time
+from typing import Any, List, Optional
+
+from rich.console import Console, RenderableType
+from rich.live import Live
+from rich.markdown import Markdown
+from rich.panel import Panel
+from rich.spinner import Spinner
+from rich.style import Style
+from rich.text import Text
+
+from instrument import TRACER
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+
+def _partial_tag(text: str, tag: str) -> int:
+    """text 末尾可能是 tag 前缀的长度，这部分需要等下一个分块再判断"""
+    for size in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:size]):
+            return size
+    return 0
+
+
+class StreamRenderer:
+    """基于 rich.live.Live 的流式渲染器
+
+    已结束的段落（思考过程 / 正文）直接输出到终端，Live 区域只重绘当前段落，
+    Markdown 按固定帧率重新解析，避免每个 token 都重绘一次。
+    """
+
+    def __init__(self, console: Console, fps: float = 12.0):
+        self.console = console
+        self.interval = 1.0 / fps
+        self.live: Optional[Live] = None
+        self.thinking = False
+        # 思考内容来自 message.thinking 字段而不是 <think> 标签
+        self._explicit_thinking = False
+        self._parts: List[str] = []
+        self._pending = ""
+        self._last_render = 0.0
+        self.start = 0.0
+        self.first_token: Optional[float] = None
+        self.end: Optional[float] = None
+        self.chunks = 0
+        self.eval_count: Optional[int] = None
+        self.eval_duration: Optional[int] = None
+
+    def __enter__(self) -> "StreamRenderer":
+        self.start = time.perf_counter()
+        self.live = Live(
+            Spinner("dots", text=Text("🤔 思考中...", style="bold blue")),
+            console=self.console,
+            auto_refresh=True,
+            refresh_per_second=12,
+            vertical_overflow="visible",
+        )
+        self.live.__enter__()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        if self._pending:
+            self._parts.append(self._pending)
+            self._pending = ""
+        self.end = time.perf_counter()
+        if self.live is not None:
+            self.live.update(self._renderable(), refresh=True)
+            self.live.__exit__(*exc)
+            self.live = None
+
+    def _renderable(self) -> RenderableType:
+        text = "".join(self._parts).strip()
+        if not text:
+            return Text("")
+        if self.thinking:
+            return Panel(
+                Markdown(text),
+                title="思考过程",
+                style=Style(color="grey70", italic=True),
+                border_style="grey50",
+            )
+        return Markdown(text)
+
+    def _switch(self) -> None:
+        """结束当前段落并切换思考 / 正文状态"""
+        # 将已完成的段落固定到 Live 区域之上，之后不再参与重绘
+        finished = "".join(self._parts).strip()
+        if finished:
+            self.console.print(self._renderable())
+            if self.thinking:
+                self.console.print()
+        self._parts = []
+        self.thinking = not self.thinking
+        self.live.update(Text(""), refresh=True)
+
+    def feed(self, content: Optional[str], thinking: Optional[str] = None) -> None:
+        """接收一个分块"""
+        if not content and not thinking:
+            return
+        self.chunks += 1
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+
+        if thinking:
+            if not self.thinking:
+                self._switch()
+            self._explicit_thinking = True
+            self._parts.append(thinking)
+
+        if content:
+            if self._explicit_thinking and self.thinking:
+                self._switch()
+                self._explicit_thinking = False
+            self._pending += content
+            while True:
+                tag = THINK_CLOSE if self.thinking else THINK_OPEN
+                index = self._pending.find(tag)
+                if index < 0:
+                    break
+                self._parts.append(self._pending[:index])
+                self._pending = self._pending[index + len(tag):]
+                self._switch()
+            keep = _partial_tag(self._pending, tag)
+            split = len(self._pending) - keep
+            self._parts.append(self._pending[:split])
+            self._pending = self._pending[split:]
+
+        now = time.perf_counter()
+        if now - self._last_render >= self.interval:
+            # Markdown 在创建时解析，实际绘制由 Live 的刷新线程完成（计入 render.print）
+            with TRACER.span("render.markdown", "render", metric="render.markdown"):
+                self.live.update(self._renderable())
+            self._last_render = now
+
+    def update_stats(self, chunk: Any) -> None:
+        """记录最后一个分块中服务器返回的统计信息"""
+        self.eval_count = chunk.get("eval_count") or self.eval_count
+        self.eval_duration = chunk.get("eval_duration") or self.eval_duration
+
+    @property
+    def ttft(self) -> Optional[float]:
+        """首 token 延迟（秒）"""
+        if self.first_token is None:
+            return None
+        return self.first_token - self.start
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """生成速度，优先使用服务器统计，否则按分块数估算"""
+        if self.eval_count and self.eval_duration:
+            return self.eval_count / (self.eval_duration / 1e9)
+        if self.first_token is not None and self.end is not None and self.end > self.first_token:
+            return self.chunks / (self.end - self.first_token)
+        return None
+
+    def summary(self) -> str:
+        """统计信息摘要"""
+        parts = []
+        if self.ttft is not None:
+            parts.append(f"首 token 延迟 {self.ttft:.2f}s")
+        if self.tokens_per_second is not None:
+            parts.append(f"{self.tokens_per_second:.1f} tokens/s")
+        if self.eval_count:
+            parts.append(f"共 {self.eval_count} tokens")
+        return "⏱️ " + " · ".join(parts) if parts else ""
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+确定性响应缓存（SQLite）：temperature 为 0 或指定了 seed 的 chat / generate 请求，
+以模型 digest、输入与参数为键保存完整回答，再次请求时直接回放，流式请求同样以分块形式回放
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from config import data_path
+from records import json_default
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+# 不影响生成结果、不计入缓存键的参数
+IGNORED_ARGS = ("keep_alive", "stream")
+
+
+def deterministic(options: Any) -> bool:
+    """贪心解码或固定随机种子时，同样的输入得到同样的输出"""
+    if options is None:
+        return False
+    if hasattr(options, "model_dump"):
+        options = options.model_dump(exclude_none=True)
+    return options.get("temperature") == 0 or options.get("seed") is not None
+
+
+def cache_key(digest: str, endpoint: str, arguments: Dict[str, Any]) -> str:
+    """模型 digest（而不是名称，重新拉取后自动失效）+ 接口 + 其余请求参数"""
+
+    def plain(value: Any) -> Any:
+        return value.model_dump(exclude_none=True) if hasattr(value, "model_dump") else json_default(value)
+
+    payload = {name: value for name, value in arguments.items() if name not in IGNORED_ARGS and value is not None}
+    text = json.dumps([digest, endpoint, payload], sort_keys=True, ensure_ascii=False, default=plain)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """磁盘上的响应缓存，超过 max_bytes 时淘汰最久未使用的条目
+
+    值为压缩后的 JSON；命中 / 未命中次数同样保存在库中，多次运行累计。
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = 512 * 1024 * 1024):
+        self.path = path or data_path("responses.db")
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _count(self, name: str) -> None:
+        self._db.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def bypass(self) -> None:
+        """确定性请求因模型版本未知而没有使用缓存"""
+        with self._lock, self._db:
+            self._count("bypasses")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock, self._db:
+            row = self._db.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            self._count("hits" if row else "misses")
+            if row is None:
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, key: str, model: str, value: Dict[str, Any]) -> None:
+        blob = zlib.compress(json.dumps(value, ensure_ascii=False, default=json_default).encode("utf-8"))
+        if len(blob) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock, self._db:
+            old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, model, value, size, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, blob, len(blob), now, now),
+            )
+            self._bytes += len(blob) - (old[0] if old else 0)
+            self._evict()
+
+    def _evict(self) -> None:
+        # 按最近访问时间从旧到新淘汰，直到总大小不超过上限
+        while self._bytes > self.max_bytes:
+            rows = self._db.execute("SELECT key, size FROM responses ORDER BY accessed LIMIT 64").fetchall()
+            if not rows:
+                self._bytes = 0
+                return
+            for key, size in rows:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._bytes -= size
+                self._count("evictions")
+                if self._bytes <= self.max_bytes:
+                    return
+
+    def clear(self) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM responses")
+            self._db.execute("DELETE FROM counters")
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            counters = dict(self._db.execute("SELECT name, value FROM counters").fetchall())
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": hits,
+            "misses": misses,
+            "evictions": counters.get("evictions", 0),
+            "bypasses": counters.get("bypasses", 0),
+            "hit_rate": hits / (hits + misses) if hits + misses else None,
+        }
+
+
+class Replay(list):
+    """从缓存回放的流式响应，cached 属性供调用方区分"""
+
+    cached = True
+
+
+class CachedClient:
+    """包装 ollama.Client 或 Router，接口相同
+
+    只缓存确定性的请求；流式请求在正常结束后才写入缓存，中途失败或取消的回答不会保存。
+    缓存中保存与非流式响应相同的完整回答，流式回放时拆为一个内容分块与一个带统计信息的结束分块。
+    """
+
+    def __init__(self, client: Any, cache: ResponseCache, digest: Callable[[str], Optional[str]]):
+        self.client = client
+        self.cache = cache
+        self.digest = digest
+
+    def chat(self, model: str, messages: List[Dict[str, Any]], stream: bool = False, **kwargs: Any) -> Any:
+        return self._request("chat", model, stream, dict(kwargs, messages=messages))
+
+    def generate(self, model: str, prompt: str = "", stream: bool = False, **kwargs: Any) -> Any:
+        return self._request("generate", model, stream, dict(kwargs, prompt=prompt))
+
+    def _request(self, endpoint: str, model: str, stream: bool, arguments: Dict[str, Any]) -> Any:
+        call = getattr(self.client, endpoint)
+        if not deterministic(arguments.get("options")):
+            return call(model=model, stream=stream, **arguments)
+        digest = self.digest(model)
+        if digest is None:
+            self.cache.bypass()
+            return call(model=model, stream=stream, **arguments)
+        key = cache_key(digest, endpoint, arguments)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return replay(endpoint, cached) if stream else response_type(endpoint)(**cached)
+        if not stream:
+            response = call(model=model, stream=False, **arguments)
+            self.cache.put(key, model, response.model_dump(mode="json", exclude_none=True))
+            return response
+        return self._record(endpoint, model, key, call(model=model, stream=True, **arguments))
+
+    def _record(self, endpoint: str, model: str, key: str, stream: Iterator[Any]) -> Iterator[Any]:
+        content: List[str] = []
+        thinking: List[str] = []
+        tool_calls: List[Any] = []
+        for chunk in stream:
+            part = chunk["message"] if endpoint == "chat" else chunk
+            content.append((part["content"] if endpoint == "chat" else part["response"]) or "")
+            thinking.append(part.get("thinking") or "")
+            if endpoint == "chat" and part.get("tool_calls"):
+                tool_calls.extend(call.model_dump(mode="json", exclude_none=True) for call in part["tool_calls"])
+            yield chunk
+            if chunk.get("done"):
+                value = chunk.model_dump(mode="json", exclude_none=True)
+                target = value.setdefault("message", {"role": "assistant"}) if endpoint == "chat" else value
+                target["content" if endpoint == "chat" else "response"] = "".join(content)
+                if any(thinking):
+                    target["thinking"] = "".join(thinking)
+                if tool_calls:
+                    target["tool_calls"] = tool_calls
+                self.cache.put(key, model, value)
+
+
+def response_type(endpoint: str) -> Any:
+    from ollama import ChatResponse, GenerateResponse
+
+    return ChatResponse if endpoint == "chat" else GenerateResponse
+
+
+def replay(endpoint: str, value: Dict[str, Any]) -> Replay:
+    """把完整回答还原为流式分块：内容分块 + 结束分块"""
+    cls = response_type(endpoint)
+    body = {name: value[name] for name in ("model", "created_at") if name in value}
+    if endpoint == "chat":
+        first = cls(**body, message=value["message"], done=False)
+        last = cls(**dict(value, message={"role": "assistant", "content": ""}))
+    else:
+        first = cls(**body, response=value.get("response", ""), thinking=value.get("thinking"), done=False)
+        last = cls(**dict(value, response="", thinking=None))
+    return Replay([first, last])
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""
+多主机路由：根据各主机已有的模型（/api/tags）、已加载到显存的模型（/api/ps）、
+进行中的请求数与实测延迟选择主机，请求失败时切换到下一台主机，流式对话可在中途接续
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import httpx
+
+from health import UNAVAILABLE_STATUS
+
+
+def model_key(name: str) -> str:
+    """未写标签的模型名等同于 :latest"""
+    return name if ":" in name else f"{name}:latest"
+
+
+def retryable(error: BaseException) -> bool:
+    """换一台主机可能成功的错误：连接 / 传输失败、主机不可用、模型不存在、生成过程中的错误"""
+    if isinstance(error, (ConnectionError, TimeoutError, httpx.TransportError)):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in UNAVAILABLE_STATUS
+    status = getattr(error, "status_code", None)
+    if type(error).__name__ == "ResponseError" and isinstance(status, int):
+        # -1 为流式响应中途返回的 error 字段
+        return status == -1 or status == 404 or status >= 500
+    return False
+
+
+class PoolHost:
+    """主机池中的一台主机"""
+
+    def __init__(self, session: Any):
+        self.session = session
+        # None 表示尚未成功获取过模型列表
+        self.models: Optional[Set[str]] = None
+        # 模型 -> /api/tags 中的 digest，同名模型在不同主机上可能是不同的版本
+        self.digests: Dict[str, Optional[str]] = {}
+        self.resident: Set[str] = set()
+        self.inflight = 0
+        self.requests = 0
+        self.failures = 0
+        self.refreshed = 0.0
+        self.error: Optional[str] = None
+
+    @property
+    def host(self) -> str:
+        return self.session.host
+
+    @property
+    def srtt(self) -> Optional[float]:
+        return self.session.health.srtt
+
+    def available(self) -> bool:
+        """熔断冷却期内的主机不参与选择"""
+        return self.session.health.snapshot()["retry_in"] <= 0
+
+    def refresh(self) -> None:
+        """获取模型列表与已加载的模型，失败时保留旧数据"""
+        try:
+            tags = self.session.get_json("/api/tags")
+            ps = self.session.get_json("/api/ps")
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+        else:
+            self.digests = {model_key(m.get("name") or m.get("model", "")): m.get("digest") for m in tags.get("models") or []}
+            self.models = set(self.digests)
+            self.resident = {model_key(m.get("name") or m.get("model", "")) for m in ps.get("models") or []}
+            self.error = None
+        self.refreshed = time.monotonic()
+
+
+class Router:
+    """在多台 Ollama 主机之间分发 chat / generate 请求
+
+    接口与 ollama.Client 的 chat / generate 一致，可直接替代 client 使用。
+    选择顺序：拥有该模型的主机优先，其次按代价（进行中的请求数，模型未加载时加上 cold_penalty）
+    从小到大，代价相同时选延迟（SRTT）较低的主机；失败的请求依次尝试下一台主机，
+    流式对话中途失败时把已收到的回答作为 assistant 消息发给新主机，让模型接着生成。
+    """
+
+    def __init__(
+        self,
+        sessions: List[Any],
+        refresh_interval: float = 15.0,
+        cold_penalty: float = 4.0,
+        notify: Optional[Callable[[str], None]] = None,
+    ):
+        if not sessions:
+            raise ValueError("主机池不能为空")
+        self.hosts = [PoolHost(session) for session in sessions]
+        self.refresh_interval = refresh_interval
+        self.cold_penalty = cold_penalty
+        self.notify = notify
+        self.failovers = 0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def refresh(self) -> None:
+        """并发刷新所有主机的模型状态"""
+        with ThreadPoolExecutor(max_workers=len(self.hosts)) as pool:
+            list(pool.map(PoolHost.refresh, self.hosts))
+        with self._lock:
+            self._refreshing = False
+
+    def invalidate(self) -> None:
+        """模型被拉取或删除后调用，下一个请求前同步刷新所有主机"""
+        with self._lock:
+            for host in self.hosts:
+                host.refreshed = 0.0
+
+    def _refresh_if_stale(self) -> None:
+        """从未刷新过时同步刷新，过期后在后台刷新，不阻塞请求"""
+        oldest = min(host.refreshed for host in self.hosts)
+        if not oldest:
+            self.refresh()
+            return
+        if time.monotonic() - oldest < self.refresh_interval:
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self.refresh, daemon=True).start()
+
+    def digest(self, model: str) -> Optional[str]:
+        """可用主机上该模型的 digest 一致时返回该值，请求无论发往哪台主机都由同一版本的模型生成
+
+        熔断中、从未取得模型列表或 digest 未知（列表中没有 digest、成功请求后才得知有该模型）的主机不参与比较；
+        两台主机上的版本不同，或没有任何主机给出 digest 时返回 None。
+        """
+        self._refresh_if_stale()
+        key = model_key(model)
+        digests: Set[str] = set()
+        with self._lock:
+            for host in self.hosts:
+                if host.models is None or key not in host.models or not host.available():
+                    continue
+                digest = host.digests.get(key)
+                if digest:
+                    digests.add(digest)
+        return digests.pop() if len(digests) == 1 else None
+
+    def rank(self, model: str, exclude: Set[str] = frozenset()) -> List[PoolHost]:
+        """按优先级排列可用的主机"""
+        self._refresh_if_stale()
+        key = model_key(model)
+
+        def score(host: PoolHost) -> Tuple[int, float, float]:
+            # 0: 已有该模型，1: 状态未知，2: 没有该模型（列表可能已过期，仍作为最后的选择）
+            missing = 1 if host.models is None else (0 if key in host.models else 2)
+            cost = host.inflight + (0 if key in host.resident else self.cold_penalty)
+            return missing, cost, host.srtt if host.srtt is not None else float("inf")
+
+        with self._lock:
+            candidates = [host for host in self.hosts if host.host not in exclude and host.available()]
+            return sorted(candidates, key=score)
+
+    @contextmanager
+    def _lease(self, host: PoolHost) -> Iterator[None]:
+        with self._lock:
+            host.inflight += 1
+            host.requests += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                host.inflight -= 1
+
+    def _succeeded(self, host: PoolHost, model: str) -> None:
+        # 请求成功后模型已加载到该主机
+        key = model_key(model)
+        with self._lock:
+            host.resident.add(key)
+            if host.models is not None:
+                host.models.add(key)
+
+    def _failed(self, host: PoolHost, model: str, error: BaseException) -> None:
+        with self._lock:
+            host.failures += 1
+            host.error = f"{type(error).__name__}: {error}"
+            if getattr(error, "status_code", None) == 404:
+                host.resident.discard(model_key(model))
+                host.digests.pop(model_key(model), None)
+                if host.models is not None:
+                    host.models.discard(model_key(model))
+
+    def _attempts(self, model: str) -> Iterator[PoolHost]:
+        """依次给出下一台要尝试的主机，每台最多一次；每次都重新排序，反映最新的负载"""
+        tried: Set[str] = set()
+        while True:
+            ranked = self.rank(model, exclude=tried)
+            if not ranked:
+                return
+            tried.add(ranked[0].host)
+            yield ranked[0]
+
+    def _switch(self, host: PoolHost, error: BaseException) -> None:
+        with self._lock:
+            self.failovers += 1
+        if self.notify is not None:
+            self.notify(f"{host.host} 请求失败（{type(error).__name__}），尝试其他主机")
+
+    def _call(self, method: str, model: str, **kwargs: Any) -> Any:
+        """非流式请求：失败时换下一台主机重试"""
+        last_error: Optional[BaseException] = None
+        for host in self._attempts(model):
+            try:
+                with self._lease(host):
+                    response = getattr(host.session.client, method)(model=model, **kwargs)
+            except Exception as e:
+                if not retryable(e):
+                    raise
+                self._failed(host, model, e)
+                self._switch(host, e)
+                last_error = e
+                continue
+            self._succeeded(host, model)
+            return response
+        raise last_error or ConnectionError("主机池中没有可用的主机")
+
+    def _stream(
+        self,
+        method: str,
+        model: str,
+        resume: Optional[Callable[[str], Dict[str, Any]]],
+        **kwargs: Any,
+    ) -> Iterator[Any]:
+        """流式请求：中途失败时由 resume 根据已收到的内容构造新请求，在下一台主机上接着生成"""
+        received: List[str] = []
+        last_error: Optional[BaseException] = None
+        for host in self._attempts(model):
+            request = dict(kwargs, **resume("".join(received))) if received else kwargs
+            try:
+                with self._lease(host):
+                    for chunk in getattr(host.session.client, method)(model=model, stream=True, **request):
+                        content = chunk["message"]["content"] if method == "chat" else chunk["response"]
+                        if content:
+                            received.append(content)
+                        yield chunk
+            except Exception as e:
+                if not retryable(e) or (received and resume is None):
+                    raise
+                self._failed(host, model, e)
+                self._switch(host, e)
+                last_error = e
+                continue
+            self._succeeded(host, model)
+            return
+        raise last_error or ConnectionError("主机池中没有可用的主机")
+
+    def chat(self, model: str, messages: List[Dict[str, Any]], stream: bool = False, **kwargs: Any) -> Any:
+        if not stream:
+            return self._call("chat", model, messages=messages, **kwargs)
+
+        def resume(partial: str) -> Dict[str, Any]:
+            # 最后一条为 assistant 消息时，Ollama 从这条消息的末尾继续生成
+            return {"messages": list(messages) + [{"role": "assistant", "content": partial}]}
+
+        return self._stream("chat", model, resume, messages=messages, **kwargs)
+
+    def generate(self, model: str, prompt: str = "", stream: bool = False, **kwargs: Any) -> Any:
+        if not stream:
+            return self._call("generate", model, prompt=prompt, **kwargs)
+
+        # generate 没有可靠的接续方式（模板由服务器套用），只在收到第一个分块之前切换主机
+        return self._stream("generate", model, None, prompt=prompt, **kwargs)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {
+                    "host": host.host,
+                    "state": host.session.health.state,
+                    "models": None if host.models is None else len(host.models),
+                    "resident": sorted(host.resident),
+                    "inflight": host.inflight,
+                    "requests": host.requests,
+                    "failures": host.failures,
+                    "srtt": host.srtt,
+                    "error": host.error,
+                }
+                for host in self.hosts
+            ]
+
+    def close(self) -> None:
+        for host in self.hosts:
+            host.session.close()
@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+"""
+批量扫描引擎：基于 asyncio + httpx.AsyncClient 并发探测大量 Ollama 服务器
+"""
+
+import asyncio
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO
+
+import httpx
+from ollama import ListResponse, ProcessResponse, ShowResponse
+
+from cache import LRUCache
+from records import extract_models, model_record, process_record, show_record
+from store import ResultStore, tags_hash
+
+DEFAULT_PORT = 11434
+
+Sink = Callable[[Dict[str, Any]], None]
+
+# 展开为 主机 × 模型 行时的列
+SCAN_FIELDS = (
+    "host",
+    "version",
+    "name",
+    "size",
+    "modified_at",
+    "parameter_size",
+    "quantization_level",
+    "running",
+    "error",
+)
+
+
+def normalize_target(line: str) -> Optional[str]:
+    """将目标文件中的一行转换为服务器地址，空行和注释返回 None"""
+    target = line.split("#", 1)[0].strip()
+    if not target:
+        return None
+    if not target.startswith(("http://", "https://")):
+        target = f"http://{target}"
+    target = target.rstrip("/")
+    # 未指定端口时补全 Ollama 默认端口
+    netloc = target.split("://", 1)[1]
+    if ":" not in netloc.split("]")[-1]:
+        target = f"{target}:{DEFAULT_PORT}"
+    return target
+
+
+def iter_targets(stream: TextIO) -> Iterator[str]:
+    """逐行读取目标，不会一次性载入整个文件"""
+    for line in stream:
+        target = normalize_target(line)
+        if target:
+            yield target
+
+
+def scan_rows(result: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """将单个主机的扫描结果展开为每个模型一行，没有模型时输出一行主机信息"""
+    base = {"host": result["host"], "version": result["version"], "error": result["error"]}
+    running = {p["name"] for p in result["processes"]}
+    if not result["models"]:
+        yield base
+        return
+    for model in result["models"]:
+        yield {
+            **base,
+            "name": model["name"],
+            "size": model["size"],
+            "modified_at": model["modified_at"],
+            "parameter_size": model["parameter_size"],
+            "quantization_level": model["quantization_level"],
+            "running": model["name"] in running,
+        }
+
+
+def open_targets(path: str) -> TextIO:
+    """打开目标文件，'-' 表示标准输入"""
+    if path == "-":
+        return sys.stdin
+    return open(path, "r", encoding="utf-8")
+
+
+class Scanner:
+    """并发扫描 /api/version、/api/tags、/api/ps"""
+
+    def __init__(
+        self,
+        concurrency: int = 200,
+        connect_timeout: float = 3.0,
+        read_timeout: float = 10.0,
+        details: bool = False,
+        store: Optional[ResultStore] = None,
+        incremental: bool = False,
+    ):
+        if concurrency < 1:
+            raise ValueError("并发数必须大于 0")
+        if incremental and store is None:
+            raise ValueError("增量扫描需要结果库")
+        self.concurrency = concurrency
+        self.details = details
+        self.store = store
+        self.incremental = incremental
+        # 不同主机上的相同模型共用一份详情
+        self.details_cache = LRUCache(max_size=4096)
+        self._inflight: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+        self.timeout = httpx.Timeout(
+            connect=connect_timeout,
+            read=read_timeout,
+            write=read_timeout,
+            pool=None,
+        )
+        self.stats = {"total": 0, "alive": 0, "failed": 0, "unchanged": 0, "show": 0, "show_skipped": 0, "elapsed": 0.0}
+
+    async def _get_json(self, client: httpx.AsyncClient, url: str) -> Any:
+        response = await client.get(url)
+        response.raise_for_status()
+        return response.json()
+
+    async def _show(self, client: httpx.AsyncClient, host: str, name: str) -> Dict[str, Any]:
+        response = await client.post(f"{host}/api/show", json={"model": name})
+        response.raise_for_status()
+        record = show_record(name, ShowResponse.model_validate(response.json()))
+        del record["name"]
+        return record
+
+    async def _details(self, client: httpx.AsyncClient, host: str, model: Dict[str, Any]) -> Dict[str, Any]:
+        """获取单个模型详情，相同 digest 的并发请求合并为一次"""
+        digest = model.get("digest")
+        if not digest:
+            self.stats["show"] += 1
+            return await self._show(client, host, model["name"])
+        cached = self.details_cache.get(digest)
+        if cached is not None:
+            self.stats["show_skipped"] += 1
+            return cached
+        task = self._inflight.get(digest)
+        if task is not None:
+            self.stats["show_skipped"] += 1
+            return await asyncio.shield(task)
+        self.stats["show"] += 1
+        task = asyncio.ensure_future(self._show(client, host, model["name"]))
+        self._inflight[digest] = task
+        try:
+            detail = await task
+        finally:
+            self._inflight.pop(digest, None)
+        self.details_cache.put(digest, detail)
+        return detail
+
+    async def _fill_details(self, client: httpx.AsyncClient, host: str, models: List[Dict[str, Any]]) -> None:
+        """获取模型详情，增量模式下结果库中已有详情的 digest 直接读取，其余照常请求
+
+        即使主机的 /api/tags 未变化也不能整体跳过：上次扫描可能没有加 --details，或部分详情请求失败。
+        """
+        pending = []
+        for model in models:
+            stored = None
+            if self.incremental and model.get("digest"):
+                stored = self.store.details(model["digest"])
+            if stored is not None:
+                model["details"] = stored
+                self.stats["show_skipped"] += 1
+            else:
+                pending.append(model)
+        details = await asyncio.gather(
+            *(self._details(client, host, model) for model in pending),
+            return_exceptions=True,
+        )
+        for model, detail in zip(pending, details):
+            model["details"] = None if isinstance(detail, BaseException) else detail
+
+    async def scan_host(self, client: httpx.AsyncClient, host: str) -> Dict[str, Any]:
+        """扫描单个服务器，任何异常都记录在结果中而不是抛出"""
+        result: Dict[str, Any] = {
+            "host": host,
+            "version": None,
+            "models": [],
+            "processes": [],
+            "error": None,
+            "elapsed": 0.0,
+        }
+        start = time.perf_counter()
+        try:
+            # 先探测版本，连接失败时直接放弃后续请求
+            data = await self._get_json(client, f"{host}/api/version")
+            result["version"] = data.get("version") if isinstance(data, dict) else None
+
+            tags, ps = await asyncio.gather(
+                self._get_json(client, f"{host}/api/tags"),
+                self._get_json(client, f"{host}/api/ps"),
+                return_exceptions=True,
+            )
+            if isinstance(tags, BaseException):
+                result["error"] = f"tags: {type(tags).__name__}"
+            else:
+                models = extract_models(ListResponse.model_validate(tags)) or []
+                result["models"] = [model_record(m) for m in models]
+                result["tags_hash"] = tags_hash(result["models"])
+                previous = self.store.host(host) if self.incremental else None
+                # 与上次扫描相比 /api/tags 未变化
+                result["changed"] = previous is None or previous["tags_hash"] != result["tags_hash"]
+                if not result["changed"]:
+                    self.stats["unchanged"] += 1
+                if self.details:
+                    await self._fill_details(client, host, result["models"])
+            if isinstance(ps, BaseException):
+                result["error"] = result["error"] or f"ps: {type(ps).__name__}"
+            else:
+                processes = extract_models(ProcessResponse.model_validate(ps)) or []
+                result["processes"] = [process_record(m) for m in processes]
+        except httpx.HTTPStatusError as e:
+            result["error"] = f"HTTP {e.response.status_code}"
+        except httpx.TimeoutException as e:
+            result["error"] = f"timeout: {type(e).__name__}"
+        except httpx.HTTPError as e:
+            result["error"] = f"connect: {type(e).__name__}"
+        except Exception as e:
+            result["error"] = f"parse: {type(e).__name__}"
+        result["elapsed"] = round(time.perf_counter() - start, 4)
+        return result
+
+    async def _worker(
+        self,
+        client: httpx.AsyncClient,
+        queue: "asyncio.Queue[Optional[str]]",
+        sink: Sink,
+    ) -> None:
+        while True:
+            host = await queue.get()
+            if host is None:
+                return
+            result = await self.scan_host(client, host)
+            self.stats["total"] += 1
+            if result["version"] is not None:
+                self.stats["alive"] += 1
+            else:
+                self.stats["failed"] += 1
+            sink(result)
+
+    async def _ticker(self, tick: Callable[[], None], interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            tick()
+
+    async def run(
+        self,
+        targets: Iterable[str],
+        sink: Sink,
+        tick: Optional[Callable[[], None]] = None,
+        tick_interval: float = 0.25,
+    ) -> Dict[str, Any]:
+        """扫描所有目标，每完成一个就交给 sink 处理
+
+        tick 在扫描期间每隔 tick_interval 秒调用一次（与 sink 在同一线程），
+        用于在等待慢主机时写出已完成的结果。
+        """
+        start = time.perf_counter()
+        # 队列长度有界，目标文件再大内存占用也保持平稳
+        queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue(maxsize=self.concurrency * 2)
+        limits = httpx.Limits(
+            max_connections=self.concurrency * 2,
+            max_keepalive_connections=self.concurrency,
+        )
+        # 扫描目标多为裸 IP，证书校验必然失败
+        async with httpx.AsyncClient(timeout=self.timeout, limits=limits, verify=False) as client:
+            workers = [
+                asyncio.create_task(self._worker(client, queue, sink))
+                for _ in range(self.concurrency)
+            ]
+            ticker = asyncio.create_task(self._ticker(tick, tick_interval)) if tick is not None else None
+            try:
+                for host in targets:
+                    await queue.put(host)
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+            finally:
+                if ticker is not None:
+                    ticker.cancel()
+        self.stats["elapsed"] = round(time.perf_counter() - start, 3)
+        return self.stats
+
+    def scan(self, targets: Iterable[str], sink: Sink, tick: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+        """同步入口"""
+        return asyncio.run(self.run(targets, sink, tick))
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+共享 HTTP 会话：ollama.Client 与直接访问的原始接口共用同一个连接池
+"""
+
+import threading
+from typing import Any, Optional
+
+import httpx
+
+from health import HealthTransport, HostHealth
+from instrument import TRACER
+
+
+def http2_available() -> bool:
+    """是否安装了 HTTP/2 支持（h2）"""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def should_verify(host: str) -> bool:
+    """带端口的 https 地址通常是自签名证书，此时不校验证书"""
+    return not (host.startswith("https://") and ":" in host.split("://")[1].split("/")[0])
+
+
+class OllamaSession:
+    """单一连接池的 Ollama 会话
+
+    所有请求都经过同一个 HTTPTransport，连接保持复用，HTTPS 目标只需一次握手。
+    """
+
+    def __init__(
+        self,
+        host: str,
+        verify: bool = True,
+        timeout: Any = None,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 60.0,
+        http2: Optional[bool] = None,
+        health: Optional[HostHealth] = None,
+    ):
+        self.host = host
+        self.timeout = timeout if timeout is not None else httpx.Timeout(30.0)
+        # HTTP/2 仅对 https 生效，未安装 h2 时自动回退到 HTTP/1.1
+        self.http2 = http2_available() if http2 is None else http2
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        # 外层包装健康检查：熔断时快速失败，连接 / 读取超时随实测延迟调整
+        self.health = health or HostHealth(host)
+        # http:// 主机不会进行 TLS 握手，不加载 CA 证书包（每次启动可省下几十毫秒）
+        if not host.startswith("https://"):
+            verify = False
+        self.transport = HealthTransport(
+            httpx.HTTPTransport(verify=verify, http2=self.http2, limits=self.limits),
+            self.health,
+            self.timeout,
+        )
+        # 两个客户端共用同一组事件钩子，所有请求都计入性能统计
+        self.event_hooks = TRACER.event_hooks()
+        self.http = httpx.Client(
+            base_url=host,
+            timeout=self.timeout,
+            transport=self.transport,
+            event_hooks=self.event_hooks,
+        )
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self) -> Any:
+        """共用连接池的 ollama.Client，首次访问时才导入 ollama"""
+        with self._client_lock:
+            if self._client is None:
+                from ollama import Client
+
+                self._client = Client(
+                    host=self.host,
+                    timeout=self.timeout,
+                    transport=self.transport,
+                    event_hooks=self.event_hooks,
+                )
+        return self._client
+
+    def probe(self) -> float:
+        """预检主机（TCP 连接 + /api/version），返回耗时，不可达时抛出异常并熔断"""
+        return self.transport.probe()
+
+    def get_json(self, path: str) -> Any:
+        """GET 原始接口并解析 JSON"""
+        response = self.http.get(path)
+        response.raise_for_status()
+        with TRACER.span(f"decode GET {path}", "decode", metric="json.decode"):
+            return response.json()
+
+    def post_json(self, path: str, payload: Any) -> Any:
+        """POST 原始接口并解析 JSON"""
+        response = self.http.post(path, json=payload)
+        response.raise_for_status()
+        with TRACER.span(f"decode POST {path}", "decode", metric="json.decode"):
+            return response.json()
+
+    def close(self) -> None:
+        # 两个客户端共用 transport，关闭一次即可
+        self.http.close()
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+扫描结果持久化（SQLite），以服务器地址和模型 digest 为键，支持增量扫描
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from config import data_path
+from records import json_default
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hosts (
+    host TEXT PRIMARY KEY,
+    version TEXT,
+    tags_hash TEXT,
+    latency REAL,
+    error TEXT,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS host_models (
+    host TEXT NOT NULL,
+    name TEXT NOT NULL,
+    digest TEXT,
+    size INTEGER,
+    modified_at TEXT,
+    PRIMARY KEY (host, name)
+);
+CREATE INDEX IF NOT EXISTS host_models_digest ON host_models (digest);
+CREATE TABLE IF NOT EXISTS models (
+    digest TEXT PRIMARY KEY,
+    details TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+"""
+
+
+def tags_hash(models: Iterable[Dict[str, Any]]) -> str:
+    """根据模型名称与 digest 计算 /api/tags 内容的指纹"""
+    items = sorted(f"{m['name']}@{m.get('digest') or ''}" for m in models)
+    return hashlib.sha256("\n".join(items).encode("utf-8")).hexdigest()
+
+
+class ResultStore:
+    """本地结果库，可在多个线程中共用"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or data_path("results.db")
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        # WAL 模式下写入不会阻塞读取，频繁小事务也更快
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def host(self, host: str) -> Optional[Dict[str, Any]]:
+        """上次记录的服务器信息"""
+        with self._lock:
+            row = self._db.execute("SELECT * FROM hosts WHERE host = ?", (host,)).fetchone()
+        return dict(row) if row else None
+
+    def details(self, digest: str) -> Optional[Dict[str, Any]]:
+        """按 digest 获取已保存的模型详情"""
+        with self._lock:
+            row = self._db.execute("SELECT details FROM models WHERE digest = ?", (digest,)).fetchone()
+        return json.loads(row["details"]) if row else None
+
+    def _upsert_host(self, host: str, now: float, **fields: Any) -> None:
+        columns = ", ".join(fields)
+        placeholders = ", ".join("?" for _ in fields)
+        updates = ", ".join(f"{name} = excluded.{name}" for name in fields)
+        self._db.execute(
+            f"INSERT INTO hosts (host, {columns}, first_seen, last_seen) VALUES (?, {placeholders}, ?, ?) "
+            f"ON CONFLICT(host) DO UPDATE SET {updates}, last_seen = excluded.last_seen",
+            (host, *fields.values(), now, now),
+        )
+
+    def _replace_models(self, host: str, models: List[Dict[str, Any]]) -> None:
+        self._db.execute("DELETE FROM host_models WHERE host = ?", (host,))
+        self._db.executemany(
+            "INSERT OR REPLACE INTO host_models (host, name, digest, size, modified_at) VALUES (?, ?, ?, ?, ?)",
+            [
+                (host, m["name"], m.get("digest"), m.get("size"), json_default(m["modified_at"]) if m.get("modified_at") else None)
+                for m in models
+            ],
+        )
+
+    def _upsert_details(self, digest: str, details: Dict[str, Any], now: float) -> None:
+        self._db.execute(
+            "INSERT INTO models (digest, details, first_seen, last_seen) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(digest) DO UPDATE SET details = excluded.details, last_seen = excluded.last_seen",
+            (digest, json.dumps(details, ensure_ascii=False, default=json_default), now, now),
+        )
+
+    def save_scan(self, result: Dict[str, Any]) -> None:
+        """保存一个主机的扫描结果"""
+        now = time.time()
+        with self._lock, self._db:
+            if result["version"] is None:
+                # 不可达的主机只更新错误信息，保留上次成功时的数据
+                self._upsert_host(result["host"], now, error=result["error"], latency=result["elapsed"])
+                return
+            if "tags_hash" not in result:
+                # /api/tags 请求失败，不覆盖上次记录的模型列表
+                self._upsert_host(
+                    result["host"], now, version=result["version"], latency=result["elapsed"], error=result["error"]
+                )
+                return
+            self._upsert_host(
+                result["host"],
+                now,
+                version=result["version"],
+                tags_hash=result["tags_hash"],
+                latency=result["elapsed"],
+                error=result["error"],
+            )
+            self._replace_models(result["host"], result["models"])
+            for model in result["models"]:
+                if model.get("digest") and model.get("details"):
+                    self._upsert_details(model["digest"], model["details"], now)
+
+    def save_version(self, host: str, version: str) -> None:
+        with self._lock, self._db:
+            self._upsert_host(host, time.time(), version=version)
+
+    def save_models(self, host: str, models: List[Dict[str, Any]]) -> None:
+        with self._lock, self._db:
+            self._upsert_host(host, time.time(), tags_hash=tags_hash(models))
+            self._replace_models(host, models)
+
+    def save_details(self, digest: str, details: Dict[str, Any]) -> None:
+        with self._lock, self._db:
+            self._upsert_details(digest, details, time.time())
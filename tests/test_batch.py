@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""批量推理的断点续跑"""
+
+import json
+import multiprocessing
+import os
+import time
+
+from ollama import Client
+
+from batch import BatchRunner, iter_prompts
+from mockserver import MockOllama
+
+
+def _run(url, prompts, output):
+    runner = BatchRunner(Client(host=url), model="llama-mock0", concurrency=4, checkpoint_interval=0.2)
+    runner.run(prompts, output)
+
+
+def _lines(path):
+    with open(path, "rb") as f:
+        return f.read().count(b"\n")
+
+
+def test_resume_after_kill_writes_each_offset_once(tmp_path):
+    prompts, output = str(tmp_path / "prompts.jsonl"), str(tmp_path / "out.jsonl")
+    with open(prompts, "w", encoding="utf-8") as f:
+        for i in range(60):
+            f.write(json.dumps({"id": i, "prompt": f"p{i}"}) + "\n")
+    offsets = [offset for offset, _, _ in iter_prompts(prompts)]
+
+    with MockOllama(models=1, latency=0.03, token_rate=0) as mock:
+        process = multiprocessing.get_context("spawn").Process(target=_run, args=(mock.url, prompts, output))
+        process.start()
+        deadline = time.monotonic() + 10
+        while not os.path.exists(f"{output}.ckpt") and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # 断点保存之后又写出了结果再强制终止，这些结果只存在于输出文件中
+        written = _lines(output)
+        while _lines(output) < written + 3 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        process.kill()
+        process.join()
+        assert 0 < _lines(output) < len(offsets)
+
+        stats = BatchRunner(Client(host=mock.url), model="llama-mock0", concurrency=4).run(prompts, output, resume=True)
+
+    with open(output, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert sorted(record["offset"] for record in records) == offsets
+    assert all(record["error"] is None for record in records)
+    assert stats["completed"] < len(offsets)
+    assert not os.path.exists(f"{output}.ckpt")
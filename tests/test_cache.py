@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""模型列表缓存"""
+
+import threading
+
+from cache import ModelListCache
+
+
+def test_invalidate_discards_refresh_in_flight():
+    started, release = threading.Event(), threading.Event()
+    lists = [["old:latest"], ["new:latest"]]
+
+    def fetch():
+        started.set()
+        release.wait(5)
+        return lists.pop(0)
+
+    cache = ModelListCache(fetch, ttl=60)
+    thread = cache.refresh_async()
+    started.wait(5)
+    # 刷新进行中模型被删除，这次刷新取得的列表已经过时
+    cache.invalidate()
+    release.set()
+    thread.join(5)
+    assert cache.version == 0
+
+    # 缓存仍处于过期状态，读取时触发新的刷新
+    cache.get()
+    for _ in range(500):
+        if cache.version:
+            break
+        threading.Event().wait(0.01)
+    assert cache.get() == ("new:latest",)
+    assert cache.version == 1
+
+
+def test_refresh_keeps_old_list_on_failure():
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        if len(calls) > 1:
+            raise ConnectionError("down")
+        return ["a:latest"]
+
+    cache = ModelListCache(fetch, ttl=0)
+    cache.refresh()
+    cache.refresh()
+    assert cache.get() == ("a:latest",)
+    assert cache.version == 1
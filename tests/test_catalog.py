@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""模型索引的筛选、排序、分页与名称补全"""
+
+import pytest
+from ollama import ListResponse
+
+from catalog import ModelIndex, NameIndex, name_matcher, parse_parameter_size
+from mockserver import fake_models
+
+
+@pytest.fixture
+def index():
+    return ModelIndex.from_models(ListResponse.model_validate({"models": fake_models(12)}).models)
+
+
+def names(records):
+    return [record["name"] for record in records]
+
+
+def test_parse_parameter_size():
+    assert parse_parameter_size("8B") == 8e9
+    assert parse_parameter_size(" 137m ") == 137e6
+    assert parse_parameter_size("Unknown") is None
+
+
+def test_name_matcher():
+    assert name_matcher("MOCK1")("llama-mock1:latest")
+    assert name_matcher("llama*:latest")("llama-mock1:latest")
+    assert not name_matcher("mock*")("llama-mock1:latest")
+    assert name_matcher("/mock1[01]/")("qwen2-mock11:latest")
+    with pytest.raises(ValueError):
+        name_matcher("/[/")
+
+
+def test_filters_match_linear_scan(index):
+    records, total = index.query(family="LLAMA", quantization="q4_k_m", min_size=int(2e9), max_size=int(9e9))
+    expected = [
+        record["name"]
+        for record in sorted(index.records, key=lambda record: record["name"])
+        if record["name"].startswith("llama-") and 2e9 <= record["size"] <= 9e9
+    ]
+    assert names(records) == expected == ["llama-mock4:latest", "llama-mock8:latest"]
+    assert total == 2
+
+    records, total = index.query(pattern="mock1", family="qwen2")
+    assert names(records) == ["qwen2-mock1:latest"] and total == 1
+    assert index.query(family="missing") == ([], 0)
+
+
+def test_sort_and_pages(index):
+    # 大小默认从大到小，reverse 反过来
+    records, total = index.query(sort="size", limit=5, page=1)
+    assert [record["size"] for record in records] == [int(n * 1e9) for n in (12, 11, 10, 9, 8)]
+    assert total == 12
+    records, _ = index.query(sort="size", reverse=True, limit=5, page=3)
+    assert [record["size"] for record in records] == [int(11e9), int(12e9)]
+    assert index.query(sort="modified", limit=1)[0][0]["name"] == "nomic-bert-mock11:latest"
+    assert index.query(limit=5, page=4) == ([], 12)
+    with pytest.raises(ValueError):
+        index.query(page=0)
+    with pytest.raises(ValueError):
+        index.order("unknown")
+
+
+def test_name_prefix_and_segments():
+    completer = NameIndex(["llama-mock1:latest", "mock-llama:8b", "qwen2-mock10:latest", "gemma:2b"])
+    assert completer.prefix("mock1") == ["qwen2-mock10:latest", "llama-mock1:latest"]
+    # 完整名称的前缀匹配排在片段匹配前面
+    assert completer.prefix("MOCK") == ["mock-llama:8b", "qwen2-mock10:latest", "llama-mock1:latest"]
+    assert completer.prefix("8b") == ["mock-llama:8b"]
+    assert completer.complete("") == completer.names
+
+
+def test_fuzzy_fallback():
+    completer = NameIndex(["llama-mock1:latest", "qwen2-mock10:latest", "gemma:2b"])
+    assert completer.prefix("qm10") == []
+    # 字符更集中的名称排在前面
+    assert completer.complete("qm10") == ["qwen2-mock10:latest"]
+    # llama 中的 m 与 k 相隔较远
+    assert completer.complete("mk1") == ["qwen2-mock10:latest", "llama-mock1:latest"]
+    assert completer.complete("zzz") == []
+
+
+def test_results_are_capped():
+    completer = NameIndex([f"model{i:04d}:latest" for i in range(3000)], max_results=20)
+    assert len(completer.prefix("model")) == 20
+    assert len(completer.fuzzy("ml")) == 20
+    assert completer.prefix("model2999") == ["model2999:latest"]
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""批量向量化与 .npy 输出"""
+
+import ast
+import struct
+from array import array
+
+from embed import NPY_HEADER_LEN, NPY_MAGIC, EmbedRunner, index_path
+from mockserver import MockOllama
+from session import OllamaSession
+
+
+def load_npy(path, typecode):
+    """不依赖 numpy 读取 NpyWriter 写出的文件，返回 (shape, 扁平数据)"""
+    with open(path, "rb") as f:
+        data = f.read()
+    assert data.startswith(NPY_MAGIC)
+    (length,) = struct.unpack("<H", data[len(NPY_MAGIC) : len(NPY_MAGIC) + 2])
+    assert len(NPY_MAGIC) + 2 + length == NPY_HEADER_LEN
+    header = ast.literal_eval(data[len(NPY_MAGIC) + 2 : NPY_HEADER_LEN].decode("latin1"))
+    values = array(typecode)
+    values.frombytes(data[NPY_HEADER_LEN:])
+    return header["shape"], values
+
+
+def test_vectors_written_in_input_order(tmp_path):
+    texts = ["a" * (i % 7 + 1) + str(i) for i in range(23)]
+    source = tmp_path / "texts.txt"
+    source.write_text("".join(f"{text}\n" for text in texts) + "\n", encoding="utf-8")
+    output = str(tmp_path / "vectors.npy")
+
+    # 延迟抖动使批次乱序完成，写出顺序仍须与输入一致
+    with MockOllama(models=1, latency=0.01, jitter=0.03, embedding_dim=8) as mock:
+        session = OllamaSession(mock.url)
+        try:
+            stats = EmbedRunner(session, mock.models[0]["name"], batch_size=4, concurrency=3).run(str(source), output)
+        finally:
+            session.close()
+    assert stats["docs"] == 23 and stats["failed"] == 0
+    assert stats["batches"] == 6 and stats["dim"] == 8
+
+    shape, vectors = load_npy(output, "f")
+    assert shape == (23, 8)
+    expected = [((len(text) + j) % 97) / 97 for text in texts for j in range(8)]
+    assert [round(v, 5) for v in vectors] == [round(v, 5) for v in expected]
+
+    shape, offsets = load_npy(index_path(output), "q")
+    assert shape == (23,)
+    starts, offset = [], 0
+    for text in texts:
+        starts.append(offset)
+        offset += len(text) + 1
+    assert list(offsets) == starts
+
+
+def test_failed_batches_are_skipped(tmp_path):
+    source = tmp_path / "texts.txt"
+    source.write_text("x\ny\nz\n", encoding="utf-8")
+    output = str(tmp_path / "vectors.npy")
+    with MockOllama(models=1) as mock:
+        session = OllamaSession(mock.url)
+        try:
+            stats = EmbedRunner(session, "missing", batch_size=2).run(str(source), output)
+        finally:
+            session.close()
+    assert stats["docs"] == 0 and stats["failed"] == 3
+    assert load_npy(output, "f")[0] == (0,)
+    assert load_npy(index_path(output), "q")[0] == (0,)
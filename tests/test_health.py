@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""主机健康状态与熔断"""
+
+import httpx
+import pytest
+
+import health
+from health import CLOSED, HALF_OPEN, OPEN, CircuitOpenError, HealthTransport, HostHealth
+from mockserver import MockOllama
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(health.time, "monotonic", clock)
+    return clock
+
+
+def test_trips_after_threshold_and_recovers(clock):
+    host = HostHealth("http://a", failure_threshold=3, cooldown=5.0)
+    host.fail("ConnectError")
+    host.fail("ConnectError")
+    assert host.state == CLOSED and not host.check()
+    host.fail("ConnectError")
+    assert host.state == OPEN
+    with pytest.raises(CircuitOpenError) as info:
+        host.check()
+    assert info.value.failures == 3 and info.value.retry_in == 5.0
+
+    # 冷却结束后进入半开状态，探测成功则恢复
+    clock.now += 5.0
+    assert host.check()
+    assert host.state == HALF_OPEN
+    host.observe(0.1)
+    assert host.state == CLOSED and host.failures == 0 and host.trips == 0
+    assert not host.check()
+
+
+def test_cooldown_doubles_up_to_max(clock):
+    host = HostHealth("http://a", failure_threshold=1, cooldown=5.0, max_cooldown=15.0)
+    retries = []
+    for _ in range(4):
+        host.fail("ConnectError")
+        retries.append(host.snapshot()["retry_in"])
+        clock.now = host.open_until
+        # 半开状态下的探测失败立即重新熔断
+        assert host.check() and host.state == HALF_OPEN
+    assert retries == [5.0, 10.0, 15.0, 15.0]
+
+    # 恢复后冷却时间重新从初始值开始
+    host.observe()
+    host.fail("ConnectError")
+    assert host.snapshot()["retry_in"] == 5.0
+
+
+def test_transport_fails_fast_while_open():
+    with MockOllama(failure_rate=1.0, failure_mode="503") as mock:
+        host = HostHealth(mock.url, failure_threshold=2, cooldown=30.0)
+        timeout = httpx.Timeout(5.0)
+        client = httpx.Client(base_url=mock.url, transport=HealthTransport(httpx.HTTPTransport(), host, timeout))
+        try:
+            for _ in range(2):
+                assert client.get("/api/tags").status_code == 503
+            # 控制类接口连续返回 503，之后的请求不再发往服务器
+            assert host.state == OPEN
+            with pytest.raises(CircuitOpenError):
+                client.get("/api/tags")
+            assert mock.calls["/api/tags"] == 2
+        finally:
+            client.close()
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""多轮对话历史的字符预算"""
+
+from history import ChatHistory
+
+
+def test_evicts_whole_turns_oldest_first():
+    history = ChatHistory(max_chars=20, system="你是助手")
+    history.add("q1", "a" * 8)  # 10
+    history.add("q2", "b" * 8)  # 20
+    assert len(history) == 2 and history.chars == 20
+    history.add("q3", "c" * 3)  # 超出预算，淘汰第一轮
+    assert len(history) == 2
+    assert history.chars == 15
+    messages = history.messages("q4")
+    assert [m["role"] for m in messages] == ["system", "user", "assistant", "user", "assistant", "user"]
+    assert [m["content"] for m in messages if m["role"] == "user"] == ["q2", "q3", "q4"]
+    # 问与答总是成对出现
+    assert all(messages[i]["role"] == "user" and messages[i + 1]["role"] == "assistant" for i in (1, 3))
+
+
+def test_keeps_latest_turn_even_if_over_budget():
+    history = ChatHistory(max_chars=10)
+    history.add("q1", "a")
+    history.add("长问题" * 5, "长回答" * 5)
+    assert len(history) == 1
+    assert history.messages()[0]["content"] == "长问题" * 5
+
+
+def test_prefix_stays_stable_until_eviction():
+    history = ChatHistory(max_chars=1000)
+    history.add("q1", "a1")
+    before = history.messages()
+    history.add("q2", "a2")
+    assert history.messages()[: len(before)] == before
+
+
+def test_clear():
+    history = ChatHistory()
+    history.add("q", "a")
+    history.clear()
+    assert len(history) == 0 and history.chars == 0 and history.messages() == []
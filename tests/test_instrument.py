@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""请求阶段耗时与 trace 导出"""
+
+import json
+
+import httpx
+
+from instrument import Tracer
+from mockserver import MockOllama
+
+
+def test_request_phases_and_server_durations(tmp_path):
+    tracer = Tracer()
+    tracer.enable_trace()
+    with MockOllama(models=1, latency=0.05, tokens=8) as mock:
+        with httpx.Client(base_url=mock.url, event_hooks=tracer.event_hooks()) as client:
+            tags = client.get("/api/tags")
+            generated = client.post("/api/generate", json={"model": mock.models[0]["name"], "prompt": "hi"})
+
+    metrics = tracer.metrics
+    # 第二个请求复用连接，只建立一次 TCP 连接
+    assert len(metrics["http.connect"]) == 1
+    assert len(metrics["http.send"]) == 4
+    assert len(metrics["http.wait"]) == 2 and min(metrics["http.wait"]) >= 0.05
+    assert len(metrics["http.body"]) == 2
+    assert len(metrics["http.total"]) == 2
+    assert list(metrics["http.total GET /api/tags"])[0] >= list(metrics["http.ttfb"])[0]
+    assert tracer.counters["http.requests"] == 2
+    assert tracer.counters["http.bytes_received"] == len(tags.content) + len(generated.content)
+    # 生成接口最后一行中的服务器耗时
+    assert len(metrics["server.total"]) == 1 and len(metrics["server.eval"]) == 1
+
+    summary = tracer.summary()
+    assert summary["http.wait"]["count"] == 2
+    assert sum(summary["http.total"]["histogram"]) == 2
+
+    path = tmp_path / "trace.json"
+    spans = tracer.write_trace(str(path))
+    events = json.loads(path.read_text(encoding="utf-8"))["traceEvents"]
+    assert spans == len(events)
+    assert {event["name"] for event in events} >= {"connect GET /api/tags", "wait POST /api/generate", "GET /api/tags"}
+    assert [event["args"]["status"] for event in events if event["name"] == "POST /api/generate"] == [200]
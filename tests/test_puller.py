@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""拉取队列与并发拉取"""
+
+import io
+import multiprocessing
+
+from ollama import ResponseError
+from rich.console import Console
+
+from mockserver import MockOllama
+from puller import DONE, FAILED, ParallelPuller, PullQueue, permanent
+from session import OllamaSession
+
+
+def test_queues_sharing_a_file_keep_each_others_entries(tmp_path):
+    path = str(tmp_path / "queue.json")
+    first, second = PullQueue("http://a", path), PullQueue("http://a", path)
+    first.add(["m1"])
+    second.add(["m2"])
+    first.update("m1", status=DONE)
+    assert set(PullQueue("http://a", path).entries) == {"m1", "m2"}
+    assert PullQueue("http://a", path).pending() == ["m2"]
+
+
+def _add_many(path, prefix):
+    queue = PullQueue("http://a", path)
+    for i in range(20):
+        queue.add([f"{prefix}{i}"])
+
+
+def test_concurrent_processes(tmp_path):
+    path = str(tmp_path / "queue.json")
+    processes = [multiprocessing.get_context("spawn").Process(target=_add_many, args=(path, prefix)) for prefix in "xyz"]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+    assert len(PullQueue("http://a", path).entries) == 60
+
+
+def test_corrupt_queue_file(tmp_path):
+    path = tmp_path / "queue.json"
+    path.write_text("{not json", encoding="utf-8")
+    queue = PullQueue("http://a", str(path))
+    assert queue.pending() == []
+    queue.add(["m"])
+    assert PullQueue("http://a", str(path)).pending() == ["m"]
+
+
+def test_permanent_errors():
+    assert permanent(ResponseError("model not found", 404))
+    assert permanent(ResponseError("pull model manifest: file does not exist"))
+    assert not permanent(ResponseError("rate limited", 429))
+    assert not permanent(ResponseError("server error", 500))
+    assert not permanent(ConnectionResetError())
+
+
+def test_pull_against_mock(tmp_path):
+    queue = PullQueue("mock", str(tmp_path / "queue.json"))
+    queue.add(["a", "b"])
+    with MockOllama(tokens=16) as mock:
+        session = OllamaSession(mock.url)
+        puller = ParallelPuller(session.client, queue, console=Console(file=io.StringIO()))
+        assert puller.run(["a", "b"]) == {"a": True, "b": True}
+        session.close()
+    assert queue.pending() == []
+
+
+def test_permanent_error_is_not_retried(tmp_path):
+    class Client:
+        calls = 0
+
+        def pull(self, model, stream=True):
+            Client.calls += 1
+            raise ResponseError("model not found", 404)
+
+    queue = PullQueue("mock", str(tmp_path / "queue.json"))
+    puller = ParallelPuller(Client(), queue, retries=3, backoff=10, console=Console(file=io.StringIO()))
+    assert puller.run(["missing"]) == {"missing": False}
+    assert Client.calls == 1
+    assert queue.entries["missing"]["status"] == FAILED
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""流式渲染：<think> 标签拆分在多个分块中"""
+
+import io
+
+from rich.console import Console
+
+from render import StreamRenderer, _partial_tag
+
+
+def render(chunks):
+    console = Console(file=io.StringIO(), width=80, force_terminal=False)
+    renderer = StreamRenderer(console)
+    with renderer:
+        for content in chunks:
+            renderer.feed(content)
+    return renderer, console.file.getvalue()
+
+
+def test_partial_tag():
+    assert _partial_tag("hello <thi", "<think>") == 4
+    assert _partial_tag("hello <", "</think>") == 1
+    assert _partial_tag("hello", "<think>") == 0
+
+
+def test_think_tag_split_across_chunks():
+    renderer, output = render(["<th", "ink>推理", "过程</th", "ink>", "最终", "回答"])
+    assert "<think" not in output and "</think" not in output and "ink>" not in output
+    assert "思考过程" in output
+    assert output.index("推理过程") < output.index("最终回答")
+    assert renderer.chunks == 6
+    assert not renderer.thinking
+
+
+def test_text_resembling_a_tag_is_kept():
+    _, output = render(["比较 a <", "b 与 <th", "e 结束"])
+    assert "比较 a <b 与 <the 结束" in output
+    assert "思考过程" not in output
+
+
+def test_explicit_thinking_field():
+    console = Console(file=io.StringIO(), width=80, force_terminal=False)
+    with StreamRenderer(console) as renderer:
+        renderer.feed(None, thinking="先想一想")
+        renderer.feed("答案")
+    output = console.file.getvalue()
+    assert "思考过程" in output
+    assert output.index("先想一想") < output.index("答案")
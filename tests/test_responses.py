@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""确定性响应缓存"""
+
+import itertools
+
+import pytest
+
+import responses
+from mockserver import MockOllama
+from responses import CachedClient, ResponseCache, cache_key
+from session import OllamaSession
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(responses.time, "time", lambda: next(ticks))
+
+
+def test_key_depends_on_generation_arguments():
+    base = {"messages": MESSAGES, "options": {"temperature": 0}}
+    key = cache_key("d1", "chat", base)
+    assert cache_key("d1", "chat", dict(base, keep_alive="5m", stream=True)) == key
+    assert cache_key("d2", "chat", base) != key
+    assert cache_key("d1", "generate", base) != key
+    assert cache_key("d1", "chat", dict(base, options={"temperature": 0, "seed": 1})) != key
+    assert cache_key("d1", "chat", dict(base, options={"temperature": 0.5, "seed": 1})) != cache_key(
+        "d1", "chat", dict(base, options={"temperature": 0, "seed": 1})
+    )
+    assert cache_key("d1", "chat", dict(base, options={"seed": 2})) != cache_key("d1", "chat", dict(base, options={"seed": 1}))
+
+
+def test_evicts_least_recently_used(tmp_path, clock):
+    value = {"response": "x" * 200}
+    cache = ResponseCache(str(tmp_path / "probe.db"))
+    cache.put("probe", "m", value)
+    size = cache.stats()["bytes"]
+    cache.close()
+
+    cache = ResponseCache(str(tmp_path / "lru.db"), max_bytes=3 * size)
+    try:
+        for key in "abc":
+            cache.put(key, "m", value)
+        # 访问 a 之后，b 成为最久未使用的条目
+        assert cache.get("a") == value
+        cache.put("d", "m", value)
+        assert cache.get("b") is None
+        assert all(cache.get(key) == value for key in "acd")
+        stats = cache.stats()
+        assert stats["entries"] == 3 and stats["bytes"] == 3 * size
+        assert stats["evictions"] == 1
+        assert stats["hits"] == 4 and stats["misses"] == 1
+    finally:
+        cache.close()
+
+
+def test_cached_client_replays_and_counts_bypasses(tmp_path):
+    with MockOllama(models=1, tokens=8) as mock:
+        session = OllamaSession(mock.url)
+        cache = ResponseCache(str(tmp_path / "responses.db"))
+        digests = {}
+        client = CachedClient(session.client, cache, digests.get)
+        try:
+            model = mock.models[0]["name"]
+            options = {"temperature": 0}
+            # 模型版本未知时不使用缓存
+            client.chat(model, MESSAGES, options=options)
+            assert cache.stats()["bypasses"] == 1
+
+            digests[model] = mock.models[0]["digest"]
+            first = client.chat(model, MESSAGES, options=options)
+            streamed = list(client.chat(model, MESSAGES, stream=True, options=options))
+            assert mock.calls["/api/chat"] == 2
+            assert "".join(chunk["message"]["content"] for chunk in streamed) == first["message"]["content"]
+
+            # 非确定性的请求不经过缓存，也不计入绕过次数
+            client.chat(model, MESSAGES, options={"temperature": 0.7})
+            client.chat(model, MESSAGES, options={"temperature": 0, "seed": 1})
+            assert mock.calls["/api/chat"] == 4
+            stats = cache.stats()
+            assert stats["hits"] == 1 and stats["misses"] == 2 and stats["bypasses"] == 1
+        finally:
+            cache.close()
+            session.close()
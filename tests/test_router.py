@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""主机池路由：故障切换与流式对话接续"""
+
+import httpx
+import pytest
+
+from mockserver import MockOllama
+from router import Router
+from session import OllamaSession
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def make_router(*mocks):
+    notes = []
+    router = Router([OllamaSession(mock.url) for mock in mocks], notify=notes.append)
+    router.refresh()
+    return router, notes
+
+
+def test_failover_to_next_host():
+    # 第一台主机已加载模型而优先被选中，但请求返回 503
+    with MockOllama(models=1, running=1) as bad, MockOllama(models=1, running=0) as good:
+        router, notes = make_router(bad, good)
+        try:
+            model = bad.models[0]["name"]
+            assert router.rank(model)[0].host == bad.url
+            bad.failure_rate = 1.0
+            response = router.chat(model, MESSAGES)
+            assert response["message"]["content"]
+            assert router.failovers == 1 and len(notes) == 1
+            hosts = {host.host: host for host in router.hosts}
+            assert hosts[bad.url].failures == 1
+            assert model in hosts[good.url].resident
+            assert good.calls["/api/chat"] == 1
+        finally:
+            router.close()
+
+
+def test_chat_stream_resumes_on_next_host(monkeypatch):
+    with MockOllama(models=1, running=1, tokens=8, cut_after=3) as first, MockOllama(models=1, running=0, tokens=8) as second:
+        router, _ = make_router(first, second)
+        try:
+            model = first.models[0]["name"]
+            hosts = {host.host: host for host in router.hosts}
+            requests = []
+            chat = hosts[second.url].session.client.chat
+            monkeypatch.setattr(
+                hosts[second.url].session.client, "chat", lambda **kwargs: requests.append(kwargs) or chat(**kwargs)
+            )
+
+            chunks = list(router.chat(model, MESSAGES, stream=True))
+            partial = "".join(chunk["message"]["content"] for chunk in chunks[:3])
+            # 前 3 个分块来自第一台主机，已收到的内容作为 assistant 消息发给第二台主机
+            assert len(chunks) == 3 + 8 + 1 and chunks[-1]["done"]
+            assert router.failovers == 1
+            (request,) = requests
+            assert request["messages"] == MESSAGES + [{"role": "assistant", "content": partial}]
+        finally:
+            router.close()
+
+
+def test_generate_stream_fails_after_first_chunk():
+    # generate 无法接续，收到内容后的失败直接抛出
+    with MockOllama(models=1, running=1, tokens=8, cut_after=3) as first, MockOllama(models=1, running=0) as second:
+        router, _ = make_router(first, second)
+        try:
+            chunks = []
+            with pytest.raises(httpx.TransportError):
+                for chunk in router.generate(first.models[0]["name"], "hi", stream=True):
+                    chunks.append(chunk)
+            assert len(chunks) == 3
+            assert router.failovers == 0
+            assert second.calls.get("/api/generate", 0) == 0
+        finally:
+            router.close()
+
+
+def test_digest_ignores_dead_and_tripped_hosts():
+    with MockOllama(models=1) as first, MockOllama(models=1) as second:
+        sessions = [OllamaSession(first.url), OllamaSession(second.url), OllamaSession("http://127.0.0.1:9")]
+        router = Router(sessions)
+        try:
+            model = first.models[0]["name"]
+            digest = first.models[0]["digest"]
+            # 第三台主机不可达，从未取得模型列表
+            assert router.digest(model) == digest
+
+            # 熔断中的主机上的版本不同，不影响结果
+            second.models[0]["digest"] = "other"
+            router.invalidate()
+            sessions[1].health.fail("ConnectError", trip=True)
+            assert router.digest(model) == digest
+        finally:
+            router.close()
+
+
+def test_digest_none_when_versions_differ():
+    with MockOllama(models=1) as first, MockOllama(models=1) as second:
+        router, _ = make_router(first, second)
+        try:
+            model = first.models[0]["name"]
+            assert router.digest(model) == first.models[0]["digest"]
+            # 重新拉取后 digest 变化，刷新前仍使用旧的模型列表
+            second.models[0]["digest"] = "other"
+            assert router.digest(model) == first.models[0]["digest"]
+            router.invalidate()
+            assert router.digest(model) is None
+            first.models[0]["digest"] = "other"
+            router.invalidate()
+            assert router.digest(model) == "other"
+            assert router.digest("missing") is None
+        finally:
+            router.close()
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""批量扫描引擎：解析、错误分类、详情去重与增量扫描"""
+
+import io
+
+from mockserver import VERSION, MockOllama
+from output import JsonlWriter
+from scanner import Scanner, normalize_target, scan_rows
+from store import ResultStore
+
+
+def scan(targets, store=None, **options):
+    scanner = Scanner(concurrency=4, store=store, **options)
+    results = []
+
+    def sink(result):
+        if store is not None:
+            store.save_scan(result)
+        results.append(result)
+
+    scanner.scan(targets, sink)
+    return scanner.stats, sorted(results, key=lambda result: result["host"])
+
+
+def test_normalize_target():
+    assert normalize_target("1.2.3.4") == "http://1.2.3.4:11434"
+    assert normalize_target("https://example.com/ # 备注") == "https://example.com:11434"
+    assert normalize_target("[::1]:8080") == "http://[::1]:8080"
+    assert normalize_target("  # 注释") is None
+
+
+def test_parses_version_tags_and_ps():
+    with MockOllama(models=3, running=1) as mock:
+        stats, (result,) = scan([mock.url])
+    assert result["error"] is None
+    assert result["version"] == VERSION
+    assert [model["name"] for model in result["models"]] == [model["name"] for model in mock.models]
+    assert result["models"][0]["digest"] == mock.models[0]["digest"]
+    assert [process["name"] for process in result["processes"]] == [mock.models[0]["name"]]
+    rows = list(scan_rows(result))
+    assert len(rows) == 3
+    assert [row["running"] for row in rows] == [True, False, False]
+    assert stats["alive"] == 1 and stats["failed"] == 0
+
+
+def test_connection_refused():
+    stats, (result,) = scan(["http://127.0.0.1:9"])
+    assert result["version"] is None
+    assert result["error"] == "connect: ConnectError"
+    assert list(scan_rows(result)) == [{"host": "http://127.0.0.1:9", "version": None, "error": "connect: ConnectError"}]
+    assert stats["failed"] == 1
+
+
+def test_read_timeout():
+    with MockOllama(failure_rate=1.0, failure_mode="hang") as mock:
+        _, (result,) = scan([mock.url], read_timeout=0.2)
+    assert result["version"] is None
+    assert result["error"] == "timeout: ReadTimeout"
+
+
+def test_non_json_body():
+    with MockOllama(failure_rate=1.0, failure_mode="invalid") as mock:
+        _, (result,) = scan([mock.url])
+    assert result["version"] is None
+    assert result["error"] == "parse: JSONDecodeError"
+
+
+def test_http_error_status():
+    with MockOllama(failure_rate=1.0, failure_mode="503") as mock:
+        _, (result,) = scan([mock.url])
+    assert result["error"] == "HTTP 503"
+
+
+def test_tick_flushes_results_while_waiting_on_slow_hosts():
+    stream = io.StringIO()
+    writer = JsonlWriter(stream, flush_interval=0.1)
+    written = []
+
+    def tick():
+        writer.tick()
+        written.append(stream.getvalue().count("\n"))
+
+    with MockOllama() as fast, MockOllama(failure_rate=1.0, failure_mode="hang") as slow:
+        Scanner(concurrency=2, read_timeout=1.0).scan([fast.url, slow.url], writer.write, tick=tick)
+    # 慢主机超时之前，已完成的结果已经写出
+    assert 1 in written
+    writer.close()
+    assert stream.getvalue().count("\n") == 2
+
+
+def test_show_requests_deduplicated_across_hosts():
+    # 两台主机上的模型相同（digest 相同），详情请求同时发出，每个 digest 只请求一次
+    with MockOllama(models=4, latency=0.05) as first, MockOllama(models=4, latency=0.05) as second:
+        stats, results = scan([first.url, second.url], details=True)
+    assert first.calls.get("/api/show", 0) + second.calls.get("/api/show", 0) == 4
+    assert stats["show"] == 4
+    assert stats["show_skipped"] == 4
+    for result in results:
+        assert all(model["details"]["parameter_size"] for model in result["models"])
+
+
+def test_incremental_rescan_fetches_missing_details(tmp_path):
+    store = ResultStore(str(tmp_path / "results.db"))
+    with MockOllama(models=4) as mock:
+        # 第一次扫描不带 --details，结果库中只有模型列表
+        stats, _ = scan([mock.url], store)
+        assert stats["show"] == 0
+
+        # 主机的 /api/tags 没有变化，但详情缺失，仍需请求
+        stats, (result,) = scan([mock.url], store, details=True, incremental=True)
+        assert stats["unchanged"] == 1
+        assert stats["show"] == 4
+        assert mock.calls["/api/show"] == 4
+        assert all(model["details"] for model in result["models"])
+
+        # 详情已保存，再次扫描全部从结果库读取
+        stats, (result,) = scan([mock.url], store, details=True, incremental=True)
+        assert stats["show"] == 0
+        assert stats["show_skipped"] == 4
+        assert mock.calls["/api/show"] == 4
+        assert all(model["details"] for model in result["models"])
+    store.close()
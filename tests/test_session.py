@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+"""OllamaSession 连接复用"""
+
+from mockserver import MockOllama
+from session import OllamaSession
+
+
+def test_requests_share_one_connection():
+    with MockOllama() as mock:
+        session = OllamaSession(mock.url)
+        try:
+            session.get_json("/api/version")
+            session.get_json("/api/tags")
+            session.get_json("/api/ps")
+            session.client.list()
+            session.client.show(mock.models[0]["name"])
+        finally:
+            session.close()
+    assert mock.requests == 5
+    assert mock.connections == 1
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""OllamaShell 批量命令"""
+
+import json
+
+from main import OllamaShell
+from mockserver import MockOllama
+
+
+def test_fetch_model_details_isolates_failures():
+    with MockOllama(models=3) as mock:
+        shell = OllamaShell(mock.url)
+        try:
+            names = [mock.models[0]["name"], "missing:latest", mock.models[2]["name"]]
+            details = shell.fetch_model_details(names, parallel=3)
+            # 不存在的模型只影响自己的记录，其余模型的详情照常返回
+            assert set(details) == set(names)
+            assert details["missing:latest"]["name"] == "missing:latest"
+            assert "ResponseError" in details["missing:latest"]["error"]
+            for name in (names[0], names[2]):
+                assert "error" not in details[name]
+                assert details[name]["parameter_size"]
+            # 失败的记录不进入缓存，成功的按 digest 缓存
+            assert len(shell.show_cache) == 2
+
+            shell.fetch_model_details(names, parallel=3)
+            assert mock.calls["/api/show"] == 4
+        finally:
+            shell.session.close()
+
+
+def test_background_records_go_to_job_output(capsys):
+    with MockOllama(models=3) as mock:
+        shell = OllamaShell(mock.url, output_format="jsonl")
+        try:
+            job = shell.start_job("list", [])
+            shell.jobs.wait([job])
+        finally:
+            shell.session.close()
+    assert job.error is None
+    # 任务 Console 强制终端模式，状态提示会留下光标控制序列
+    lines = [line[line.index("{") :] for line in job.output().splitlines() if "{" in line]
+    names = [json.loads(line)["name"] for line in lines]
+    assert names == sorted(model["name"] for model in mock.models)
+    assert '"name"' not in capsys.readouterr().out
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""top 视图的剩余时间刷新"""
+
+import time
+from datetime import datetime, timedelta, timezone
+
+from top import ProcessMonitor, TopView
+
+
+def test_remaining_time_advances_between_polls():
+    monitor = ProcessMonitor({})
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=30.5)
+    monitor.models = {("http://a", "m:latest"): {"size": 100, "size_vram": 50, "expires_at": expires_at}}
+    view = TopView(monitor, show_host=False)
+    try:
+        assert view.render(force=True) is not None
+        assert view.rows()[0][-1] == "30s"
+        # 没有新的轮询结果，剩余时间仍随时间推进而重绘
+        time.sleep(1.0)
+        assert view.render() is not None
+        assert view.rows()[0][-1] == "29s"
+        assert view.render() is None
+    finally:
+        monitor.close()
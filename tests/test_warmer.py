@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""模型预热与按时间表常驻"""
+
+import httpx
+
+from mockserver import MockOllama
+from session import OllamaSession
+from warmer import EVICT, LOAD, PINNED, SKIP, ModelWarmer, run_schedule
+
+
+class FixedSchedule:
+    """每轮依次返回给定的常驻模型列表"""
+
+    def __init__(self, *hot_sets):
+        self.hot_sets = list(hot_sets)
+
+    def hot_set(self, now):
+        return self.hot_sets.pop(0)
+
+
+def names(mock):
+    return [model["name"] for model in mock.models]
+
+
+def test_failed_eviction_does_not_stop_loads(monkeypatch):
+    with MockOllama(models=2, running=1) as mock:
+        session = OllamaSession(mock.url)
+        try:
+            old, new = names(mock)
+            warmer = ModelWarmer(session, budget=int(2.5e9))
+
+            def unload(model):
+                raise httpx.ConnectError("refused")
+
+            monkeypatch.setattr(warmer, "unload", unload)
+            steps = warmer.warm([new], "5m")
+        finally:
+            session.close()
+    assert [(step["model"], step["action"]) for step in steps] == [(old, SKIP), (new, LOAD)]
+    assert steps[0]["reason"] == "ConnectError: refused"
+
+
+def test_schedule_releases_only_resident_models(monkeypatch):
+    with MockOllama(models=3, running=0) as mock:
+        session = OllamaSession(mock.url)
+        try:
+            first, second, third = names(mock)
+            warmer = ModelWarmer(session)
+            loads, ticks = [], []
+            load = warmer.load
+
+            def spy(model, keep_alive):
+                loads.append((model, keep_alive))
+                if model == second and keep_alive == "1m" and len(ticks) == 1:
+                    raise httpx.ReadTimeout("slow")
+                return load(model, keep_alive)
+
+            monkeypatch.setattr(warmer, "load", spy)
+            schedule = FixedSchedule([first, second], [third], [third])
+
+            def on_tick(hot, steps, released, error):
+                ticks.append((released, error))
+                if len(ticks) == 1:
+                    # 时间段结束前 first 已被其他请求卸载
+                    mock.unload(mock.find(first))
+
+            run_schedule(warmer, schedule, "1m", interval=0, count=3, on_tick=on_tick)
+        finally:
+            session.close()
+
+    # first 已不在显存中，不再发送请求；second 第一次改回失败，下一轮重试
+    assert ticks[1] == ([first], f"{second}: ReadTimeout: slow")
+    assert ticks[2] == ([second], None)
+    releases = [model for model, keep_alive in loads if keep_alive == "1m"]
+    assert releases == [second, second]
+    assert first not in [model["name"] for model in mock.running]
+    assert (third, PINNED) in loads
+
+
+def test_evicted_models_are_unpinned(monkeypatch):
+    with MockOllama(models=2, running=0) as mock:
+        session = OllamaSession(mock.url)
+        try:
+            small, large = names(mock)
+            ticks = []
+            # 预算只够一个模型，第二轮常驻 large 时卸载 small
+            warmer = ModelWarmer(session, budget=int(2.5e9))
+            load = warmer.load
+
+            def spy(model, keep_alive):
+                if keep_alive == "1m":
+                    raise httpx.ReadTimeout("slow")
+                return load(model, keep_alive)
+
+            monkeypatch.setattr(warmer, "load", spy)
+            schedule = FixedSchedule([small], [large], [large])
+            run_schedule(warmer, schedule, "1m", interval=0, count=3, on_tick=lambda *tick: ticks.append(tick))
+        finally:
+            session.close()
+    # small 改回失败仍处于固定状态，随后被卸载
+    hot, steps, released, error = ticks[1]
+    assert [(step["model"], step["action"]) for step in steps] == [(small, EVICT), (large, LOAD)]
+    assert released == [] and error == f"{small}: ReadTimeout: slow"
+    # 已卸载的模型不再固定，之后不会再尝试改回
+    assert ticks[2][2:] == ([], None)
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+运行中模型的实时监控（top）：自适应轮询 /api/ps，只在内容变化时重绘
+"""
+
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from rich.console import Console, Group
+from rich.live import Live
+from rich.panel import Panel
+from rich.table import Table
+
+from records import extract_models, format_size, process_record
+
+Key = Tuple[str, str]
+
+# 两次轮询之间重新计算剩余时间的间隔（秒）
+RENDER_INTERVAL = 1.0
+
+
+def format_remaining(expires_at: Optional[datetime], now: datetime) -> str:
+    """剩余时间，粒度随时长变粗，减少无意义的重绘"""
+    if expires_at is None:
+        return "Unknown"
+    seconds = (expires_at - now).total_seconds()
+    if seconds <= 0:
+        return "即将卸载"
+    if seconds >= 365 * 86400:
+        return "常驻"
+    if seconds >= 86400:
+        return f"{seconds // 86400:.0f}d"
+    if seconds >= 3600:
+        return f"{seconds // 3600:.0f}h{seconds % 3600 // 60:02.0f}m"
+    if seconds >= 60:
+        return f"{seconds // 60:.0f}m"
+    return f"{seconds:.0f}s"
+
+
+class ProcessMonitor:
+    """轮询一个或多个服务器的 /api/ps，计算差异并生成加载 / 卸载事件"""
+
+    def __init__(
+        self,
+        sessions: Dict[str, Any],
+        min_interval: float = 1.0,
+        max_interval: float = 10.0,
+    ):
+        self.sessions = sessions
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.models: Dict[Key, Dict[str, Any]] = {}
+        self.errors: Dict[str, str] = {}
+        self.events: Deque[str] = deque(maxlen=10)
+        self._seeded = False
+        self._pool = ThreadPoolExecutor(max_workers=max(1, min(len(sessions), 16)))
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False)
+
+    def _fetch(self, host: str) -> Tuple[str, Optional[List[Dict[str, Any]]], Optional[str]]:
+        from ollama import ProcessResponse
+
+        try:
+            data = self.sessions[host].get_json("/api/ps")
+            models = extract_models(ProcessResponse.model_validate(data)) or []
+            return host, [process_record(m) for m in models], None
+        except Exception as e:
+            return host, None, type(e).__name__
+
+    def poll(self) -> bool:
+        """轮询一次，返回运行中的模型是否有变化，并据此调整下次轮询间隔"""
+        current: Dict[Key, Dict[str, Any]] = {}
+        errors: Dict[str, str] = {}
+        for host, records, error in self._pool.map(self._fetch, list(self.sessions)):
+            if records is None:
+                errors[host] = error
+                # 请求失败时沿用上次的数据
+                current.update({k: v for k, v in self.models.items() if k[0] == host})
+                continue
+            for record in records:
+                current[(host, record["name"])] = record
+
+        if not self._seeded:
+            # 第一次轮询只记录初始状态，不产生事件
+            self._seeded = True
+            self.models = current
+            self.errors = errors
+            return True
+
+        stamp = time.strftime("%H:%M:%S")
+        changed = errors != self.errors
+        for key in current.keys() - self.models.keys():
+            self.events.appendleft(f"{stamp} 🟢 加载 {key[1]} @ {key[0]}")
+            changed = True
+        for key in self.models.keys() - current.keys():
+            self.events.appendleft(f"{stamp} 🔴 卸载 {key[1]} @ {key[0]}")
+            changed = True
+        for key in current.keys() & self.models.keys():
+            old, new = self.models[key], current[key]
+            if old["size_vram"] != new["size_vram"]:
+                self.events.appendleft(
+                    f"{stamp} 🔄 {key[1]} 显存 {format_size(old['size_vram'])} → {format_size(new['size_vram'])}"
+                )
+                changed = True
+            elif old["expires_at"] != new["expires_at"]:
+                changed = True
+
+        self.models = current
+        self.errors = errors
+        # 有变化时加快轮询，长时间无变化则逐步放慢
+        if changed:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * 1.5, self.max_interval)
+        return changed
+
+
+class TopView:
+    """按行缓存的表格视图，只有内容变化的行才重新格式化"""
+
+    def __init__(self, monitor: ProcessMonitor, show_host: bool):
+        self.monitor = monitor
+        self.show_host = show_host
+        self._rows: Dict[Key, Tuple[Any, Tuple[str, ...]]] = {}
+        self._signature: Optional[Tuple[Any, ...]] = None
+
+    def _row(self, key: Key, record: Dict[str, Any], now: datetime) -> Tuple[str, ...]:
+        remaining = format_remaining(record["expires_at"], now)
+        source = (record["size"], record["size_vram"], remaining)
+        cached = self._rows.get(key)
+        if cached is not None and cached[0] == source:
+            return cached[1]
+        size, vram = record["size"], record["size_vram"]
+        ratio = f"{vram / size * 100:.0f}%" if size and vram is not None else "-"
+        row = (
+            *((key[0],) if self.show_host else ()),
+            key[1],
+            format_size(size),
+            format_size(vram),
+            ratio,
+            remaining,
+        )
+        self._rows[key] = (source, row)
+        return row
+
+    def rows(self) -> List[Tuple[str, ...]]:
+        now = datetime.now(timezone.utc)
+        keys = sorted(self.monitor.models)
+        rows = [self._row(key, self.monitor.models[key], now) for key in keys]
+        # 清理已卸载模型的缓存行
+        for key in self._rows.keys() - set(keys):
+            del self._rows[key]
+        return rows
+
+    def render(self, force: bool = False) -> Optional[Group]:
+        """内容与上次相同时返回 None，调用方无需重绘"""
+        rows = self.rows()
+        signature = (tuple(rows), tuple(self.monitor.events), tuple(sorted(self.monitor.errors.items())))
+        if not force and signature == self._signature:
+            return None
+        self._signature = signature
+
+        table = Table(title="⚡️ 运行中的模型（Ctrl-C 退出）", show_header=True, header_style="bold magenta")
+        if self.show_host:
+            table.add_column("🖥️ 主机", style="white")
+        table.add_column("🤖 模型名称", style="cyan")
+        table.add_column("💾 模型大小", justify="right", style="green")
+        table.add_column("🎮 显存占用", justify="right", style="yellow")
+        table.add_column("📊 显存比例", justify="right", style="blue")
+        table.add_column("⏳ 剩余时间", justify="right", style="magenta")
+        for row in rows:
+            table.add_row(*row)
+
+        parts: List[Any] = [table]
+        for host, error in sorted(self.monitor.errors.items()):
+            parts.append(f"[red]❌ {host}: {error}[/red]")
+        if self.monitor.events:
+            parts.append(Panel("\n".join(self.monitor.events), title="事件", border_style="grey50"))
+        return Group(*parts)
+
+
+def run_top(console: Console, monitor: ProcessMonitor, show_host: bool, count: Optional[int] = None) -> None:
+    """运行监控直到 Ctrl-C 或达到指定轮询次数"""
+    view = TopView(monitor, show_host)
+    ticks = 0
+    try:
+        monitor.poll()
+        next_poll = time.monotonic() + monitor.interval
+        with Live(view.render(force=True), console=console, auto_refresh=False) as live:
+            while count is None or ticks < count:
+                # 轮询间隔可能放慢到数秒，剩余时间仍按 expires_at 每秒重新计算
+                time.sleep(max(0.0, min(RENDER_INTERVAL, next_poll - time.monotonic())))
+                if time.monotonic() >= next_poll:
+                    ticks += 1
+                    monitor.poll()
+                    next_poll = time.monotonic() + monitor.interval
+                renderable = view.render()
+                if renderable is not None:
+                    live.update(renderable, refresh=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        monitor.close()
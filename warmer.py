@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+模型预热与卸载：按显存预算决定加载顺序与需要腾出的模型，按时间表在工作时间内常驻一组模型
+"""
+
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from router import model_key
+
+# 未加载过的模型按文件大小估算显存占用，另加 KV 缓存与计算图的开销
+LOAD_OVERHEAD = 1.2
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+# 时间表中的模型一直常驻，直到时间段结束
+PINNED = -1
+
+LOAD = "load"
+KEEP = "keep"
+EVICT = "evict"
+SKIP = "skip"
+
+
+class ModelWarmer:
+    """预热 / 卸载单台服务器上的模型
+
+    加载通过不带输入的 /api/generate 完成（只加载模型，不生成），卸载为 keep_alive=0。
+    显存占用优先取 /api/ps 中实测的 size_vram，其次为此前观察到的值，最后按 /api/tags 的文件大小估算。
+    """
+
+    def __init__(self, session: Any, budget: Optional[int] = None):
+        self.session = session
+        self.budget = budget
+        # 模型 -> 最近一次在 /api/ps 中观察到的显存占用，跨多次预热复用
+        self.sizes: Dict[str, int] = {}
+
+    def resident(self) -> Dict[str, Dict[str, Any]]:
+        """当前已加载的模型，同时记录其显存占用"""
+        models = {}
+        for model in self.session.get_json("/api/ps").get("models") or []:
+            name = model_key(model.get("name") or model.get("model", ""))
+            models[name] = model
+            size = model.get("size_vram") or model.get("size")
+            if size:
+                self.sizes[name] = size
+        return models
+
+    def estimate(self, model: str, tags: Dict[str, Dict[str, Any]]) -> Optional[int]:
+        if model in self.sizes:
+            return self.sizes[model]
+        size = (tags.get(model) or {}).get("size")
+        return int(size * LOAD_OVERHEAD) if size else None
+
+    def plan(self, models: List[str]) -> List[Dict[str, Any]]:
+        """按给出的优先级依次放入预算，放不下时卸载其他最早过期的模型，仍放不下则跳过
+
+        返回的步骤按执行顺序排列：先卸载，再依次加载。
+        """
+        resident = self.resident()
+        tags = {model_key(m.get("name") or m.get("model", "")): m for m in self.session.get_json("/api/tags").get("models") or []}
+        wanted = list(dict.fromkeys(model_key(model) for model in models))
+        used = sum(self.sizes.get(name, 0) for name in resident)
+        # 不在预热列表中的已加载模型，最早过期（最久未使用）的最先卸载
+        evictable = sorted((name for name in resident if name not in wanted), key=lambda name: resident[name].get("expires_at") or "")
+        evictions: List[Dict[str, Any]] = []
+        loads: List[Dict[str, Any]] = []
+        for model in wanted:
+            size = self.estimate(model, tags)
+            if model in resident:
+                loads.append({"model": model, "action": KEEP, "size": size})
+                continue
+            if model not in tags:
+                loads.append({"model": model, "action": SKIP, "size": None, "reason": "服务器上没有该模型"})
+                continue
+            if self.budget is not None:
+                needed = used + (size or 0) - self.budget
+                freed: List[str] = []
+                while needed > 0 and len(freed) < len(evictable):
+                    freed.append(evictable[len(freed)])
+                    needed -= self.sizes.get(freed[-1], 0)
+                if needed > 0:
+                    loads.append({"model": model, "action": SKIP, "size": size, "reason": "超出显存预算"})
+                    continue
+                for name in freed:
+                    evictable.remove(name)
+                    used -= self.sizes.get(name, 0)
+                    evictions.append({"model": name, "action": EVICT, "size": self.sizes.get(name)})
+            used += size or 0
+            loads.append({"model": model, "action": LOAD, "size": size})
+        return evictions + loads
+
+    def load(self, model: str, keep_alive: Any) -> Dict[str, Any]:
+        return self.session.post_json("/api/generate", {"model": model, "keep_alive": keep_alive})
+
+    def unload(self, model: str) -> Dict[str, Any]:
+        return self.session.post_json("/api/generate", {"model": model, "keep_alive": 0})
+
+    def warm(
+        self,
+        models: List[str],
+        keep_alive: Any,
+        cancelled: Optional[threading.Event] = None,
+        on_step: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> List[Dict[str, Any]]:
+        """按计划依次卸载、加载，模型逐个加载，避免同时加载互相争抢显存与磁盘带宽
+
+        已加载的模型同样发送一次请求，以刷新其 keep_alive。
+        """
+        steps = self.plan(models)
+        for step in steps:
+            if cancelled is not None and cancelled.is_set():
+                break
+            if step["action"] == SKIP:
+                pass
+            elif step["action"] == EVICT:
+                try:
+                    self.unload(step["model"])
+                except Exception as e:
+                    step["action"] = SKIP
+                    step["reason"] = f"{type(e).__name__}: {e}"
+            else:
+                start = time.perf_counter()
+                try:
+                    response = self.load(step["model"], keep_alive)
+                except Exception as e:
+                    step["action"] = SKIP
+                    step["reason"] = f"{type(e).__name__}: {e}"
+                else:
+                    step["elapsed"] = time.perf_counter() - start
+                    step["load_duration"] = (response.get("load_duration") or 0) / 1e9
+            if on_step is not None:
+                on_step(step)
+        # 记录实际的显存占用，下次规划更准确
+        self.resident()
+        return steps
+
+
+def parse_days(value: Any) -> Set[int]:
+    """mon-fri / sat,sun / * 或列表，返回星期几（0 为周一）的集合"""
+    if value in (None, "*"):
+        return set(range(7))
+    parts = value if isinstance(value, list) else str(value).split(",")
+    days: Set[int] = set()
+    for part in parts:
+        part = part.strip().lower()
+        if "-" in part:
+            start, end = (WEEKDAYS.index(day.strip()[:3]) for day in part.split("-", 1))
+            days.update((start + i) % 7 for i in range((end - start) % 7 + 1))
+        else:
+            days.add(WEEKDAYS.index(part[:3]))
+    return days
+
+
+def parse_clock(value: str) -> int:
+    """HH:MM，返回当天的第几分钟"""
+    hours, minutes = value.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+class Schedule:
+    """常驻模型的时间表
+
+    文件为 JSON 列表，每项包含 models 以及可选的 days（如 "mon-fri"）、start / end（如 "09:00" / "18:00"），
+    结束时间早于开始时间表示跨越午夜；先出现的项优先级更高。
+    """
+
+    def __init__(self, entries: List[Dict[str, Any]]):
+        self.entries = []
+        for number, entry in enumerate(entries, 1):
+            if not isinstance(entry, dict) or not entry.get("models"):
+                raise ValueError(f"时间表第 {number} 项缺少 models")
+            try:
+                window = (
+                    parse_days(entry.get("days")),
+                    parse_clock(entry.get("start", "00:00")),
+                    parse_clock(entry.get("end", "24:00")),
+                )
+            except ValueError:
+                raise ValueError(f"时间表第 {number} 项的 days / start / end 格式错误")
+            self.entries.append((list(entry["models"]), window))
+
+    @classmethod
+    def load(cls, path: str) -> "Schedule":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, list):
+            raise ValueError("时间表必须是 JSON 列表")
+        return cls(data)
+
+    def hot_set(self, now: datetime) -> List[str]:
+        """当前时间应常驻的模型，按优先级排列"""
+        minute = now.hour * 60 + now.minute
+        weekday = now.weekday()
+        models: List[str] = []
+        for entry_models, (days, start, end) in self.entries:
+            if start <= end:
+                active = weekday in days and start <= minute < end
+            else:
+                # 跨午夜：午夜之后的部分属于前一天的时间段
+                active = (weekday in days and minute >= start) or ((weekday - 1) % 7 in days and minute < end)
+            if active:
+                models.extend(model_key(model) for model in entry_models)
+        return list(dict.fromkeys(models))
+
+
+def run_schedule(
+    warmer: ModelWarmer,
+    schedule: Schedule,
+    release_keep_alive: Any,
+    interval: float = 60.0,
+    count: Optional[int] = None,
+    cancelled: Optional[threading.Event] = None,
+    on_tick: Optional[Callable[[List[str], List[Dict[str, Any]], List[str], Optional[str]], None]] = None,
+) -> None:
+    """按时间表周期性地常驻模型
+
+    每轮都重新固定当前时间段内的模型（其他请求的 keep_alive 会覆盖常驻设置）；
+    时间段结束且仍在显存中的模型改回 release_keep_alive，随后自然过期，不打断正在进行的请求，
+    已被卸载的模型不再发送请求，以免重新加载；改回失败的模型下一轮重试。
+    服务器暂时不可达时只报告错误，下一轮继续。
+    """
+    cancelled = cancelled or threading.Event()
+    pinned: Set[str] = set()
+    ticks = 0
+    while not cancelled.is_set():
+        hot = schedule.hot_set(datetime.now())
+        expired = [model for model in sorted(pinned) if model not in hot]
+        released: List[str] = []
+        steps: List[Dict[str, Any]] = []
+        errors: List[str] = []
+        if expired:
+            try:
+                resident = warmer.resident()
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                expired = []
+            for model in expired:
+                if model in resident:
+                    try:
+                        warmer.load(model, release_keep_alive)
+                    except Exception as e:
+                        errors.append(f"{model}: {type(e).__name__}: {e}")
+                        continue
+                pinned.discard(model)
+                released.append(model)
+        if hot:
+            try:
+                steps = warmer.warm(hot, PINNED, cancelled=cancelled)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+        pinned.update(step["model"] for step in steps if step["action"] in (LOAD, KEEP))
+        pinned.difference_update(step["model"] for step in steps if step["action"] == EVICT)
+        error = "; ".join(errors) or None
+        if on_tick is not None:
+            on_tick(hot, steps, released, error)
+        ticks += 1
+        if count is not None and ticks >= count:
+            break
+        cancelled.wait(interval)